@@ -0,0 +1,81 @@
+"""Compare downloading files one rclone call each against one --files-from-raw batch.
+
+Usage: python benchmarks/bench_batch_download.py [remote:path] [count]
+
+Downloads the first count files (default 50) directly under remote:path
+twice into fresh temporary directories: once as count separate transfers
+run one after another, as marking nothing and pressing d on each file
+did, and once as the single batch transfer the browser queues for marked
+files. Without remote:path, count small files are generated in a local
+directory, which times only rclone's start-up per call; a real remote
+adds its authentication and connection set-up to each separate call.
+Needs rclone on the PATH.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from rcli.transfer import transfer  # noqa: E402
+
+
+def list_files(src: str, count: int) -> list[str]:
+    result = subprocess.run(
+        ["rclone", "lsf", src, "--files-only", "--max-depth", "1"],
+        capture_output=True, text=True, check=True,
+    )
+    return [name for name in result.stdout.splitlines() if name][:count]
+
+
+def local_source(directory: str, count: int) -> list[str]:
+    names = []
+    for i in range(count):
+        name = f"file_{i:04d}.bin"
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(os.urandom(4096))
+        names.append(name)
+    return names
+
+
+def run(job: transfer) -> bool:
+    job.start()
+    job.wait()
+    return job.succeeded()
+
+
+def one_per_file(src: str, names: list[str], dst: str) -> bool:
+    base = src if src.endswith((":", "/")) else src + "/"
+    return all(run(transfer(base + name, dst, src_is_file=True)) for name in names)
+
+
+def batch(src: str, names: list[str], dst: str) -> bool:
+    return run(transfer(src, dst, src_is_file=False, files=names))
+
+
+def main():
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as work:
+        if len(sys.argv) > 1:
+            src = sys.argv[1]
+            names = list_files(src, count)
+        else:
+            src = os.path.join(work, "src")
+            os.mkdir(src)
+            names = local_source(src, count)
+        print(f"{len(names)} files from {src}")
+
+        for label, fn in (("one rclone call per file", one_per_file), ("one --files-from-raw call", batch)):
+            dst = tempfile.mkdtemp(dir=work)
+            start = time.perf_counter()
+            ok = fn(src, names, dst)
+            elapsed = time.perf_counter() - start
+            copied = len(os.listdir(dst))
+            print(f"{label:<28}{elapsed:>8.2f} s  {copied} copied{'' if ok else '  (errors)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compare the original fuzzy ranking against the indexed, heap-based one.
+
+Usage: python benchmarks/bench_fuzzy.py [num_paths] [query]
+
+Generates num_paths synthetic paths (default 1,000,000), then times each
+keystroke of query being typed, once with the original scan-and-sort
+ranking and once with trigramindex + fuzzymatcher.
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from rcli.fuzzy import trigramindex, fuzzymatcher  # noqa: E402
+from rcli.pathstore import pathstore  # noqa: E402
+
+MAX_RESULTS = 1000
+WORDS = [
+    "photos", "documents", "backup", "music", "videos", "projects", "src",
+    "archive", "2021", "2022", "2023", "2024", "holiday", "work", "notes",
+    "invoices", "raw", "export", "family", "old", "misc", "drafts",
+]
+EXTENSIONS = [".jpg", ".png", ".txt", ".md", ".pdf", ".mp3", ".mp4", ".py", ".json"]
+
+
+def synthetic_paths(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    paths = []
+    for i in range(n):
+        depth = rng.randint(1, 5)
+        dirs = "/".join(rng.choice(WORDS) for _ in range(depth))
+        paths.append(f"{dirs}/{rng.choice(WORDS)}_{i}{rng.choice(EXTENSIONS)}")
+    return paths
+
+
+def original_results(data, inputtext):
+    """fuzzycomponent.updateresults before the index: score everything, sort everything."""
+    keywords = list(filter(None, inputtext.split(" ")))
+    scored = [(sum(kw.lower() in p.lower() for kw in keywords), p) for p in data]
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [p for _, p in scored[:MAX_RESULTS]]
+
+
+def indexed_results(matcher, data, inputtext):
+    return [data[i] for i in matcher.search(inputtext, data, MAX_RESULTS)]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    query = sys.argv[2] if len(sys.argv) > 2 else "photos 2024 holiday"
+
+    print(f"Generating {n:,} paths...")
+    store = pathstore(synthetic_paths(n))
+    data = store.view()
+
+    start = time.perf_counter()
+    index = trigramindex(store)
+    index.update()
+    print(f"Trigram index built in {time.perf_counter() - start:.2f}s: "
+          f"{index.nbytes() / 2**20:.1f} MiB of postings for {store.nbytes() / 2**20:.1f} MiB of paths")
+    matcher = fuzzymatcher(index)
+
+    print(f"\n{'query':<24}{'original ms':>14}{'indexed ms':>14}")
+    totals = [0.0, 0.0]
+    for end in range(1, len(query) + 1):
+        typed = query[:end]
+        original = timed(original_results, data, typed)
+        indexed = timed(indexed_results, matcher, data, typed)
+        totals[0] += original
+        totals[1] += indexed
+        print(f"{typed!r:<24}{original:>14.1f}{indexed:>14.1f}")
+    print(f"{'total':<24}{totals[0]:>14.1f}{totals[1]:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compare download throughput of each transfer profile.
+
+Usage: python benchmarks/bench_profiles.py [remote:path] [config]
+
+Copies remote:path once per profile, each into a fresh temporary
+directory, and prints the time taken and the throughput. Profiles come
+from config (the file given to rcli --config) on top of the built-in
+ones. Without remote:path two local sources are generated, 2,000 files
+of 4 KiB and 4 files of 64 MiB, and each profile copies both; a local
+copy mostly shows the effect of --transfers and --checkers, while a real
+remote also shows --multi-thread-streams and --buffer-size. Needs rclone
+on the PATH.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from rcli.config import load_config, transferprofiles  # noqa: E402
+from rcli.transfer import transfer  # noqa: E402
+
+
+def local_source(directory: str, count: int, size: int) -> str:
+    os.mkdir(directory)
+    for i in range(count):
+        with open(os.path.join(directory, f"file_{i:04d}.bin"), "wb") as f:
+            f.write(os.urandom(size))
+    return directory
+
+
+def copied_bytes(directory: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(directory)
+        for name in names
+    )
+
+
+def bench(src: str, profiles: transferprofiles, work: str):
+    print(f"\n{src}")
+    for name in profiles.names():
+        profile = profiles.get(name)
+        dst = tempfile.mkdtemp(dir=work)
+        job = transfer(src, dst, src_is_file=False, profile=profile)
+        start = time.perf_counter()
+        job.start()
+        job.wait()
+        elapsed = time.perf_counter() - start
+        size = copied_bytes(dst)
+        rate = size / elapsed / 1024 ** 2 if elapsed else 0
+        print(f"{name:<20}{elapsed:>8.2f} s{rate:>10.1f} MiB/s{'' if job.succeeded() else '  (errors)'}")
+
+
+def main():
+    config = load_config(sys.argv[2]) if len(sys.argv) > 2 else None
+    profiles = transferprofiles.fromconfig(config)
+    with tempfile.TemporaryDirectory() as work:
+        if len(sys.argv) > 1:
+            sources = [sys.argv[1]]
+        else:
+            sources = [
+                local_source(os.path.join(work, "small"), 2000, 4096),
+                local_source(os.path.join(work, "huge"), 4, 64 * 1024 ** 2),
+            ]
+        for src in sources:
+            bench(src, profiles, work)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Compare reading rclone's JSON log a line at a time against transfer's chunked reader.
+
+Usage: python benchmarks/bench_progress.py [recording ...]
+
+Each recording is the stderr of a transfer, captured for example with
+`rclone copy src dst --use-json-log --stats 500ms --stats-log-level NOTICE
+2> recording.log`. Without recordings a synthetic log of 20,000 stats
+lines for 16 files in flight is used, with an error every tenth line.
+
+The log is replayed from memory, so every read finds a full buffer: this
+is the case of a reader that fell behind rclone, such as while the UI
+thread holds the GIL. Reading a line at a time parses every stats line;
+transfer._read_log() parses only the last one of each read. Both must end
+with the same stats and errors.
+"""
+
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from rcli.transfer import transfer  # noqa: E402
+
+
+def synthetic_log(updates: int = 20_000, files: int = 16) -> bytes:
+    """stderr shaped like `rclone copy --use-json-log --stats 500ms`."""
+    out = []
+    for n in range(updates):
+        stats = {
+            "bytes": n * 65536, "totalBytes": updates * 65536, "speed": 1048576.0, "eta": updates - n,
+            "transfers": n // 100, "totalTransfers": updates // 100, "checks": 0, "totalChecks": 0,
+            "errors": n // 10, "elapsedTime": n / 2,
+            "transferring": [
+                {"name": f"photos/2024/holiday/img_{i:04d}.jpg", "bytes": n * 1024, "size": 52428800,
+                 "percentage": n * 100 // updates, "speed": 262144.0, "speedAvg": 262144.0,
+                 "eta": updates - n, "group": "global_stats"}
+                for i in range(files)
+            ],
+        }
+        out.append({"level": "notice", "msg": "stats", "source": "accounting/stats.go:1", "stats": stats,
+                    "time": "2024-01-01T00:00:00Z"})
+        if n % 10 == 0:
+            out.append({"level": "error", "msg": "Failed to copy: permission denied", "object": f"locked_{n}.bin",
+                        "source": "operations/copy.go:1", "time": "2024-01-01T00:00:00Z"})
+    return "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in out).encode()
+
+
+def line_at_a_time(data: bytes) -> transfer:
+    """transfer._run_process before the chunked reader: iterate the text-mode pipe."""
+    job = transfer("src:", "/tmp/dst")
+    for line in io.TextIOWrapper(io.BytesIO(data), errors="replace"):
+        job._handle_line(line)
+    return job
+
+
+def chunked(data: bytes) -> transfer:
+    job = transfer("src:", "/tmp/dst")
+    job._read_log(io.BufferedReader(io.BytesIO(data)))
+    return job
+
+
+def bench(name: str, data: bytes):
+    print(f"\n{name}: {len(data) / 1024 ** 2:.1f} MiB")
+    results = []
+    for label, read in (("line at a time", line_at_a_time), ("chunked", chunked)):
+        start = time.perf_counter()
+        job = read(data)
+        elapsed = time.perf_counter() - start
+        results.append((vars(job.stats()), job.errors()))
+        print(f"{label:<20}{elapsed * 1000:>10.1f} ms")
+    assert results[0] == results[1], "readers disagree"
+
+
+def main():
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            with open(path, "rb") as f:
+                bench(path, f.read())
+    else:
+        bench("synthetic", synthetic_log())
+
+
+if __name__ == "__main__":
+    main()
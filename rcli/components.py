@@ -3,11 +3,13 @@ from abc import ABC, abstractmethod
 from typing import Optional
 from .enums import CHOICE, SCENES, SelectedOption
 from .brect import brect
-from .utils import format_size, format_date
+from .utils import format_size, format_date, format_duration
+from .fuzzy import trigramindex, fuzzymatcher, searchworker
+from .parallel import parallelmatcher
 import string
 import logging
 import threading
-import subprocess
+import time
 
 
 class component(ABC):
@@ -72,140 +74,186 @@ class textcomponent(component):
         pass
 
 
-class commandcomponent(component):
-    def __init__(self, command: list[str], offset=(0, 0)):
+class transfercomponent(component):
+    """Native progress view of a transfer, drawn from its stats rather than rclone's output.
+
+    Shows an overall progress bar, bytes done against the total, speed and
+    ETA, the file and error counts, each file in flight with a bar of its
+    own, and the latest error messages.
+    """
+
+    BAR_WIDTH = 40  # Widest the overall progress bar gets
+    FILE_BAR_WIDTH = 10
+    ERROR_LINES = 5  # Latest error messages shown
+
+    def __init__(self, transfer, title: str, offset=(2, 1)):
         super().__init__(offset)
-        self.command = command
-        self.process = None
-        self.lines = []  # Store lines as a list for proper terminal handling
-        self.isDone = False
-        self._lock = threading.Lock()
+        self.transfer = transfer
+        self.title = title
 
-        # Start the subprocess in a separate thread
-        self.startcommand()
+    @staticmethod
+    def _bar(fraction, width: int) -> str:
+        filled = int(round((fraction or 0) * width))
+        return "[" + "#" * filled + "-" * (width - filled) + "]"
 
-    def startcommand(self):
-        def runcommand():
-            try:
-                self.isDone = False
-                # Run the command and capture real-time output
-                self.process = subprocess.Popen(
-                    self.command,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
+    @staticmethod
+    def _percent(fraction) -> str:
+        return f"{fraction * 100:3.0f}%" if fraction is not None else "  ?%"
+
+    def lines(self, cols: int) -> list[str]:
+        """Return the text of the view for a screen cols wide."""
+        stats = self.transfer.stats()
+        fraction = stats.fraction()
+        width = max(10, min(self.BAR_WIDTH, cols - self.offset[0] - 8))
+        eta = format_duration(stats.eta) if stats.eta is not None else "unknown"
+        total = format_size(stats.total_bytes) if stats.total_bytes else "?"
+        counts = f"Files {stats.transfers} / {stats.total_transfers}"
+        if stats.total_checks:
+            counts += f"   Checked {stats.checks} / {stats.total_checks}"
+        counts += f"   Errors {stats.errors}"
+        lines = [
+            self.title,
+            "",
+            f"{self._bar(fraction, width)} {self._percent(fraction)}",
+            f"{format_size(stats.bytes)} / {total}   {format_size(stats.speed)}/s   ETA {eta}",
+            counts,
+        ]
+        if stats.transferring:
+            lines += ["", "Transferring:"]
+            for item in stats.transferring:
+                item_fraction = item["percentage"] / 100 if item["size"] > 0 else None
+                item_eta = format_duration(item["eta"]) if item["eta"] is not None else "-"
+                lines.append(
+                    f"  {self._bar(item_fraction, self.FILE_BAR_WIDTH)} {self._percent(item_fraction)}"
+                    f" {format_size(item['speed']):>9}/s {item_eta:>7}  {item['name']}"
                 )
-
-                # Read character by character to properly handle \r and ANSI escapes
-                current_line = ""
-                escape_seq = ""
-                in_escape = False
-
-                while True:
-                    char = self.process.stdout.read(1)
-                    if not char:
-                        break
-
-                    # Handle ANSI escape sequences (e.g., \033[8A for cursor up)
-                    if char == '\033':
-                        in_escape = True
-                        escape_seq = char
-                        continue
-
-                    if in_escape:
-                        escape_seq += char
-                        # Check for complete escape sequence (ends with letter)
-                        if char.isalpha():
-                            in_escape = False
-                            # Handle cursor up: \033[nA
-                            if escape_seq.endswith('A') and '[' in escape_seq:
-                                try:
-                                    # Extract the number of lines to move up
-                                    num = escape_seq[2:-1]  # Get chars between [ and A
-                                    lines_up = int(num) if num else 1
-                                    # Discard current_line - it's old content being overwritten
-                                    current_line = ""
-                                    # Remove n lines to simulate cursor moving up
-                                    with self._lock:
-                                        self.lines = self.lines[:-lines_up] if lines_up <= len(self.lines) else []
-                                except ValueError:
-                                    pass
-                            # Ignore other escape sequences (clear line, colors, etc.)
-                            escape_seq = ""
-                        continue
-
-                    if char == '\r':
-                        # Carriage return: go to beginning of line
-                        # Discard current_line - next chars will overwrite it
-                        current_line = ""
-                    elif char == '\n':
-                        # Newline: commit current line and start new one
-                        # Detect start of new rclone progress block and clear old lines
-                        # rclone progress blocks contain "Transferred:" with "ETA" - may be concatenated
-                        if "Transferred:" in current_line and "ETA" in current_line:
-                            # Extract just the Transferred: part (discard any prefix from previous line)
-                            idx = current_line.find("Transferred:")
-                            current_line = current_line[idx:]
-                            with self._lock:
-                                self.lines = []
-                        with self._lock:
-                            self.lines.append(current_line)
-                        current_line = ""
-                    else:
-                        current_line += char
-
-                # Add any remaining content
-                if current_line:
-                    with self._lock:
-                        self.lines.append(current_line)
-
-            finally:
-                self.isDone = True
-
-        # Create and start a daemon thread for running the subprocess
-        thread = threading.Thread(target=runcommand)
-        thread.daemon = True
-        thread.start()
-
-    def kill(self):
-        """Terminate the running subprocess if any."""
-        if self.process and self.process.poll() is None:
-            self.process.terminate()
+        errors = self.transfer.errors()
+        if errors:
+            lines += ["", "Errors:"] + ["  " + error for error in errors[-self.ERROR_LINES:]]
+        return lines
 
     def draw(self, stdscr):
         rows, cols = stdscr.getmaxyx()
+        x, y = self.offset
+        # The bottom row is left for the key bar
+        for i, line in enumerate(self.lines(cols)[:max(0, rows - y - 1)]):
+            try:
+                stdscr.addstr(y + i, x, line[:max(0, cols - x - 1)])
+            except curses.error:
+                pass
+
+    def handleinput(self, c: int):
+        pass
+
+
+def format_transfers(manager) -> Optional[str]:
+    """Summarize a transfermanager's jobs in one line, or return None if it has none."""
+    counts = manager.counts()
+    parts = [f"{counts[state]} {state}" for state in ("running", "queued", "failed") if counts.get(state)]
+    if not parts:
+        return None
+    text = ", ".join(parts)
+    if counts.get("running"):
+        text += f" · {format_size(manager.stats().speed)}/s"
+    return text
 
-        # Show only lines that fit on screen
-        max_lines = rows - 2
-        with self._lock:
-            visible_lines = self.lines[-max_lines:] if self.lines else []
 
-        # Strip leading whitespace from all lines
-        stripped_lines = [line.lstrip()[:cols - 1] for line in visible_lines]
+class jobscomponent(component):
+    """Lists a transfermanager's jobs, one row each, with a cursor on one of them.
 
-        # Find the longest line to determine block width
-        max_width = max((len(line) for line in stripped_lines), default=0)
+    The cursor follows its job as the list reorders. K and J move the job
+    under it earlier or later in the queue, x cancels it and enter opens
+    it, leaving it in `opened`.
+    """
 
-        # Center the block vertically and horizontally
-        start_y = (rows - len(stripped_lines)) // 2
-        start_x = max(0, (cols - max_width) // 2)
+    PROGRESS_WIDTH = 34  # Bar, percent and speed of a running job
+
+    def __init__(self, manager, offset=(1, 3)):
+        super().__init__(offset)
+        self.manager = manager
+        self.jobs = manager.jobs()
+        self.selected = 0
+        self.opened = None
+        self._selectedJob = self.jobs[0] if self.jobs else None
+
+    def _refresh(self):
+        """Reread the jobs, keeping the cursor on the same job if it is still listed."""
+        self.jobs = self.manager.jobs()
+        if self._selectedJob in self.jobs:
+            self.selected = self.jobs.index(self._selectedJob)
+        self._select(self.selected)
+
+    def _select(self, index: int):
+        self.selected = max(0, min(index, len(self.jobs) - 1))
+        self._selectedJob = self.jobs[self.selected] if self.jobs else None
+
+    def current(self):
+        """Return the job under the cursor, or None if there are none."""
+        return self._selectedJob
+
+    def row(self, job) -> str:
+        state = job.state()
+        if state == "running":
+            stats = job.stats()
+            fraction = stats.fraction()
+            percent = f"{fraction * 100:3.0f}%" if fraction is not None else "  ?%"
+            progress = f"{transfercomponent._bar(fraction, 20)} {percent} {format_size(stats.speed):>9}/s"
+        else:
+            progress = ""
+        return f"{state:<10}{progress:<{self.PROGRESS_WIDTH}}  {job.title}"
 
-        for i, display_line in enumerate(stripped_lines):
+    def draw(self, stdscr):
+        self._refresh()
+        rows, cols = stdscr.getmaxyx()
+        x, y = self.offset
+        height = max(1, rows - y - 2)  # Leave a row above the key bar
+        top = max(0, self.selected - height + 1)
+        if not self.jobs:
+            try:
+                stdscr.addstr(y, x, "No transfers"[:max(0, cols - x - 1)])
+            except curses.error:
+                pass
+            return
+        for i, job in enumerate(self.jobs[top:top + height]):
+            attr = curses.A_REVERSE if top + i == self.selected else curses.A_NORMAL
             try:
-                stdscr.addstr(start_y + i, start_x, display_line)
+                stdscr.addstr(y + i, x, self.row(job)[:max(0, cols - x - 1)], attr)
             except curses.error:
                 pass
 
     def handleinput(self, c: int):
-        pass
+        self._refresh()
+        job = self._selectedJob
+        if c == curses.KEY_UP or c == ord("k"):
+            self._select(self.selected - 1)
+        elif c == curses.KEY_DOWN or c == ord("j"):
+            self._select(self.selected + 1)
+        elif job is None:
+            return
+        elif c == ord("K") or c == ord("J"):
+            self.manager.move(job, -1 if c == ord("K") else 1)
+            self._refresh()
+        elif c == ord("x"):
+            self.manager.cancel(job)
+            self._refresh()
+        elif c == curses.KEY_ENTER or c == 10:
+            self.opened = job
 
 
 class fuzzycomponent(component):
     MAX_RESULTS = 1000  # Cap to avoid O(N) sort on huge path lists
+    INDEX_STEP = 1000  # Paths our own index takes per step of its background build
+    INDEX_PAUSE = 0.05  # Seconds the build waits while a search runs
 
-    def __init__(self, data, offset=(0, 0)):
+    def __init__(self, data, offset=(0, 0), index=None, processes=0):
         super().__init__(offset)
         self.data = data
+        self.index = index  # trigramindex over data, built on first search if None
+        self.processes = processes  # Match large data on this many processes; 0 for one thread
+        self._matcher = None  # Only touched from the search worker thread
+        self._parallel = None  # Likewise
+        self._indexer = None  # Index being built in the background, if any
+        self._worker = None
         self.topresults = []
         self.inputtext = ""
         self.selectedIndex = 0
@@ -217,6 +265,7 @@ class fuzzycomponent(component):
         return ''.join(c if c >= ' ' or c == '\t' else '?' for c in text)
 
     def draw(self, stdscr):
+        self.poll()
         rows, cols = stdscr.getmaxyx()
         maxlines = max(1, rows - self.offset[1] - 3)
         topresults = self.topresults[:maxlines]
@@ -243,19 +292,106 @@ class fuzzycomponent(component):
             except curses.error:
                 pass
 
-    def updateresults(self):
-        keywords = list(filter(None, self.inputtext.split(" ")))
+    def setdata(self, data, index=None):
+        """Replace the searched paths (and their index, if given), keeping the current query."""
+        self.data = data
+        if index is not None:
+            self.index = index
+        if self.inputtext:
+            self.updateresults()
 
-        # Score each path by how many keywords match
-        scored = []
-        for file_path in self.data:
-            lower_path = file_path.lower()
-            score = sum(kw.lower() in lower_path for kw in keywords)
-            scored.append((score, file_path))
+    def _getmatcher(self, data):
+        if self.index is None or not self.index.covers(data):
+            self.index = trigramindex(data)
+            self._matcher = None
+        if self.index.paths is data and len(self.index) < len(data) and self._indexer is not self.index:
+            # Our own index; a shared one is kept up to date by its owner.
+            # Searches scan the paths it has not reached yet meanwhile
+            self._indexer = self.index
+            threading.Thread(target=self._buildindex, args=(self.index,), daemon=True).start()
+        if self._matcher is None or self._matcher.index is not self.index:
+            self._matcher = fuzzymatcher(self.index)
+        return self._matcher
+
+    def _buildindex(self, index):
+        """Index all of index.paths a step at a time, until done or stop() is called.
+
+        Steps are only taken between searches, so the build never slows one down.
+        """
+        try:
+            while self._indexer is index and len(index) < len(index.paths):
+                if self.searching():
+                    time.sleep(self.INDEX_PAUSE)
+                else:
+                    index.update(self.INDEX_STEP)
+        finally:
+            if self._indexer is index:
+                self._indexer = None
+
+    def _getparallel(self, data):
+        if self._parallel is not None and not self._parallel.covers(data):
+            self._stopparallel()
+        if self._parallel is None:
+            self._parallel = parallelmatcher(data, self.processes)
+        return self._parallel
+
+    def _stopparallel(self):
+        if self._parallel is not None:
+            self._parallel.stop()
+            self._parallel = None
+
+    def _search(self, query, data, limit, cancelled):
+        if self.processes > 1 and len(data) >= 2 * parallelmatcher.MIN_SHARD:
+            try:
+                ids = self._getparallel(data).search(query, data, limit, cancelled)
+                return [data[i] for i in ids]
+            except OSError:
+                logging.exception("Parallel fuzzy search failed, matching in one thread")
+                self._stopparallel()
+                self.processes = 0
+        ids = self._getmatcher(data).search(query, data, limit, cancelled)
+        return [data[i] for i in ids]
 
-        # Only keep top results to avoid sorting millions of entries
-        scored.sort(key=lambda x: x[0], reverse=True)
-        self.topresults = [path for _, path in scored[:self.MAX_RESULTS]]
+    def updateresults(self):
+        """Start matching the current query in the background.
+
+        Any search still running for an earlier query is cancelled. The new
+        results replace topresults on the first draw() or poll() after they
+        are ready.
+        """
+        if self._worker is None:
+            self._worker = searchworker()
+        query, data, limit = self.inputtext, self.data, self.MAX_RESULTS
+        self._worker.submit(lambda cancelled: self._search(query, data, limit, cancelled))
+
+    def poll(self) -> bool:
+        """Take finished search results, if any. Return True if topresults changed."""
+        if self._worker is None:
+            return False
+        result = self._worker.poll()
+        if result is None:
+            return False
+        self.topresults = result[1]
+        return True
+
+    def searching(self) -> bool:
+        """Return True while a search is queued or running."""
+        return self._worker is not None and self._worker.is_busy()
+
+    def wait(self, timeout=None) -> bool:
+        """Block until the pending search finishes and take its results."""
+        if self._worker is not None:
+            self._worker.wait(timeout)
+        return self.poll()
+
+    def stop(self):
+        """End the background search thread and any matching processes."""
+        if self._worker is not None:
+            # Let a search on the processes wind down before shutting them
+            self._worker.stop(wait=self._parallel is not None)
+            self._worker = None
+        self._indexer = None
+        self._stopparallel()
 
     def isvalid(self, c: int):
         try:
@@ -270,6 +406,7 @@ class fuzzycomponent(component):
             self.inputtext = self.inputtext[:-1]
             self.updateresults()
         elif c == curses.KEY_ENTER or c == 10:
+            self.poll()
             if len(self.topresults) > 0 and self.selectedIndex < len(self.topresults):
                 self.choice = self.topresults[self.selectedIndex]
         elif c == 27:  # Escape
@@ -291,6 +428,8 @@ class choicecomponent(component):
         self.back = back
         self.brect = rect
         self.selectChar = "> "
+        self.markChar = "*"
+        self.marked = set()  # Names of the entries marked with space
         self._needs_resize = False
 
         self.elements = []
@@ -300,6 +439,25 @@ class choicecomponent(component):
         if back:
             self.elements.append(CHOICE.BACK)
 
+    def setchoices(self, choices: list[dict]):
+        """Replace the choices, keeping the cursor on the same entry if it is still there."""
+        current = self.elements[self.elementIndex] if self.elements else None
+        self.choices = choices
+        self.elements = list(choices)
+        if self.back:
+            self.elements.append(CHOICE.BACK)
+        self.marked &= {entry.get("Name") for entry in choices}
+        if current == CHOICE.BACK:
+            self.elementIndex = len(self.elements) - 1
+            return
+        names = [entry.get("Name") for entry in choices]
+        if current is not None and current.get("Name") in names:
+            self.elementIndex = names.index(current.get("Name"))
+        elif self.elements:
+            self.elementIndex = min(self.elementIndex, len(self.elements) - 1)
+        else:
+            self.elementIndex = 0
+
     def _format_entry(self, entry):
         """Format a dict entry into display name, size, and date strings."""
         name = entry.get("Name", "")
@@ -349,18 +507,33 @@ class choicecomponent(component):
                 is_dir = option.get("IsDir", False)
                 content = f"{name:<{name_w}}  {size_str:>{size_w}}  {date_str}"
 
+            marked = option != CHOICE.BACK and option.get("Name") in self.marked
             if i == self.elementIndex:
                 x -= len(self.selectChar)
-                content = f"{self.selectChar}{content}"
+                prefix = self.selectChar[0] + self.markChar if marked else self.selectChar
+                content = f"{prefix}{content}"
+            elif marked:
+                x -= len(self.selectChar)
+                content = f" {self.markChar}{content}"
 
             try:
+                attr = curses.A_BOLD if marked else curses.A_NORMAL
                 if option != CHOICE.BACK and is_dir:
-                    stdscr.addstr(y, x, content, curses.color_pair(1))
+                    stdscr.addstr(y, x, content, curses.color_pair(1) | attr)
+                elif marked:
+                    stdscr.addstr(y, x, content, attr)
                 else:
                     stdscr.addstr(y, x, content)
             except curses.error:
                 pass
 
+    def markedchoices(self) -> list[dict]:
+        """Return the marked entries, in listing order."""
+        return [entry for entry in self.choices if entry.get("Name") in self.marked]
+
+    def clearmarks(self):
+        self.marked = set()
+
     def cursorOnChoice(self):
         return self.elementIndex >= 0 and self.elementIndex < len(self.choices)
 
@@ -396,10 +569,23 @@ class choicecomponent(component):
                 self.choice = SelectedOption(
                     CHOICE.DOWNLOAD, self.choices[self.elementIndex]
                 )
+            elif self.marked:
+                # Downloads the marks; no entry is under the cursor
+                self.choice = SelectedOption(CHOICE.DOWNLOAD)
 
         elif c == ord("p"):
             self.choice = SelectedOption(CHOICE.UPLOAD)
 
+        elif c == ord("t"):
+            self.choice = SelectedOption(CHOICE.TRANSFERS)
+
+        elif c == ord(" "):
+            # Mark or unmark the entry and move on, to mark a run quickly
+            if self.cursorOnChoice():
+                name = self.choices[self.elementIndex].get("Name")
+                self.marked ^= {name}
+                self.elementIndex += 1
+
         elif c == ord("q"):
             self.choice = SelectedOption(CHOICE.QUIT)
 
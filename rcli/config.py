@@ -0,0 +1,270 @@
+import os
+import configparser
+from fnmatch import fnmatchcase
+from .utils import parse_duration, parse_size
+
+CONFIG_PATH = os.path.expanduser("~/.config/rcli/config.ini")
+
+
+def load_config(path=None) -> configparser.ConfigParser:
+    """Read the rcli config file at path (default CONFIG_PATH).
+
+    A missing file gives an empty config. Raises ValueError if the file
+    cannot be parsed.
+    """
+    config = configparser.ConfigParser(interpolation=None)
+    path = path or CONFIG_PATH
+    if not os.path.exists(path):
+        return config
+    try:
+        with open(path, "r") as f:
+            config.read_file(f)
+    except (configparser.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"{path}: {e}") from e
+    return config
+
+
+class ttlpolicy:
+    """Decides how long a cached directory listing stays fresh.
+
+    Rules come from the config file:
+
+        [cache]
+        ttl = 1h
+
+        [remote archive:]
+        ttl = 30d
+        adaptive = yes
+        max_ttl = 180d
+
+        [path scratch:tmp/*]
+        ttl = 1m
+
+    [cache] holds the defaults and each [remote ...] section those for one
+    remote. [path ...] sections match a glob against remote + path (the
+    root of a remote is just "remote:", and * also matches "/"); the first
+    match in file order wins. Each rule may set ttl, adaptive and max_ttl,
+    falling back to the remote's and then the default ones.
+
+    With adaptive on, the ttl doubles for each refresh in a row that
+    found the listing unchanged, up to max_ttl.
+    """
+
+    DEFAULT_TTL = 60 * 60  # 1 hour
+    DEFAULT_MAX_TTL = 7 * 24 * 60 * 60  # Longest an adaptive ttl grows to
+    KEYS = ("ttl", "adaptive", "max_ttl")
+
+    def __init__(self, ttl=DEFAULT_TTL, adaptive=False, max_ttl=DEFAULT_MAX_TTL, remotes=None, paths=None):
+        self.default = {"ttl": ttl, "adaptive": adaptive, "max_ttl": max_ttl}
+        self.remotes = remotes or {}  # remote -> partial rule
+        self.paths = paths or []  # [(glob, partial rule)] in match order
+
+    @staticmethod
+    def _rule(section, name, ignore=()) -> dict:
+        """Parse the rule keys set in one config section, skipping the keys in ignore."""
+        rule = {}
+        for key, value in section.items():
+            if key in ignore:
+                continue
+            if key not in ttlpolicy.KEYS:
+                raise ValueError(f"[{name}]: unknown key {key!r}")
+            try:
+                rule[key] = section.getboolean(key) if key == "adaptive" else parse_duration(value)
+            except ValueError as e:
+                raise ValueError(f"[{name}] {key}: {e}") from e
+        return rule
+
+    @classmethod
+    def fromconfig(cls, config):
+        """Build a policy from a parsed config; None gives the defaults. Raises ValueError."""
+        policy = cls()
+        if config is None:
+            return policy
+        for name in config.sections():
+            section = config[name]
+            if name == "cache":
+                policy.default.update(cls._rule(section, name))
+            elif name.startswith("remote "):
+                # profile is read by transferprofiles
+                policy.remotes[name[len("remote "):].strip()] = cls._rule(section, name, ignore=("profile",))
+            elif name.startswith("path "):
+                policy.paths.append((name[len("path "):].strip(), cls._rule(section, name)))
+        return policy
+
+    def rule(self, remote: str, path: str = "") -> dict:
+        """Return the ttl, adaptive and max_ttl that apply to remote + path."""
+        rule = dict(self.default)
+        rule.update(self.remotes.get(remote, {}))
+        key = remote + path
+        for pattern, override in self.paths:
+            if fnmatchcase(key, pattern):
+                rule.update(override)
+                break
+        return rule
+
+    def ttl(self, remote: str, path: str = "", unchanged: int = 0) -> float:
+        """Return the seconds a listing stays fresh after unchanged identical refreshes."""
+        rule = self.rule(remote, path)
+        if not rule["adaptive"] or unchanged <= 0:
+            return rule["ttl"]
+        grown = rule["ttl"] * 2 ** min(unchanged, 32)
+        return max(rule["ttl"], min(rule["max_ttl"], grown))
+
+
+class transferprofile:
+    """A named set of rclone options that tune downloads and uploads.
+
+    Options left as None keep rclone's own defaults. flags() gives them as
+    command line flags and rcconfig() as the _config of an rc call.
+    """
+
+    # key -> (rclone flag, rc _config name)
+    OPTIONS = {
+        "transfers": ("--transfers", "Transfers"),
+        "checkers": ("--checkers", "Checkers"),
+        "multi_thread_streams": ("--multi-thread-streams", "MultiThreadStreams"),
+        "buffer_size": ("--buffer-size", "BufferSize"),
+        "fast_list": ("--fast-list", "UseListR"),
+    }
+
+    def __init__(self, name, transfers=None, checkers=None, multi_thread_streams=None, buffer_size=None,
+                 fast_list=None):
+        self.name = name
+        self.transfers = transfers
+        self.checkers = checkers
+        self.multi_thread_streams = multi_thread_streams
+        self.buffer_size = buffer_size  # rclone size text, such as "64M"
+        self.fast_list = fast_list
+
+    def options(self) -> dict:
+        """Return the options that are set."""
+        return {key: getattr(self, key) for key in self.OPTIONS if getattr(self, key) is not None}
+
+    def flags(self) -> list[str]:
+        flags = []
+        for key, value in self.options().items():
+            flag = self.OPTIONS[key][0]
+            if key == "fast_list":
+                flags += [flag] if value else []
+            else:
+                flags += [flag, str(value)]
+        return flags
+
+    def rcconfig(self) -> dict:
+        config = {}
+        for key, value in self.options().items():
+            # The daemon takes sizes in bytes
+            config[self.OPTIONS[key][1]] = parse_size(value) if key == "buffer_size" else value
+        return config
+
+    def describe(self) -> str:
+        """Return the name and the flags it adds, for display."""
+        flags = " ".join(self.flags())
+        return f"{self.name} ({flags})" if flags else f"{self.name} (rclone defaults)"
+
+
+class transferprofiles:
+    """The transfer profiles to choose from, and which one each remote uses.
+
+    Built in are "default", which keeps rclone's defaults, and three
+    tuned for common loads. The config file can change them or add more,
+    and pick one for all remotes or per remote:
+
+        [transfers]
+        profile = many-small-files
+
+        [remote archive:]
+        profile = few-huge-files
+
+        [profile few-huge-files]
+        multi_thread_streams = 16
+        buffer_size = 128M
+
+    Each [profile ...] section may set transfers, checkers,
+    multi_thread_streams, buffer_size and fast_list; a built-in profile
+    keeps the options a section does not set.
+    """
+
+    DEFAULT = "default"
+    BUILTIN = {
+        "default": {},
+        # Many files at once, and one recursive listing where the backend can
+        "many-small-files": {"transfers": 16, "checkers": 16, "fast_list": True},
+        # Few files at a time, each read in more parallel chunks with more buffered
+        "few-huge-files": {"transfers": 2, "multi_thread_streams": 8, "buffer_size": "64M"},
+        # One file at a time, so a slow link finishes files rather than timing out
+        "low-bandwidth": {"transfers": 1, "checkers": 2, "multi_thread_streams": 0, "buffer_size": "4M"},
+    }
+    MINIMUM = {"transfers": 1, "checkers": 1, "multi_thread_streams": 0}
+
+    def __init__(self, profiles=None, default=DEFAULT, remotes=None):
+        if profiles is None:
+            profiles = {name: transferprofile(name, **options) for name, options in self.BUILTIN.items()}
+        self.profiles = profiles  # name -> transferprofile, in display order
+        self.default = default
+        self.remotes = remotes or {}  # remote -> profile name
+
+    @staticmethod
+    def _options(section, name) -> dict:
+        """Parse the options set in one [profile ...] section."""
+        options = {}
+        for key, value in section.items():
+            if key not in transferprofile.OPTIONS:
+                raise ValueError(f"[{name}]: unknown key {key!r}")
+            try:
+                if key == "fast_list":
+                    options[key] = section.getboolean(key)
+                elif key == "buffer_size":
+                    parse_size(value)
+                    options[key] = value.strip()
+                else:
+                    options[key] = int(value)
+                    if options[key] < transferprofiles.MINIMUM[key]:
+                        raise ValueError(f"must be at least {transferprofiles.MINIMUM[key]}")
+            except ValueError as e:
+                raise ValueError(f"[{name}] {key}: {e}") from e
+        return options
+
+    @classmethod
+    def fromconfig(cls, config):
+        """Build the profiles from a parsed config; None gives the built-in ones. Raises ValueError."""
+        profiles = cls()
+        if config is None:
+            return profiles
+        for name in config.sections():
+            if name.startswith("profile "):
+                profile = name[len("profile "):].strip()
+                options = dict(cls.BUILTIN.get(profile, {}), **cls._options(config[name], name))
+                profiles.profiles[profile] = transferprofile(profile, **options)
+        for name in config.sections():
+            section = config[name]
+            if name == "transfers":
+                for key in section:
+                    if key != "profile":
+                        raise ValueError(f"[{name}]: unknown key {key!r}")
+                profiles.default = profiles._known(section["profile"], name) if "profile" in section else cls.DEFAULT
+            elif name.startswith("remote ") and "profile" in section:
+                profiles.remotes[name[len("remote "):].strip()] = profiles._known(section["profile"], name)
+        return profiles
+
+    def _known(self, profile: str, section: str) -> str:
+        profile = profile.strip()
+        if profile not in self.profiles:
+            raise ValueError(f"[{section}] profile: unknown profile {profile!r}")
+        return profile
+
+    def names(self) -> list[str]:
+        return list(self.profiles)
+
+    def get(self, name: str) -> transferprofile:
+        return self.profiles[name]
+
+    def forremote(self, remote: str) -> transferprofile:
+        """Return the profile remote uses."""
+        return self.profiles[self.remotes.get(remote, self.default)]
+
+    def next(self, profile) -> transferprofile:
+        """Return the profile after profile (the first after None), wrapping around."""
+        names = self.names()
+        index = names.index(profile.name) if profile is not None and profile.name in names else -1
+        return self.profiles[names[(index + 1) % len(names)]]
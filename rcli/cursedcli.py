@@ -6,6 +6,8 @@ from .enums import SCENES
 from .forms import *
 from .scenes import *
 from .rclone import *
+from .transfer import transfermanager
+from .config import transferprofiles
 from . import __version__
 try:
     from ._buildinfo import BUILD_YEAR
@@ -16,11 +18,19 @@ import logging
 
 
 class cursedcli:
-    def __init__(self, remote, no_index=False):
+    def __init__(self, remote, no_index=False, rcd=False, search_processes=0, ttl_policy=None,
+                 jobs=transfermanager.CONCURRENCY, profiles=None):
         self.stdscr = curses.initscr()
         self.remote = remote
         self.no_index = no_index
+        self.rcd = rcd
+        self.search_processes = search_processes
+        self.ttl_policy = ttl_policy
+        self.jobs = jobs  # Transfers run at once in the background
+        self.profiles = profiles if profiles is not None else transferprofiles()
         self._search_index = None
+        self._backend = None
+        self._transfers = None
 
     def start(self):
         curses.noecho()
@@ -40,6 +50,19 @@ class cursedcli:
         if curses.is_term_resized(rows, cols):
             curses.resizeterm(rows, cols)
 
+    def _get_backend(self):
+        """Return the rclone backend, starting the rcd daemon on first use if requested."""
+        if self._backend is None:
+            if self.rcd:
+                daemon = rclonercd()
+                if daemon.start():
+                    self._backend = daemon
+                else:
+                    logging.warning("Falling back to one rclone process per call")
+            if self._backend is None:
+                self._backend = rclone()
+        return self._backend
+
     def _test_connection(self):
         """Run connection test with loading animation. Returns True if connected."""
         content = [
@@ -60,16 +83,16 @@ class cursedcli:
         ]
 
         class ConnTestThread(Thread):
-            def __init__(self, remote):
+            def __init__(self, remote, rc):
                 Thread.__init__(self)
                 self.remote = remote
+                self.rc = rc
                 self.connected = False
 
             def run(self):
-                rc = rclone()
-                self.connected = rc.test_connection(self.remote, timeout=10)
+                self.connected = self.rc.test_connection(self.remote, timeout=10)
 
-        conn_test = ConnTestThread(self.remote)
+        conn_test = ConnTestThread(self.remote, self._get_backend())
         conn_test.daemon = True
         conn_test.start()
         self.stdscr.timeout(100)
@@ -101,7 +124,7 @@ class cursedcli:
         # If no remote specified, start with remote picker
         if self.remote is None:
             check_rclone_available()
-            rc = rclone()
+            rc = self._get_backend()
             self.stdscr.erase()
             loadingforum("Querying remotes...").draw(self.stdscr)
             self.stdscr.refresh()
@@ -123,16 +146,23 @@ class cursedcli:
         if not self._test_connection():
             return
 
-        cache = rclonecache()
+        cache = rclonecache(self._get_backend(), policy=self.ttl_policy)
 
         # Start background search index (unless disabled via --no-index)
         index = None
         if not self.no_index:
-            index = searchindex(self.remote)
+            index = searchindex(
+                self.remote, cacheDir=cache.cacheDir, backend=cache.rclone, cache=cache
+            )
             index.start()
             self._search_index = index
 
-        scene = choosefilescene(self.remote, cache)
+        transfers = transfermanager(
+            cache.rclone, concurrency=self.jobs, profile=self.profiles.forremote(self.remote)
+        )
+        self._transfers = transfers
+
+        scene = choosefilescene(self.remote, cache, transfers=transfers)
         while True:
             self._handle_resize()
             self.stdscr.erase()
@@ -141,7 +171,10 @@ class cursedcli:
 
             nextScene: Optional[int] = scene.getNextScene()
             if nextScene == SCENES.FUZZY_SEARCH:
-                scene = fuzzyscene(self.remote, cache, scene.folderDir if hasattr(scene, 'folderDir') else [], index)
+                scene = fuzzyscene(
+                    self.remote, cache, scene.folderDir if hasattr(scene, 'folderDir') else [],
+                    index, processes=self.search_processes,
+                )
 
             if nextScene == SCENES.CHOOSE_FILE:
                 filePath = scene.getdata()
@@ -155,28 +188,21 @@ class cursedcli:
                         initialFolder = initialFolder[:-1]
                 else:
                     initialFolder = scene.folderDir if hasattr(scene, 'folderDir') else []
-                scene = choosefilescene(self.remote, cache, initialFolder)
-
-            if nextScene == SCENES.DOWNLOAD:
-                downloadPath: str = self.remote + scene.getdata()[0]
-                folderDir = scene.folderDir
-
-                # If a folder
-                if scene.getdata()[1]:
-                    scene = downloadscene(downloadPath, scene.getdata()[0], folderDir)
-                else:
-                    scene = downloadscene(downloadPath, ".", folderDir)
+                scene = choosefilescene(self.remote, cache, initialFolder, transfers=transfers)
 
             if nextScene == SCENES.UPLOAD:
                 folderDir = scene.folderDir if hasattr(scene, 'folderDir') else []
-                scene = uploadscene(self.remote, cache, folderDir)
+                scene = uploadscene(self.remote, cache, transfers, folderDir, search_index=index)
+
+            if nextScene == SCENES.TRANSFERS:
+                scene = transferscene(transfers, scene.folderDir, profiles=self.profiles)
 
             if nextScene == SCENES.REFRESH_DATABASE:
                 loadingforum("Refreshing cache, please be patient.").draw(self.stdscr)
                 oldFolder = scene.folderDir
                 self.stdscr.refresh()
                 cache.invalidate(self.remote, "/".join(oldFolder) + "/" if oldFolder else "")
-                scene = choosefilescene(self.remote, cache, oldFolder)
+                scene = choosefilescene(self.remote, cache, oldFolder, transfers=transfers)
 
             if nextScene == SCENES.EXIT:
                 break
@@ -185,6 +211,11 @@ class cursedcli:
         # Kill background search index subprocess if still running
         if self._search_index is not None:
             self._search_index.stop()
+        # Don't leave rclone copying after rcli is gone
+        if self._transfers is not None:
+            self._transfers.cancel_all()
+        if isinstance(self._backend, rclonercd):
+            self._backend.stop()
         curses.nocbreak()
         self.stdscr.keypad(False)
         curses.echo()
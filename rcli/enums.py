@@ -6,6 +6,7 @@ class CHOICE:
     REFRESH = 0b0001000
     QUIT = 0b0010000
     UPLOAD = 0b0100000
+    TRANSFERS = 0b1000000
 
 
 class SelectedOption:
@@ -17,8 +18,8 @@ class SelectedOption:
 class SCENES:
     CHOOSE_FILE = 0b00001
     FUZZY_SEARCH = 0b00010
-    DOWNLOAD = 0b00100
     REFRESH_DATABASE = 0b01000
     EXIT = 0b10000
     UPLOAD = 0b100000
     REMOTE_PICKER = 0b1000000
+    TRANSFERS = 0b10000000
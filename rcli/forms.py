@@ -43,33 +43,93 @@ class loadingforum(forum):
         return None
 
 
-class commandforum(forum):
-    def __init__(self, command: list[str]):
+class transferforum(forum):
+    """Shows a transfer's progress; getdata() is True once it has finished."""
+
+    def __init__(self, transfer, title: str):
         super().__init__(None)
-        self.commandcomponent = commandcomponent(command)
-        self.components = [self.commandcomponent]
+        self.transfer = transfer
+        self.transfercomponent = transfercomponent(transfer, title)
+        self.bar = textcomponent("[q] cancel", textcomponent.BOTTOM | textcomponent.BAR)
+        self.components = [self.transfercomponent, self.bar]
 
     def draw(self, stdscr):
+        if self.transfer.is_done():
+            self.bar.text = "Done" if self.transfer.succeeded() else "Failed   [enter] back"
         for component in self.components:
             component.draw(stdscr)
 
     def getdata(self):
-        if self.commandcomponent.isDone:
+        if self.transfer.is_done():
             return True
         return None
 
 
+class jobsforum(forum):
+    """The background transfers, with their combined progress in the header.
+
+    Below it is the profile new transfers get; with switchable set the
+    bar offers [f] to change it.
+    """
+
+    def __init__(self, manager, registerKeyFunc, switchable=False):
+        super().__init__(registerKeyFunc)
+        self.manager = manager
+        self.header = textcomponent("Transfers", textcomponent.NONE, (1, 1))
+        self.profileline = textcomponent("", textcomponent.NONE, (1, 2))
+        self.jobscomponent = jobscomponent(manager, offset=(1, 4))
+        keys = "[enter] details   [x] cancel   [KJ] move in queue   [c] clear ended   "
+        if switchable:
+            keys += "[f] profile   "
+        self.components = [
+            self.header,
+            self.profileline,
+            self.jobscomponent,
+            textcomponent(keys + "[jk] up/down   [esc] back", textcomponent.BOTTOM | textcomponent.BAR),
+        ]
+
+        for co in self.components:
+            registerKeyFunc(co.handleinput)
+
+    def headertext(self) -> str:
+        summary = format_transfers(self.manager)
+        if summary is None:
+            return "Transfers"
+        text = f"Transfers: {summary}"
+        stats = self.manager.stats()
+        if stats.total_bytes:
+            text += f" · {format_size(stats.bytes)} / {format_size(stats.total_bytes)}"
+        if stats.eta is not None:
+            text += f" · ETA {format_duration(stats.eta)}"
+        return text
+
+    def draw(self, stdscr):
+        self.header.text = self.headertext()
+        profile = self.manager.profile
+        self.profileline.text = f"New transfers: {profile.describe()}" if profile is not None else ""
+        for component in self.components:
+            component.draw(stdscr)
+
+    def getdata(self):
+        """Return the job opened with enter, if any."""
+        return self.jobscomponent.opened
+
+
 class choiceforum(forum):
     def __init__(self, options, back: bool, extra: str, registerKeyFunc):
         super().__init__(registerKeyFunc)
         self.options = options
         self.choiceComponent = choicecomponent(self.options, back, brect(1, 3, 20, 20))
+        self.extra = extra
+        self.header = textcomponent(extra, textcomponent.NONE, (1, 1))
+        self._status = None
+        self._transfers = None
         self._layout_computed = False
         self.components = [
             self.choiceComponent,
-            textcomponent(extra, textcomponent.NONE, (1, 1)),
+            self.header,
             textcomponent(
-                "[d]ownload   [p]ut/upload   [u] refresh   [/] search    [jk] up/down   [h] back    [q] quit",
+                "[d]ownload   [space] mark   [p]ut/upload   [t]ransfers   [u] refresh   [/] search    [jk] up/down   [h] back    [q] quit",
                 textcomponent.BOTTOM | textcomponent.BAR,
             ),
         ]
@@ -90,6 +150,30 @@ class choiceforum(forum):
         for component in self.components:
             component.draw(stdscr)
 
+    def setoptions(self, options):
+        """Replace the listed entries in place, keeping the cursor where it was."""
+        self.options = options
+        self.choiceComponent.setchoices(options)
+
+    def setstatus(self, text):
+        """Show text after the header, or clear it with None."""
+        self._status = text
+        self._setheader()
+
+    def settransfers(self, text):
+        """Show a summary of the background transfers after the header, or clear it with None."""
+        self._transfers = text
+        self._setheader()
+
+    def _setheader(self):
+        self.header.text = self.extra + "".join(
+            f"  [{text}]" for text in (self._status, self._transfers) if text is not None
+        )
+
+    def clearchoice(self):
+        """Forget the choice made, so the forum can take another."""
+        self.choiceComponent.choice = SelectedOption()
+
     def getdata(self):
         if self.choiceComponent.getChoice().choice != CHOICE.NONE:
             return self.choiceComponent.getChoice()
@@ -98,14 +182,17 @@ class choiceforum(forum):
 
 
 class fuzzyforum(forum):
-    def __init__(self, pathList, registerKeyFunc, partial=False):
+    def __init__(self, pathList, registerKeyFunc, partial=False, index=None, processes=0):
         super().__init__(registerKeyFunc)
-        self.fuzzycomponent = fuzzycomponent(pathList, offset=(1, 2))
+        self.fuzzycomponent = fuzzycomponent(
+            pathList, offset=(1, 2), index=index, processes=processes
+        )
         bar_text = "[esc] back   [!] showing visited paths only" if partial else "[esc] back"
+        self.bar = textcomponent(bar_text, textcomponent.BOTTOM | textcomponent.BAR)
         self.components = [
             textcomponent("Search file: ", textcomponent.NONE, (1, 1)),
             self.fuzzycomponent,
-            textcomponent(bar_text, textcomponent.BOTTOM | textcomponent.BAR),
+            self.bar,
         ]
 
         for co in self.components:
@@ -115,6 +202,16 @@ class fuzzyforum(forum):
         for component in self.components:
             component.draw(stdscr)
 
+    def setpartial(self, text):
+        """Show text in the bottom bar as a partial-results notice, or clear it with None."""
+        self.bar.text = text if text is not None else "[esc] back"
+
+    def searching(self) -> bool:
+        return self.fuzzycomponent.searching()
+
+    def stop(self):
+        self.fuzzycomponent.stop()
+
     def getdata(self):
         if self.fuzzycomponent.choice != None:
             return self.fuzzycomponent.choice
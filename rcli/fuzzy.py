@@ -0,0 +1,625 @@
+import heapq
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate, compress, islice, repeat
+from operator import add, eq, itemgetter, mul, or_
+
+
+def iterrange(data, start: int, stop: int):
+    """Iterate data[start:stop] without copying when data supports it."""
+    if hasattr(data, "iterrange"):
+        return data.iterrange(start, stop)
+    return islice(data, start, stop)
+
+
+class searchcancelled(Exception):
+    """Raised inside a search that a newer query has superseded."""
+
+
+CHECK_EVERY = 2048  # Paths visited between cancellation checks
+
+
+def checked(iterable, cancelled):
+    """Iterate iterable, raising searchcancelled once cancelled() turns true."""
+    if cancelled is None:
+        return iterable
+    return _checked(iterable, cancelled)
+
+
+def _checked(iterable, cancelled):
+    for n, item in enumerate(iterable):
+        if n % CHECK_EVERY == 0 and cancelled():
+            raise searchcancelled()
+        yield item
+
+
+BLOCK = 4096  # Paths decoded together when enough of them are wanted
+
+
+def _decoded(data, ids, cancelled=None):
+    """Yield (chunk, paths) over ascending ids: successive runs of ids and their paths.
+
+    A range scans data outright. Blocks of BLOCK paths where at least an
+    tenth are wanted are decoded in one go, and the scattered ids in
+    between one at a time.
+    """
+    pos, count = 0, len(ids)
+    while pos < count:
+        if cancelled is not None and cancelled():
+            raise searchcancelled()
+        lo = ids[pos] - ids[pos] % BLOCK
+        end = bisect_left(ids, lo + BLOCK, pos)
+        chunk = ids[pos:end]
+        hi = min(lo + BLOCK, len(data))
+        if len(chunk) == hi - lo:
+            paths = list(iterrange(data, lo, hi))
+        elif len(chunk) * 10 >= BLOCK:
+            block = list(iterrange(data, lo, hi))
+            paths = [block[i - lo] for i in chunk]
+        else:
+            paths = [data[i] for i in chunk]
+        yield chunk, paths
+        pos = end
+
+
+def containing(keyword: str, data, ids, cancelled=None) -> list[int]:
+    """Return the ids, ascending, of the paths in data whose lowercase form contains keyword.
+
+    ids must be ascending; a range scans all of data between its bounds.
+    """
+    found = []
+    for chunk, paths in _decoded(data, ids, cancelled):
+        found += [i for i, path in zip(chunk, paths) if keyword in path.lower()]
+    return found
+
+
+def lowercased(data, ids, cancelled=None) -> list[str]:
+    """Return the lowercase paths of data at ascending ids."""
+    lowered = []
+    for _, paths in _decoded(data, ids, cancelled):
+        lowered += map(str.lower, paths)
+    return lowered
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# Scoring weights, loosely following fzf's
+SCORE_MATCH = 16  # Per matched character
+BONUS_BOUNDARY = 8  # Match starts a path segment or word
+BONUS_CAMEL = 7  # Match starts at a lower-to-upper case change
+BONUS_FIRST_CHAR_MULTIPLIER = 2  # Applied to the boundary bonus of a match
+BONUS_BASENAME = 16  # Match lies in the last path component
+BONUS_EXACT_NAME = 32  # Keyword is the whole basename, or the basename minus extension
+BONUS_CONSECUTIVE = 4  # Per character, when a keyword directly follows the previous one
+MAX_OCCURRENCES = 8  # Occurrences of a keyword considered per path
+DELIMITERS = "/_-. "
+
+
+def _boundary_bonus(path: str, pos: int) -> int:
+    if pos == 0:
+        return BONUS_BOUNDARY
+    before = path[pos - 1]
+    if before in DELIMITERS:
+        return BONUS_BOUNDARY
+    if before.islower() and path[pos].isupper():
+        return BONUS_CAMEL
+    return 0
+
+
+def score_path(path: str, keywords: list[str]) -> int:
+    """Score how well path matches lowercase keywords; higher is better.
+
+    Each keyword that occurs in the path scores by length, with bonuses for
+    starting at a word or path-segment boundary, for falling in the
+    basename, for being the basename, and for directly following the
+    previous keyword so that typed runs like "photos 2024" favour
+    "photos/2024". The best occurrence of each keyword counts.
+    """
+    lower = path.lower()
+    if len(lower) != len(path):
+        # Lowercasing changed the length ("İ" becomes two code points), so
+        # positions in lower don't index path; score lower alone, without
+        # the camel-case bonus
+        path = lower
+    trimmed = lower.rstrip("/")
+    name_start = trimmed.rfind("/") + 1
+
+    total = 0
+    prev_end = None
+    for kw in keywords:
+        pos = lower.find(kw)
+        if pos == -1:
+            continue
+        consecutive = BONUS_CONSECUTIVE * len(kw)
+        # No occurrence can score more than this, so stop looking once reached
+        ceiling = BONUS_BOUNDARY * BONUS_FIRST_CHAR_MULTIPLIER + BONUS_BASENAME
+        if prev_end is not None:
+            ceiling += consecutive
+        best = -1
+        best_end = None
+        seen = 0
+        while pos != -1 and seen < MAX_OCCURRENCES:
+            bonus = _boundary_bonus(path, pos) * BONUS_FIRST_CHAR_MULTIPLIER
+            if pos >= name_start:
+                bonus += BONUS_BASENAME
+            if prev_end is not None and 0 <= pos - prev_end <= 1:
+                bonus += consecutive
+            if bonus > best:
+                best = bonus
+                best_end = pos + len(kw)
+                if best == ceiling:
+                    break
+            pos = lower.find(kw, pos + 1)
+            seen += 1
+        best += SCORE_MATCH * len(kw)
+        if trimmed.startswith(kw, name_start):
+            name = trimmed[name_start:]
+            if kw == name or kw == name.rsplit(".", 1)[0]:
+                best += BONUS_EXACT_NAME
+        total += best
+        prev_end = best_end
+    return total
+
+
+def score_bounds(paths, keywords: list[str], everywhere=False) -> list[int]:
+    """Return an upper bound on score_path() for each of paths.
+
+    Counts every bonus a keyword could get except the boundary bonus, which
+    is assumed, and the basename and exact-name bonuses, which are checked.
+    everywhere says each keyword is known to occur in every path. Built
+    from whole-list string operations rather than a loop per path, so
+    bounding every candidate of a large group stays cheap.
+    """
+    names = list(map(str.lower, map(itemgetter(2), map(str.rpartition, map(str.rstrip, paths, repeat("/")), repeat("/")))))
+    lowered = None if everywhere else list(map(str.lower, paths))
+    common = 0  # Bound every path gets
+    bounds = None if everywhere else [0] * len(names)
+    earlier = None  # Whether an earlier keyword occurs in each path, or None if none did yet
+    for kw in keywords:
+        full = SCORE_MATCH * len(kw) + BONUS_BOUNDARY * BONUS_FIRST_CHAR_MULTIPLIER
+        consecutive = BONUS_CONSECUTIVE * len(kw)
+        if everywhere:
+            common += full if earlier is None else full + consecutive
+            found = earlier = True
+        else:
+            found = list(map(str.__contains__, lowered, repeat(kw)))
+            if earlier is None:
+                bounds = [b + full * f for b, f in zip(bounds, found)]
+                earlier = found
+            else:
+                bounds = [b + (full + consecutive * e) * f for b, f, e in zip(bounds, found, earlier)]
+                earlier = list(map(or_, found, earlier))
+        if "/" in kw:
+            # May run on into a directory's trailing "/", which names leave out
+            inname = [found] * len(names) if everywhere else found
+        else:
+            inname = map(str.__contains__, names, repeat(kw))
+        if bounds is None:
+            bounds = [BONUS_BASENAME * x for x in inname]
+        else:
+            bounds = [b + BONUS_BASENAME * x for b, x in zip(bounds, inname)]
+        # The whole basename, or the basename minus extension; rare enough to check one by one
+        exact = map(or_, map(eq, names, repeat(kw)), map(str.startswith, names, repeat(kw + ".")))
+        for j in compress(range(len(names)), exact):
+            if kw == names[j].rsplit(".", 1)[0] or kw == names[j]:
+                bounds[j] += BONUS_EXACT_NAME
+    return [b + common for b in bounds] if common else bounds
+
+
+# Ranks within a count group packed into one int, ordered as (score, -len(path), -id)
+RANK_SPAN = 1 << 32
+
+
+def _best(ids, keywords: list[str], data, limit: int, cancelled=None, everywhere=False) -> list:
+    """Return [(score, path length, id)] for the best limit of ids, best first.
+
+    Every candidate gets a cheap bound from score_bounds(), passed
+    everywhere. Candidates are then scored in full in order of bound,
+    shorter paths first within one, until the next bound cannot beat the
+    worst of the limit best scored so far.
+    """
+    mask = RANK_SPAN - 1
+    bounds = []
+    keys = []  # (path length, id) packed, so the shortest sorts first
+    for chunk, paths in _decoded(data, ids, cancelled):
+        bounds += score_bounds(paths, keywords, everywhere)
+        keys += map(add, map(mul, map(len, paths), repeat(RANK_SPAN)), chunk)
+
+    best = []  # Min-heap of the limit best packed ranks so far
+    n = 0
+    # Bounds take few distinct values; split each tier out only once it is reached
+    for bound in sorted(set(bounds), reverse=True):
+        tier = list(compress(keys, map(eq, bounds, repeat(bound))))
+        heapq.heapify(tier)
+        while tier:
+            length, i = divmod(tier[0], RANK_SPAN)
+            if len(best) >= limit and (bound * RANK_SPAN + mask - length) * RANK_SPAN + mask - i <= best[0]:
+                # Nothing left here or in a lower tier can make it
+                tier = None
+                break
+            heapq.heappop(tier)
+            n += 1
+            if cancelled is not None and n % CHECK_EVERY == 0 and cancelled():
+                raise searchcancelled()
+            path = data[i]
+            rank = (score_path(path, keywords) * RANK_SPAN + mask - len(path)) * RANK_SPAN + mask - i
+            if len(best) < limit:
+                heapq.heappush(best, rank)
+            elif rank > best[0]:
+                heapq.heapreplace(best, rank)
+        if tier is None:
+            break
+
+    result = []
+    for rank in sorted(best, reverse=True):
+        rest, i = divmod(rank, RANK_SPAN)
+        value, length = divmod(rest, RANK_SPAN)
+        result.append((value, mask - length, mask - i))
+    return result
+
+
+def _escape(gap: int) -> bytes:
+    """Encode a posting gap of 256 or more: a 0 byte, then four base-255 digits plus one."""
+    return bytes((0, gap % 255 + 1, gap // 255 % 255 + 1, gap // 65025 % 255 + 1, gap // 16581375 + 1))
+
+
+class trigramindex:
+    """Inverted index from lowercase trigrams to the ids of paths containing them.
+
+    Built over an append-only sequence of paths (a list or pathstore); call
+    update() after appending to index the new tail. A keyword of three or
+    more characters only has to be checked against paths that contain all
+    of its trigrams. Queries may run on another thread while update() runs:
+    ids past the last completed update are scanned directly instead.
+
+    Each trigram's ids are stored as the gaps between them, one byte per gap
+    below 256 and five bytes for a larger one, so a posting costs little
+    more than a byte: about 40 bytes per path for typical paths, against
+    130 as an array of 4-byte ids. Decoding runs in C via accumulate()
+    between the escaped gaps. Indexing takes about 18 s per million paths.
+    """
+
+    def __init__(self, paths):
+        self.paths = paths
+        self._postings = {}  # trigram -> [bytearray of id gaps, last id]
+        self._count = 0  # Paths fully indexed
+
+    def __len__(self):
+        return self._count
+
+    def nbytes(self) -> int:
+        """Return the size of the encoded postings, in bytes."""
+        return sum(len(entry[0]) for entry in list(self._postings.values()))
+
+    def covers(self, data) -> bool:
+        """Return True if data is (a prefix or extension of) the indexed paths."""
+        if data is self.paths:
+            return True
+        return getattr(data, "store", None) is self.paths
+
+    def extended(self, paths):
+        """Return an index over paths, which must begin with the paths indexed here.
+
+        The postings are shared rather than copied, so only the paths past
+        the shared prefix are indexed by the new index's update(). This
+        index must not be updated again afterwards; searching it stays safe.
+        """
+        index = trigramindex(paths)
+        index._postings = self._postings
+        index._count = self._count
+        return index
+
+    def update(self, limit=None):
+        """Index paths appended since the last update, at most limit of them."""
+        postings = self._postings
+        start = self._count
+        stop = len(self.paths)
+        if limit is not None:
+            stop = min(stop, start + limit)
+        for i, path in enumerate(iterrange(self.paths, start, stop), start):
+            for gram in trigrams(path.lower()):
+                entry = postings.get(gram)
+                if entry is None:
+                    # The first gap is counted from -1, so no gap is ever 0
+                    postings[gram] = entry = [bytearray(), -1]
+                gap = i - entry[1]
+                entry[1] = i
+                if gap < 256:
+                    entry[0].append(gap)
+                else:
+                    entry[0] += _escape(gap)
+        self._count = stop
+
+    def _decode(self, gram: str) -> array:
+        """Return the ascending ids posted for gram."""
+        ids = array("I")
+        entry = self._postings.get(gram)
+        if entry is None:
+            return ids
+        gaps = bytes(entry[0])  # A snapshot; update() may append meanwhile
+        pos, last, n = 0, -1, len(gaps)
+        while pos < n:
+            escape = gaps.find(0, pos)
+            stop = n if escape == -1 else escape
+            if stop > pos:
+                ids.extend(islice(accumulate(gaps[pos:stop], initial=last), 1, None))
+                last = ids[-1]
+            if escape == -1:
+                break
+            d0, d1, d2, d3 = gaps[escape + 1:escape + 5]
+            last += (d0 - 1) + (d1 - 1) * 255 + (d2 - 1) * 65025 + (d3 - 1) * 16581375
+            ids.append(last)
+            pos = escape + 5
+        return ids
+
+    def _candidates(self, keyword: str, limit: int):
+        """Ids below limit whose path has every trigram of keyword, or None if keyword is too short."""
+        grams = trigrams(keyword)
+        if not grams:
+            return None
+        postings = self._postings
+        # The encoded size orders the lists closely enough to start from the shortest
+        grams = sorted(grams, key=lambda g: len(postings[g][0]) if g in postings else 0)
+        result = set(self._decode(grams[0]))
+        for gram in grams[1:]:
+            if not result:
+                break
+            result.intersection_update(self._decode(gram))
+        return sorted(i for i in result if i < limit)
+
+    def search(self, keyword: str, data, cancelled=None) -> list[int]:
+        """Return ascending ids of paths in data whose lowercase form contains keyword.
+
+        keyword must already be lowercase. If given, cancelled is polled
+        while scanning and the search raises searchcancelled once it is true.
+        """
+        n = len(data)
+        indexed = min(self._count, n)
+        ids = self._candidates(keyword, indexed)
+        if ids is None:
+            return containing(keyword, data, range(n), cancelled)
+        if len(keyword) == 3:
+            # The keyword is its own only trigram; every candidate matches
+            matches = ids
+        else:
+            matches = containing(keyword, data, ids, cancelled)
+        matches.extend(containing(keyword, data, range(indexed, n), cancelled))
+        return matches
+
+
+class fuzzymatcher:
+    """Ranks paths against a space-separated query, reusing work between keystrokes.
+
+    Keeps a stack of frames, one per query typed so far, each holding the
+    ids matching every keyword. Typing extends a keyword, and a path that
+    contains the longer keyword also contains the shorter one, so only the
+    previous frame's ids are re-checked. Backspace pops back to the frame
+    already computed for that prefix.
+
+    Once a keyword matches at most KEEP_LOWERED paths, its frame also keeps
+    their lowercase forms, so the next keystroke filters those strings
+    without decoding any paths.
+    """
+
+    KEEP_LOWERED = 65536
+
+    def __init__(self, index: trigramindex):
+        self.index = index
+        # [(query, {keyword: array of ids}, len(data), {keyword: lowercase paths or None})]
+        self._stack = []
+
+    def reset(self):
+        self._stack.clear()
+
+    @staticmethod
+    def keywords(query: str) -> list[str]:
+        return [kw.lower() for kw in query.split(" ") if kw]
+
+    def _narrow(self, kw, prev, prev_lowered, prev_n, data, n, cancelled):
+        """Return (ids, lowered) for the paths in data[:n] containing kw, starting from prev where possible.
+
+        lowered holds the lowercase path of each id, or is None.
+        """
+        lowered = None
+        if kw in prev:
+            ids = array("I", prev[kw])
+            if prev_lowered.get(kw) is not None:
+                lowered = list(prev_lowered[kw])
+        else:
+            # Any path containing kw also contains each of its substrings
+            parents = [p for p in prev if p in kw]
+            if not parents:
+                return array("I", self.index.search(kw, data, cancelled)), None
+            parent = max(parents, key=len)
+            candidates = prev[parent]
+            if prev_lowered.get(parent) is None and len(candidates) <= self.KEEP_LOWERED:
+                # Costs about what checking them would; later keystrokes reuse it
+                prev_lowered[parent] = lowercased(data, candidates, cancelled)
+            if prev_lowered.get(parent) is None:
+                ids = array("I", containing(kw, data, candidates, cancelled))
+            else:
+                found = [kw in path for path in prev_lowered[parent]]
+                ids = array("I", compress(candidates, found))
+                lowered = list(compress(prev_lowered[parent], found))
+        if prev_n < n:
+            tail = containing(kw, data, range(prev_n, n), cancelled)
+            ids.extend(tail)
+            if lowered is not None:
+                lowered += lowercased(data, tail, cancelled)
+        return ids, lowered
+
+    def match(self, query: str, data, cancelled=None) -> dict:
+        """Return {keyword: ascending ids of paths containing it} for query.
+
+        A cancelled match raises searchcancelled and leaves the frames
+        already computed intact.
+        """
+        n = len(data)
+        while self._stack and not query.startswith(self._stack[-1][0]):
+            self._stack.pop()
+        depth = len(self._stack)
+        if self._stack and self._stack[-1][0] == query:
+            if self._stack[-1][2] == n:
+                return self._stack[-1][1]
+            # Same query, but more paths have been indexed since
+            _, prev, prev_n, prev_lowered = self._stack[-1]
+            depth -= 1
+        elif self._stack:
+            _, prev, prev_n, prev_lowered = self._stack[-1]
+        else:
+            prev, prev_n, prev_lowered = {}, 0, {}
+
+        matches = {}
+        lowered = {}
+        for kw in self.keywords(query):
+            if kw not in matches:
+                matches[kw], lowered[kw] = self._narrow(kw, prev, prev_lowered, prev_n, data, n, cancelled)
+        del self._stack[depth:]
+        self._stack.append((query, matches, n, lowered))
+        return matches
+
+    def search(self, query: str, data, limit: int, cancelled=None) -> list[int]:
+        """Return the ids of the best limit paths for query, best first.
+
+        Paths containing more keywords rank first, then by score_path(),
+        then shorter paths. Paths matching no keyword fill any remaining
+        slots in index order. Only the count groups that can reach the top
+        limit are scored, and only those limit results are ever ordered.
+        """
+        return [i for _, i in self.top(query, data, limit, cancelled)]
+
+    def top(self, query: str, data, limit: int, cancelled=None, offset=0) -> list:
+        """Return search() results as [(rank, id)] with ids shifted by offset.
+
+        rank is a tuple that orders results across separately searched
+        shards of a larger sequence, where data starts at id offset.
+        """
+        keywords = self.keywords(query)
+        matches = self.match(query, data, cancelled)
+        if len(matches) == 1:
+            groups = [(len(keywords), next(iter(matches.values())))]
+        else:
+            counts = Counter()
+            for kw in keywords:
+                counts.update(matches[kw])
+            # Built lazily: the walk below rarely gets past the first few
+            groups = (
+                (count, sorted(compress(counts, map(count.__eq__, counts.values()))))
+                for count in range(len(keywords), 0, -1)
+            )
+
+        # Walk count groups from most keywords matched down until limit is covered
+        ranked = []
+        for count, ids in groups:
+            if len(ranked) >= limit:
+                break
+            ranked.extend(
+                ((count, value, -length, -(i + offset)), i + offset)
+                for value, length, i in _best(
+                    ids, keywords, data, limit - len(ranked), cancelled, everywhere=count == len(keywords)
+                )
+            )
+
+        if len(ranked) < limit:
+            matched = {i for _, i in ranked}
+            for i in range(offset, offset + len(data)):
+                if i not in matched:
+                    ranked.append(((0, 0, 0, -i), i))
+                    if len(ranked) >= limit:
+                        break
+        return ranked
+
+
+class searchworker:
+    """Runs search jobs on a background thread, newest job wins.
+
+    submit() hands over a job and returns at once. A job still running for
+    an older submission is abandoned at its next cancellation check, and one
+    that has not started yet is dropped. The result of the latest finished
+    job is picked up with poll(). Jobs are called as job(cancelled), where
+    cancelled() turns true once the job has been superseded.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._job = None
+        self._generation = 0  # Bumped by every submit()
+        self._result = None  # (generation, result) not yet polled
+        self._busy = False
+        self._stopped = False
+        self._thread = None
+
+    def submit(self, job) -> int:
+        """Queue job, superseding any earlier one. Return its generation."""
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("searchworker is stopped")
+            self._generation += 1
+            self._job = job
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            return self._generation
+
+    def poll(self):
+        """Return (generation, result) of the latest finished job once, else None."""
+        with self._cond:
+            result, self._result = self._result, None
+            return result
+
+    def is_busy(self) -> bool:
+        """Return True while a submitted job is queued or running."""
+        with self._cond:
+            return self._busy or self._job is not None
+
+    def wait(self, timeout=None) -> bool:
+        """Block until every submitted job is done. Return False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._busy and self._job is None, timeout)
+
+    def stop(self, wait=False):
+        """Cancel any running job and end the worker thread.
+
+        With wait, block until the thread has exited.
+        """
+        with self._cond:
+            self._stopped = True
+            self._job = None
+            self._cond.notify_all()
+            thread = self._thread
+        if wait and thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._job is not None or self._stopped)
+                if self._stopped:
+                    return
+                job, generation = self._job, self._generation
+                self._job = None
+                self._busy = True
+
+            def cancelled():
+                return self._stopped or self._generation != generation
+
+            try:
+                result = job(cancelled)
+                done = True
+            except searchcancelled:
+                done = False
+            except Exception:
+                logging.exception("Fuzzy search failed")
+                done = False
+
+            with self._cond:
+                self._busy = False
+                if done and not cancelled():
+                    self._result = (generation, result)
+                self._cond.notify_all()
@@ -0,0 +1,124 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+
+def estimate_size(obj) -> int:
+    """Roughly estimate the memory used by obj in bytes.
+
+    Follows lists, tuples and dicts (keys and values); everything else is
+    counted with sys.getsizeof. Good enough to budget parsed lsjson listings.
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += estimate_size(key) + estimate_size(value)
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            size += estimate_size(item)
+    return size
+
+
+class lrucache:
+    """Thread-safe least-recently-used cache bounded by an estimated byte size.
+
+    Each value is stored with the time it was produced. Values older than
+    ttl seconds are treated as missing by get(), and are the first to go
+    when room has to be made for a new value.
+    """
+
+    def __init__(self, max_bytes: int, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._items = OrderedDict()  # key -> (value, size, timestamp)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expired(self, timestamp, now) -> bool:
+        return self.ttl is not None and now - timestamp > self.ttl
+
+    def _remove(self, key):
+        _, size, _ = self._items.pop(key)
+        self._bytes -= size
+
+    def get(self, key):
+        """Return the value for key, or None if missing or expired."""
+        item = self.lookup(key)
+        return item[0] if item is not None else None
+
+    def lookup(self, key):
+        """Return (value, timestamp) for key, or None if missing or expired."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            if self._expired(item[2], time.time()):
+                self._remove(key)
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0], item[2]
+
+    def put(self, key, value, timestamp=None):
+        """Store value under key, evicting expired then least-recently-used values."""
+        if timestamp is None:
+            timestamp = time.time()
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            if size > self.max_bytes:
+                # Would evict everything else and still not fit
+                return
+            self._items[key] = (value, size, timestamp)
+            self._bytes += size
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, (_, _, ts) in self._items.items() if self._expired(ts, now)]:
+            self._remove(key)
+            self.evictions += 1
+        while self._bytes > self.max_bytes:
+            key = next(iter(self._items))
+            self._remove(key)
+            self.evictions += 1
+
+    def pop(self, key):
+        """Remove key if present."""
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Return entry count, byte usage and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
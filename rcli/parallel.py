@@ -0,0 +1,164 @@
+import heapq
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from .pathstore import pathstore
+from .fuzzy import trigramindex, fuzzymatcher, searchcancelled
+
+
+def _attach(name: str):
+    """Open an existing shared memory block without taking ownership of it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the block, but workers share the
+        # creating process's resource tracker so it is only recorded once
+        return shared_memory.SharedMemory(name=name)
+
+
+def _serve(conn, name: str, count: int, lo: int, hi: int):
+    """Worker process loop: match queries against paths lo..hi-1 of the block.
+
+    Requests arrive as (generation, query, limit) and are answered with
+    (generation, [(rank, id)]) or (generation, None) when a newer request
+    arrived before the search finished. None shuts the worker down.
+    """
+    shm = _attach(name)
+    ends_size = (count + 1) * 8
+    ends = shm.buf[:ends_size].cast("Q")
+    store = pathstore.frombuffers(shm.buf[ends_size:], ends[lo:hi + 1])
+    # Not indexed: each keyword is found by scanning the shard, which
+    # narrowing then keeps cheap while the query is extended
+    matcher = fuzzymatcher(trigramindex(store))
+    try:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                break
+            if request is None:
+                break
+            generation, query, limit = request
+            try:
+                top = matcher.top(query, store, limit, conn.poll, offset=lo)
+            except searchcancelled:
+                top = None
+            conn.send((generation, top))
+    finally:
+        # The views must go before the block can be closed
+        del matcher, store, ends
+        shm.close()
+
+
+class parallelmatcher:
+    """Ranks paths for a query across several processes.
+
+    The paths are copied once into a shared memory block, split into one
+    contiguous shard per worker process. Each query is sent to every
+    worker, which ranks its own shard with a fuzzymatcher (keeping its own
+    incremental state between keystrokes) and returns its top results;
+    those are merged into the overall top. A worker abandons its search as
+    soon as a newer query reaches it.
+
+    Built over a fixed snapshot of the paths: covers() tells whether a
+    sequence is still the one searched.
+    """
+
+    MIN_SHARD = 50_000  # Fewer paths per process are not worth the messaging
+    POLL_INTERVAL = 0.05  # Seconds between cancellation checks while waiting
+    START_METHOD = "spawn"  # Safe with the index and search threads running
+
+    def __init__(self, data, processes: int):
+        self._source = getattr(data, "store", data)
+        store = self._source if isinstance(self._source, pathstore) else pathstore(data)
+        self._count = len(data)
+        self._generation = 0
+        self._shm = None
+        self._workers = []  # [(process, connection)]
+
+        buf, ends = store.buffers(self._count)
+        try:
+            ends_size = ends.itemsize * len(ends)
+            self._shm = shared_memory.SharedMemory(create=True, size=max(1, ends_size + len(buf)))
+            self._shm.buf[:ends_size] = ends.tobytes()
+            self._shm.buf[ends_size:ends_size + len(buf)] = buf
+        finally:
+            buf.release()
+
+        shards = max(1, min(processes, self._count // self.MIN_SHARD))
+        bounds = [self._count * k // shards for k in range(shards + 1)]
+        context = multiprocessing.get_context(self.START_METHOD)
+        try:
+            for lo, hi in zip(bounds, bounds[1:]):
+                parent, child = context.Pipe()
+                process = context.Process(
+                    target=_serve, args=(child, self._shm.name, self._count, lo, hi), daemon=True
+                )
+                process.start()
+                child.close()
+                self._workers.append((process, parent))
+        except Exception:
+            self.stop()
+            raise
+
+    def __len__(self):
+        return len(self._workers)
+
+    def covers(self, data) -> bool:
+        """Return True if data is the snapshot these workers search."""
+        return getattr(data, "store", data) is self._source and len(data) == self._count
+
+    def search(self, query: str, data, limit: int, cancelled=None) -> list[int]:
+        """Return the ids of the best limit paths for query, as fuzzymatcher.search() would.
+
+        Raises searchcancelled once cancelled() turns true, and OSError if a
+        worker process has died.
+        """
+        self._generation += 1
+        generation = self._generation
+        pending = {}
+        for process, conn in self._workers:
+            try:
+                conn.send((generation, query, limit))
+            except (OSError, ValueError) as e:
+                raise OSError(f"search worker {process.pid} is gone") from e
+            pending[conn] = process
+
+        shards = []
+        while pending:
+            if cancelled is not None and cancelled():
+                raise searchcancelled()
+            for conn in wait(list(pending), timeout=self.POLL_INTERVAL):
+                try:
+                    reply_generation, top = conn.recv()
+                except (EOFError, OSError) as e:
+                    raise OSError(f"search worker {pending[conn].pid} is gone") from e
+                # Replies to superseded queries are still in the pipe; skip them
+                if reply_generation == generation:
+                    if top is None:
+                        raise searchcancelled()
+                    shards.append(top)
+                    del pending[conn]
+
+        return [i for _, i in heapq.nlargest(limit, (item for top in shards for item in top))]
+
+    def stop(self, timeout=1.0):
+        """Shut the worker processes down and free the shared memory."""
+        for _, conn in self._workers:
+            try:
+                conn.send(None)
+            except (OSError, ValueError):
+                pass
+        deadline = time.time() + timeout
+        for process, conn in self._workers:
+            process.join(max(0, deadline - time.time()))
+            if process.is_alive():
+                process.terminate()
+                process.join()
+            conn.close()
+        self._workers = []
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
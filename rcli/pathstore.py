@@ -0,0 +1,215 @@
+import os
+import mmap
+import struct
+from array import array
+
+
+class pathstore:
+    """Append-only sequence of paths packed into one contiguous UTF-8 buffer.
+
+    Every path is stored followed by a newline in a single bytearray, and an
+    array of end offsets marks where each one stops. That costs about one
+    byte per character plus 8 bytes per path, against roughly 50 bytes of
+    object overhead for each separate str in a list.
+
+    Appends may run on one thread while other threads read: a path is only
+    counted once its bytes are in the buffer, so any index below len() is
+    always complete.
+    """
+
+    CHUNK = 4096  # Paths decoded per block when iterating
+
+    def __init__(self, paths=()):
+        self._buf = bytearray()
+        self._ends = array("Q", [0])  # _ends[i]..._ends[i + 1] holds path i + "\n"
+        self.extend(paths)
+
+    @staticmethod
+    def _encode(path: str) -> bytes:
+        return path.encode("utf-8", "surrogatepass")
+
+    @staticmethod
+    def _decode(data) -> str:
+        # str() rather than .decode() so memoryviews work too
+        return str(data, "utf-8", "surrogatepass")
+
+    @classmethod
+    def frombuffers(cls, buf, ends):
+        """Return a read-only store over existing buffers, without copying.
+
+        buf holds the newline-terminated paths and ends the offsets into it
+        as laid out by buffers(); any bytes-like objects will do, such as
+        memoryviews of shared memory. ends need not start at 0, so a slice
+        of the offsets gives a store over a contiguous run of the paths.
+        """
+        store = cls.__new__(cls)
+        store._buf = buf
+        store._ends = ends
+        return store
+
+    def buffers(self, n=None):
+        """Return (buf, ends) describing the first n paths (default all).
+
+        buf is a memoryview of the packed paths and ends an array("Q") of
+        n + 1 offsets into it; see frombuffers(). Release the view before
+        appending again, as a bytearray cannot grow while it is exported.
+        """
+        if n is None:
+            n = len(self)
+        return memoryview(self._buf)[:self._ends[n]], self._ends[:n + 1]
+
+    def append(self, path: str):
+        self._buf += self._encode(path) + b"\n"
+        self._ends.append(len(self._buf))
+
+    def extend(self, paths):
+        for path in paths:
+            self.append(path)
+
+    def __len__(self):
+        return len(self._ends) - 1
+
+    def _get(self, i: int) -> str:
+        return self._decode(self._buf[self._ends[i]:self._ends[i + 1] - 1])
+
+    def __getitem__(self, i):
+        n = len(self)
+        if isinstance(i, slice):
+            return [self._get(j) for j in range(*i.indices(n))]
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("pathstore index out of range")
+        return self._get(i)
+
+    def iterrange(self, start: int, stop: int):
+        """Yield paths start..stop-1, decoding them a block at a time."""
+        ends = self._ends
+        for lo in range(start, stop, self.CHUNK):
+            hi = min(lo + self.CHUNK, stop)
+            block = self._decode(self._buf[ends[lo]:ends[hi]]).split("\n")
+            if len(block) == hi - lo + 1:
+                yield from block[:-1]
+            else:
+                # A path in this block contains a newline; split per offset
+                for j in range(lo, hi):
+                    yield self._get(j)
+
+    def __iter__(self):
+        return self.iterrange(0, len(self))
+
+    def nbytes(self) -> int:
+        """Return the memory held by the buffer and offsets, in bytes."""
+        return len(self._buf) + self._ends.itemsize * len(self._ends)
+
+    def view(self):
+        """Return a read-only view of the paths stored so far."""
+        return pathview(self, len(self))
+
+    def copy(self):
+        """Return an independent, appendable copy of the store."""
+        store = pathstore()
+        store._buf = bytearray(self._buf)
+        store._ends = array("Q")
+        store._ends.frombytes(memoryview(self._ends).cast("B"))
+        if store._ends[0] != 0:
+            # A store over a slice of offsets; rebase onto its own buffer
+            base = store._ends[0]
+            store._buf = store._buf[base:store._ends[-1]]
+            store._ends = array("Q", (end - base for end in store._ends))
+        return store
+
+    # On-disk layout: header, then the n + 1 offsets, then the packed paths.
+    # Offsets are in native byte order; the file is a local cache.
+    MAGIC = b"RCLIPATH"
+    FORMAT_VERSION = 2
+    # magic, version, reserved, two caller-defined timestamps, count, buffer size
+    HEADER = struct.Struct("<8sIIddQQ")
+
+    def save(self, path: str, stamps: tuple):
+        """Write the paths to path with a pair of timestamps, replacing it atomically."""
+        n = len(self)
+        buf, ends = self.buffers(n)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.FORMAT_VERSION, 0, *stamps, n, len(buf)))
+                f.write(ends)
+                f.write(buf)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        finally:
+            buf.release()
+
+    @classmethod
+    def load(cls, path: str):
+        """Map a file written by save() and return (store, stamps).
+
+        The store reads straight from the mapping, so loading costs the same
+        for any number of paths. It is read-only. Raises ValueError if the
+        file is not a valid index, and OSError if it cannot be read.
+        """
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < cls.HEADER.size:
+                raise ValueError(f"{path} is truncated")
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, stamp, other_stamp, n, buf_size = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {cls.FORMAT_VERSION} path index")
+        ends_start = cls.HEADER.size
+        buf_start = ends_start + 8 * (n + 1)
+        if size != buf_start + buf_size:
+            raise ValueError(f"{path} is truncated")
+        view = memoryview(data)
+        ends = view[ends_start:buf_start].cast("Q")
+        if ends[0] != 0 or ends[n] != buf_size:
+            raise ValueError(f"{path} has inconsistent offsets")
+        return cls.frombuffers(view[buf_start:], ends), (stamp, other_stamp)
+
+
+class pathview:
+    """Fixed-length, read-only window onto the first n paths of a pathstore.
+
+    Handing one out costs O(1); paths appended to the store afterwards are
+    not visible through it.
+    """
+
+    def __init__(self, store: pathstore, n: int):
+        self._store = store
+        self._n = n
+
+    @property
+    def store(self) -> pathstore:
+        return self._store
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._store._get(j) for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("pathview index out of range")
+        return self._store._get(i)
+
+    def __iter__(self):
+        return self._store.iterrange(0, self._n)
+
+    def iterrange(self, start: int, stop: int):
+        return self._store.iterrange(start, min(stop, self._n))
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, pathview)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"pathview({len(self)} paths)"
@@ -1,18 +1,46 @@
 #!/usr/bin/env python3
 """
 Usage:
-    rcli [-v] [--no-index] [<remote>]
+    rcli [-v] [--no-index] [--rcd] [--search-processes=<n>] [--jobs=<n>] [--config=<file>] [<remote>]
     rcli --clear-cache
     rcli -h
 
+Options:
+    -v          Log to rcli.log
+    --no-index  Don't build the background search index
+    --rcd       Talk to one long-lived `rclone rcd` instead of spawning
+                rclone for every listing
+    --search-processes=<n>  Spread fuzzy search of a large, finished index
+                across n processes [default: 0]
+    --jobs=<n>  Run up to n downloads and uploads at once in the
+                background [default: 2]
+    --config=<file>  Read settings such as cache TTLs and transfer
+                profiles from <file> instead of ~/.config/rcli/config.ini
+
 """
 
 from docopt import docopt
 from .cursedcli import cursedcli
+from .config import load_config, ttlpolicy, transferprofiles
 import logging
 import traceback
 import os
 import sys
+import shutil
+
+
+def option_count(args, name: str, default: int, minimum: int) -> int:
+    """Return the value of option name as an int of at least minimum; raise ValueError if it is not."""
+    value = args.get(name)
+    if not value:
+        return default
+    try:
+        count = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a whole number, not {value!r}")
+    if count < minimum:
+        raise ValueError(f"{name} must be at least {minimum}, not {count}")
+    return count
 
 
 def main():
@@ -29,16 +57,43 @@ def main():
         )
 
     if args["--clear-cache"]:
-        cache_file = os.path.expanduser("~/.cache/rcli/cache.json")
-        if os.path.exists(cache_file):
-            os.remove(cache_file)
+        cache_dir = os.path.expanduser("~/.cache/rcli/")
+        for name in ("cache.json", "cache.db", "cache.db-wal", "cache.db-shm"):
+            cache_file = os.path.join(cache_dir, name)
+            if os.path.exists(cache_file):
+                os.remove(cache_file)
+        shutil.rmtree(os.path.join(cache_dir, "index"), ignore_errors=True)
 
         print("Removed cache!")
         sys.exit(0)
 
+    try:
+        config = load_config(args.get("--config"))
+        ttl_policy = ttlpolicy.fromconfig(config)
+        profiles = transferprofiles.fromconfig(config)
+    except ValueError as e:
+        print(f"Invalid config: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        jobs = option_count(args, "--jobs", 2, 1)
+        # 0 keeps fuzzy search in this process
+        search_processes = option_count(args, "--search-processes", 0, 0)
+    except ValueError as e:
+        print(f"Invalid option: {e}", file=sys.stderr)
+        sys.exit(1)
+
     cli = None
     try:
-        cli = cursedcli(args["<remote>"], no_index=args["--no-index"])
+        cli = cursedcli(
+            args["<remote>"],
+            no_index=args["--no-index"],
+            rcd=args.get("--rcd", False),
+            search_processes=search_processes,
+            ttl_policy=ttl_policy,
+            jobs=jobs,
+            profiles=profiles,
+        )
         cli.start()
         cli.main()
 
@@ -4,7 +4,22 @@ import subprocess
 import logging
 import json
 import shutil
+import sqlite3
 import threading
+import socket
+import secrets
+import base64
+import urllib.request
+import urllib.error
+import urllib.parse
+import concurrent.futures
+import hashlib
+from collections import deque
+from datetime import datetime, timezone
+from .lrucache import lrucache
+from .config import ttlpolicy
+from .pathstore import pathstore
+from .fuzzy import trigramindex
 
 
 def check_rclone_available():
@@ -17,7 +32,14 @@ def check_rclone_available():
 
 
 class rclone:
-    def rclone(self, args: list[str], capture=False, timeout=60, quiet=False):
+    POLL_INTERVAL = 0.05  # Seconds between checks of a cancel event
+
+    def rclone(self, args: list[str], capture=False, timeout=60, quiet=False, cancel=None):
+        """Run rclone with args, returning its stdout when capture is set.
+
+        A captured command is killed when it runs past timeout or once the
+        threading.Event cancel is set, and "" is returned.
+        """
         args = ["rclone"] + args
 
         if not capture:
@@ -29,34 +51,49 @@ class rclone:
                 stderr=subprocess.PIPE,
                 universal_newlines=True,
             )
-            try:
-                output, error = process.communicate(timeout=timeout)
-            except subprocess.TimeoutExpired:
-                process.kill()
-                process.communicate()
-                if not quiet:
-                    logging.warning("rclone command timed out: %s", " ".join(args))
-                return ""
+            deadline = time.time() + timeout
+            while True:
+                wait = deadline - time.time()
+                if cancel is not None:
+                    wait = min(wait, self.POLL_INTERVAL)
+                try:
+                    output, error = process.communicate(timeout=max(0, wait))
+                    break
+                except subprocess.TimeoutExpired:
+                    cancelled = cancel is not None and cancel.is_set()
+                    if not cancelled and time.time() < deadline:
+                        continue
+                    process.kill()
+                    process.communicate()
+                    if not quiet and not cancelled:
+                        logging.warning("rclone command timed out: %s", " ".join(args))
+                    return ""
 
             if error and not quiet:
                 logging.warning("rclone stderr: %s", error.strip())
 
             return output
 
-    def listdir(self, remote: str, path: str = "") -> list[dict]:
-        """List directory contents using rclone lsjson."""
+    def listdir(self, remote: str, path: str = "", cancel=None) -> list[dict]:
+        """List directory contents using rclone lsjson.
+
+        Returns None if the listing fails, so that it is not mistaken for
+        an empty directory. Setting the threading.Event cancel kills the
+        listing, which then returns None as well.
+        """
         target = remote + path
         output = self.rclone(
-            ["lsjson", target, "--max-depth", "1"], capture=True
+            ["lsjson", target, "--max-depth", "1"], capture=True, cancel=cancel
         )
+        # Even an empty directory lists as "[]"
         if not output or not output.strip():
-            return []
+            return None
         try:
             entries = json.loads(output)
         except (json.JSONDecodeError, ValueError):
-            return []
+            return None
         if not isinstance(entries, list):
-            return []
+            return None
         return entries
 
     def listremotes(self) -> list[str]:
@@ -116,188 +153,1243 @@ class rclone:
             return False
 
 
-class rclonecache:
-    CACHE_TTL = 60 * 60  # 1 hour
+class rclonercd(rclone):
+    """rclone backend that talks to a single long-lived `rclone rcd`.
+
+    Every call is one HTTP round trip to a daemon on 127.0.0.1 instead of a
+    fresh rclone process, so the config is parsed and remotes authenticate
+    once per session. Return shapes match the subprocess-based rclone class.
+    Call start() before use and stop() on exit; start() returns False if the
+    daemon could not be brought up, in which case callers should fall back
+    to rclone().
+    """
+
+    STARTUP_TIMEOUT = 10  # Seconds to wait for the daemon to answer rc/noop
 
     def __init__(self):
-        check_rclone_available()
-        self.cachePath = os.path.expanduser("~/.cache/rcli/cache.json")
-        self.rclone = rclone()
-        os.makedirs(os.path.expanduser("~/.cache/rcli/"), exist_ok=True)
+        self._process = None
+        self._url = None
+        self._auth = None
+        # Never route loopback requests through an http_proxy from the env
+        self._opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
 
-    def _cache_key(self, remote: str, path: str) -> str:
-        return remote + path
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
 
-    def _load_cache(self) -> dict:
-        """Load and validate cache from disk. Returns empty dict on failure."""
-        if not os.path.exists(self.cachePath):
-            return {}
+    def start(self) -> bool:
+        """Launch `rclone rcd` on a free loopback port and wait until it answers."""
+        port = self._free_port()
+        user = secrets.token_hex(8)
+        password = secrets.token_hex(16)
+        args = ["rclone", "rcd", "--rc-addr", f"127.0.0.1:{port}"]
+        # Credentials go in the environment: argv is readable by every local user
+        env = dict(os.environ, RCLONE_RC_USER=user, RCLONE_RC_PASS=password)
         try:
-            with open(self.cachePath, "r") as f:
-                data = json.load(f)
-        except (json.JSONDecodeError, ValueError):
-            os.remove(self.cachePath)
-            return {}
+            self._process = subprocess.Popen(
+                args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env
+            )
+        except OSError as e:
+            logging.warning("Failed to start rclone rcd: %s", e)
+            return False
+
+        self._url = f"http://127.0.0.1:{port}/"
+        token = base64.b64encode(f"{user}:{password}".encode()).decode()
+        self._auth = "Basic " + token
+
+        deadline = time.time() + self.STARTUP_TIMEOUT
+        while time.time() < deadline:
+            if self._process.poll() is not None:
+                break
+            if self.call("rc/noop", timeout=1, quiet=True) is not None:
+                return True
+            time.sleep(0.1)
+
+        logging.warning("rclone rcd did not become ready on port %d", port)
+        self.stop()
+        return False
+
+    def stop(self):
+        """Terminate the daemon if it is running."""
+        proc = self._process
+        self._process = None
+        if proc and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    def call(self, method: str, params=None, timeout=60, quiet=False):
+        """POST params to an rc method. Returns the decoded dict or None on error."""
+        if self._url is None:
+            return None
+        request = urllib.request.Request(
+            self._url + method,
+            data=json.dumps(params or {}).encode(),
+            headers={"Content-Type": "application/json", "Authorization": self._auth},
+        )
+        try:
+            with self._opener.open(request, timeout=timeout) as response:
+                data = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            if not quiet:
+                try:
+                    detail = json.loads(e.read()).get("error", "")
+                except Exception:
+                    detail = ""
+                logging.warning("rclone rc %s failed (%d): %s", method, e.code, detail)
+            return None
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            if not quiet:
+                logging.warning("rclone rc %s failed: %s", method, e)
+            return None
         if not isinstance(data, dict):
-            os.remove(self.cachePath)
-            return {}
-        # Discard old-format cache (keys missing "entries" field)
-        for key, val in list(data.items()):
-            if not isinstance(val, dict) or "entries" not in val:
-                del data[key]
+            return None
         return data
 
-    def _save_cache(self, cache: dict):
-        """Atomically write cache to disk."""
-        tmp_path = self.cachePath + ".tmp"
+    def job(self, method: str, params, cancel, timeout=60):
+        """Run an rc method as an async job, stopping it once cancel is set.
+
+        Returns the job's output dict, or None on error, timeout or cancel.
+        """
+        job = self.call(method, dict(params, _async=True))
+        if job is None or "jobid" not in job:
+            return None
+        deadline = time.time() + timeout
+        while not cancel.wait(self.POLL_INTERVAL) and time.time() < deadline:
+            status = self.call("job/status", {"jobid": job["jobid"]})
+            if status is None:
+                return None
+            if status.get("finished"):
+                if not status.get("success"):
+                    logging.warning("rclone rc %s failed: %s", method, status.get("error", ""))
+                    return None
+                return status.get("output")
+        self.call("job/stop", {"jobid": job["jobid"]}, quiet=True)
+        return None
+
+    def listdir(self, remote: str, path: str = "", cancel=None) -> list[dict]:
+        """List directory contents using operations/list. Returns None on failure.
+
+        With a cancel event the listing runs as a job that is stopped once
+        the event is set, returning None.
+        """
+        params = {"fs": remote + path, "remote": ""}
+        if cancel is None:
+            result = self.call("operations/list", params)
+        else:
+            result = self.job("operations/list", params, cancel)
+        if result is None or not isinstance(result.get("list"), list):
+            return None
+        return result["list"]
+
+    def listremotes(self) -> list[str]:
+        """List configured remotes using config/listremotes."""
+        result = self.call("config/listremotes")
+        if result is None or not isinstance(result.get("remotes"), list):
+            return []
+        return [name + ":" for name in result["remotes"] if name]
+
+    def about(self, remote: str, timeout: int = 10):
+        """Get remote space usage via operations/about. Returns dict or None."""
+        return self.call("operations/about", {"fs": remote}, timeout=timeout, quiet=True)
+
+    def listdir_recursive(self, remote: str, timeout: int = 300):
+        """List all contents recursively using operations/list with recurse.
+
+        Returns a list of entry dicts, or None on timeout or error.
+        """
+        result = self.call(
+            "operations/list",
+            {"fs": remote, "remote": "", "opt": {"recurse": True}},
+            timeout=timeout,
+        )
+        if result is None or not isinstance(result.get("list"), list):
+            return None
+        return result["list"]
+
+    def test_connection(self, remote: str, timeout: int = 10) -> bool:
+        """Test if a remote is reachable by listing its top-level directories."""
+        result = self.call(
+            "operations/list",
+            {"fs": remote, "remote": "", "opt": {"dirsOnly": True}},
+            timeout=timeout,
+            quiet=True,
+        )
+        return result is not None
+
+
+class rclonecache:
+    """Per-directory listing cache stored in ~/.cache/rcli/cache.db (SQLite).
+
+    Each cached directory is one row in `dirs`, keyed by remote + path, and
+    each of its entries is one row in `entries` keyed by that parent. Every
+    operation touches only the rows it needs instead of parsing and
+    rewriting the whole cache. A legacy cache.json is imported on first use.
+    Parsed listings are also kept in an in-process LRU (`memory`) so going
+    back and forth between directories never touches the database.
+
+    prefetch() lists directories into the cache on a small pool of
+    background threads, so the one the user opens next is usually a hit.
+    A listdir() for a directory that is already being listed waits for that
+    listing instead of starting another.
+
+    listdir(stale=True) serves a listing up to STALE_MAX_AGE old at once;
+    revalidate() then refreshes it in the background.
+    """
+
+    CACHE_TTL = 60 * 60  # 1 hour
+    STALE_MAX_AGE = 24 * 60 * 60  # Oldest listing shown while revalidate() refreshes it
+    MEMORY_BUDGET = 64 * 1024 * 1024  # Bytes of parsed listings kept in memory
+    PREFETCH_WORKERS = 4  # Directories listed at once in the background
+    PREFETCH_IDLE = 5  # Seconds a prefetch thread waits for work before exiting
+
+    # Schema migrations, applied in order; PRAGMA user_version records how
+    # many have run.
+    MIGRATIONS = [
+        """
+        CREATE TABLE dirs (
+            key TEXT PRIMARY KEY,
+            timestamp REAL NOT NULL
+        );
+        CREATE TABLE entries (
+            parent TEXT NOT NULL,
+            name TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX entries_parent ON entries (parent);
+        """,
+        # For adaptive TTLs: a digest of each listing, and how many refreshes
+        # in a row found it unchanged
+        """
+        ALTER TABLE dirs ADD COLUMN digest TEXT;
+        ALTER TABLE dirs ADD COLUMN unchanged INTEGER NOT NULL DEFAULT 0;
+        """,
+    ]
+
+    def __init__(self, backend=None, cacheDir=None, memory_budget=None, policy=None):
+        check_rclone_available()
+        cacheDir = cacheDir or os.path.expanduser("~/.cache/rcli/")
+        os.makedirs(cacheDir, exist_ok=True)
+        self.cacheDir = cacheDir
+        self.cachePath = os.path.join(cacheDir, "cache.db")
+        self.legacyCachePath = os.path.join(cacheDir, "cache.json")
+        self.rclone = backend if backend is not None else rclone()
+        self._conn = None
+        self._lock = threading.RLock()
+        # No ttl: _read() checks each hit against the policy, which may keep
+        # a listing fresh far longer than STALE_MAX_AGE
+        self.memory = lrucache(memory_budget if memory_budget is not None else self.MEMORY_BUDGET)
+        # How long each listing stays fresh; CACHE_TTL for all unless configured
+        self.policy = policy if policy is not None else ttlpolicy(ttl=self.CACHE_TTL)
+        self._unchanged = {}  # key -> refreshes in a row that found the listing unchanged
+        self._inflight = {}  # key -> Event set once that listing is stored
+        self._seeders = []  # cacheseeders not yet committed; see _changed()
+        self._prefetchCond = threading.Condition()
+        self._prefetchQueue = deque()  # (remote, path) still to prefetch, in order
+        self._prefetchers = 0  # Prefetch threads running
+
+    def _cache_key(self, remote: str, path: str) -> str:
+        return remote + path
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.cachePath, check_same_thread=False)
         try:
-            with open(tmp_path, "w") as f:
-                json.dump(cache, f, indent=2)
-            os.replace(tmp_path, self.cachePath)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for i in range(version, len(self.MIGRATIONS)):
+                with conn:
+                    conn.executescript(self.MIGRATIONS[i])
+                    conn.execute(f"PRAGMA user_version = {i + 1}")
         except Exception:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
+            conn.close()
             raise
+        return conn
+
+    def _db(self) -> sqlite3.Connection:
+        """Open the database on first use, recreating it if it is corrupt."""
+        if self._conn is None:
+            try:
+                self._conn = self._connect()
+            except sqlite3.DatabaseError:
+                logging.warning("Discarding corrupt cache database %s", self.cachePath)
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(self.cachePath + suffix):
+                        os.remove(self.cachePath + suffix)
+                self._conn = self._connect()
+            self._import_legacy_cache()
+        return self._conn
+
+    def _import_legacy_cache(self):
+        """Move entries from an old cache.json into the database, then delete it."""
+        if not os.path.exists(self.legacyCachePath):
+            return
+        try:
+            with open(self.legacyCachePath, "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, ValueError, UnicodeDecodeError, OSError):
+            data = None
+        if isinstance(data, dict):
+            known = {row[0] for row in self._conn.execute("SELECT key FROM dirs")}
+            for key, val in data.items():
+                # Old-format entries (no "entries" field) are discarded
+                if key in known or not isinstance(val, dict) or "entries" not in val:
+                    continue
+                if not isinstance(val["entries"], list):
+                    continue
+                self._store(key, val["entries"], val.get("timestamp", 0))
+        os.remove(self.legacyCachePath)
+
+    def _ttl(self, remote: str, path: str) -> float:
+        """Return the seconds the cached listing of path stays fresh."""
+        key = self._cache_key(remote, path)
+        return self.policy.ttl(remote, path, self._unchanged.get(key, 0))
 
-    def listdir(self, remote: str, path: str = "") -> list[dict]:
-        """List directory contents, using cache when fresh."""
+    def _read(self, remote: str, path: str, stale=False):
+        """Return (entries, timestamp) for path if fresh (or, with stale, not too old), else None."""
         key = self._cache_key(remote, path)
-        cache = self._load_cache()
-        if key in cache:
-            entry = cache[key]
-            if time.time() - entry["timestamp"] <= self.CACHE_TTL:
-                return entry["entries"]
+
+        def too_old(timestamp):
+            ttl = self._ttl(remote, path)
+            return time.time() - timestamp > (max(ttl, self.STALE_MAX_AGE) if stale else ttl)
+
+        item = self.memory.lookup(key)
+        if item is not None:
+            return None if too_old(item[1]) else item
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT timestamp, unchanged FROM dirs WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._unchanged[key] = row[1]
+            if too_old(row[0]):
+                return None
+            rows = db.execute(
+                "SELECT data FROM entries WHERE parent = ? ORDER BY rowid", (key,)
+            ).fetchall()
+        entries = [json.loads(data) for (data,) in rows]
+        self.memory.put(key, entries, row[0])
+        return entries, row[0]
+
+    def _lookup(self, remote: str, path: str, stale=False):
+        """Return cached entries for path if fresh (or, with stale, not too old), else None."""
+        item = self._read(remote, path, stale)
+        return item[0] if item is not None else None
+
+    def _store(self, key: str, entries: list[dict], timestamp=None):
+        """Replace the cached listing for key in a single transaction."""
+        if timestamp is None:
+            timestamp = time.time()
+        rows = [
+            (key, entry.get("Name", "") if isinstance(entry, dict) else "", json.dumps(entry))
+            for entry in entries
+        ]
+        with self._lock:
+            self._changed(key)
+            db = self._db()
+            with db:
+                self._write(db, key, rows, timestamp)
+        self.memory.put(key, entries, timestamp)
+
+    def _changed(self, key: str, recursive=False):
+        """Keep active seeders from overwriting key, and with recursive every key below it.
+
+        Called with _lock held, before the change, by everything that
+        writes a listing; a seeder's listing started earlier and may miss it.
+        """
+        for seeder in self._seeders:
+            if recursive:
+                seeder._skipBelow.append(key)
+            seeder._skip.add(key)
+
+    def _write(self, db, key: str, rows, timestamp):
+        """Replace the listing for key with rows of (key, name, data), in the caller's transaction."""
+        digest = hashlib.sha1("\n".join(data for _, _, data in rows).encode()).hexdigest()
+        row = db.execute(
+            "SELECT digest, unchanged FROM dirs WHERE key = ?", (key,)
+        ).fetchone()
+        unchanged = row[1] + 1 if row is not None and row[0] == digest else 0
+        self._unchanged[key] = unchanged
+        db.execute("DELETE FROM entries WHERE parent = ?", (key,))
+        db.execute(
+            "INSERT OR REPLACE INTO dirs (key, timestamp, digest, unchanged) VALUES (?, ?, ?, ?)",
+            (key, timestamp, digest, unchanged),
+        )
+        db.executemany(
+            "INSERT INTO entries (parent, name, data) VALUES (?, ?, ?)", rows
+        )
+
+    def seeder(self, remote: str, timestamp=None):
+        """Return a cacheseeder that caches every directory of remote from one recursive listing."""
+        return cacheseeder(self, remote, timestamp)
+
+    def listdir(self, remote: str, path: str = "", cancel=None, stale=False) -> list[dict]:
+        """List directory contents, using cache when fresh.
+
+        With stale, a listing past its TTL but within STALE_MAX_AGE is
+        returned as it is; call revalidate() to refresh it. Setting the
+        threading.Event cancel abandons a listing from the remote;
+        listdir() then returns None and caches nothing. A listing that
+        fails returns [] and caches nothing either, so any stale listing
+        is kept.
+        """
+        entries = self._lookup(remote, path, stale=stale)
+        if entries is not None:
+            return entries
         # Cache miss or stale — fetch from rclone
-        entries = self.rclone.listdir(remote, path)
-        cache[key] = {"timestamp": time.time(), "entries": entries}
-        self._save_cache(cache)
+        return self._fetch(remote, path, cancel=cancel)
+
+    def _fetch(self, remote: str, path: str, wait=True, cancel=None):
+        """List path from the remote and cache it.
+
+        If the directory is already being listed, wait for that listing and
+        return its entries, or with wait=False return None straight away.
+        Returns None as well once cancel is set, and [] if the listing
+        fails; neither is cached.
+        """
+        key = self._cache_key(remote, path)
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                listing = self._inflight[key] = threading.Event()
+        if pending is not None:
+            if not wait:
+                return None
+            while not pending.wait(rclone.POLL_INTERVAL):
+                if cancel is not None and cancel.is_set():
+                    return None
+            entries = self._lookup(remote, path)
+            if entries is not None:
+                return entries
+            # That listing failed or was invalidated meanwhile; list it here
+            return self._fetch(remote, path, cancel=cancel)
+        try:
+            entries = self.rclone.listdir(remote, path, cancel=cancel)
+            if cancel is not None and cancel.is_set():
+                return None
+            if entries is None:
+                return []
+            self._store(key, entries)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            listing.set()
         return entries
 
-    def invalidate(self, remote: str, path: str = ""):
-        """Remove a specific directory from the cache."""
+    def revalidate(self, remote: str, path: str = ""):
+        """Refresh a stale cached listing of path in the background.
+
+        Returns a threading.Event that is set once the refresh is done, or
+        None if the cached listing is fresh or missing. A refresh that
+        fails leaves the stale listing in the cache.
+        """
+        item = self._read(remote, path, stale=True)
+        if item is None or time.time() - item[1] <= self._ttl(remote, path):
+            return None
+        done = threading.Event()
+
+        def refresh():
+            try:
+                self._fetch(remote, path)
+            except Exception:
+                logging.exception("Refreshing %s%s failed", remote, path)
+            finally:
+                done.set()
+
+        threading.Thread(target=refresh, daemon=True).start()
+        return done
+
+    def prefetch(self, remote: str, paths):
+        """List the directories in paths into the cache in the background.
+
+        paths are listed in the order given, at most PREFETCH_WORKERS at a
+        time. They replace anything still queued by an earlier call, so
+        work for a directory the user has left is dropped. Directories
+        already cached or being listed are skipped.
+        """
+        queue = deque((remote, path) for path in paths)
+        with self._prefetchCond:
+            self._prefetchQueue = queue
+            while self._prefetchers < min(self.PREFETCH_WORKERS, len(queue)):
+                self._prefetchers += 1
+                threading.Thread(target=self._prefetch_worker, daemon=True).start()
+            self._prefetchCond.notify_all()
+
+    def cancel_prefetch(self):
+        """Drop the queued prefetches; listings already running still finish."""
+        with self._prefetchCond:
+            self._prefetchQueue = deque()
+
+    def _prefetch_worker(self):
+        while True:
+            with self._prefetchCond:
+                if not self._prefetchCond.wait_for(lambda: self._prefetchQueue, self.PREFETCH_IDLE):
+                    self._prefetchers -= 1
+                    return
+                remote, path = self._prefetchQueue.popleft()
+            try:
+                if self._lookup(remote, path) is None:
+                    self._fetch(remote, path, wait=False)
+            except Exception:
+                logging.exception("Prefetching %s%s failed", remote, path)
+
+    def invalidate(self, remote: str, path: str = "", recursive=False):
+        """Remove a directory from the cache; with recursive, every directory below it too."""
         key = self._cache_key(remote, path)
-        cache = self._load_cache()
-        if key in cache:
-            del cache[key]
-            self._save_cache(cache)
+        with self._lock:
+            self._changed(key, recursive)
+            db = self._db()
+            keys = [key]
+            if recursive:
+                # Keys below path share its prefix; a range scan over the primary key
+                keys += [
+                    k for (k,) in db.execute(
+                        "SELECT key FROM dirs WHERE key > ? AND key < ?", (key, key + "\U0010ffff")
+                    )
+                ]
+            with db:
+                for k in keys:
+                    db.execute("DELETE FROM entries WHERE parent = ?", (k,))
+                    db.execute("DELETE FROM dirs WHERE key = ?", (k,))
+        for k in keys:
+            self.memory.pop(k)
+            self._unchanged.pop(k, None)
+
+    def expire(self, remote: str, path: str = ""):
+        """Mark the cached listing of path as due for a refresh.
+
+        It can still be read with stale, like any listing past its TTL, and
+        its adaptive TTL starts over.
+        """
+        key = self._cache_key(remote, path)
+        timestamp = time.time() - self.policy.ttl(remote, path) - 1
+        self._unchanged[key] = 0
+        with self._lock:
+            self._changed(key)
+            db = self._db()
+            with db:
+                db.execute(
+                    "UPDATE dirs SET timestamp = MIN(timestamp, ?), unchanged = 0 WHERE key = ?",
+                    (timestamp, key),
+                )
+        item = self.memory.lookup(key)
+        if item is not None:
+            self.memory.put(key, item[0], min(item[1], timestamp))
+
+    def update(self, remote: str, path: str, entries: list[dict], new=False):
+        """Write entries through to the cached listing of path.
+
+        Each entry replaces the cached one with the same Name, or is added;
+        the listing keeps its timestamp. Nothing happens if path is not
+        cached, unless new says path did not exist before, so that entries
+        are its whole listing.
+        """
+        key = self._cache_key(remote, path)
+        with self._lock:
+            # Even when path is not cached: a seeder's listing may predate entries
+            self._changed(key)
+            db = self._db()
+            row = db.execute("SELECT timestamp FROM dirs WHERE key = ?", (key,)).fetchone()
+            if row is None and not new:
+                return
+            merged = {}
+            if row is not None:
+                rows = db.execute(
+                    "SELECT data FROM entries WHERE parent = ? ORDER BY rowid", (key,)
+                ).fetchall()
+                for (data,) in rows:
+                    entry = json.loads(data)
+                    merged[entry.get("Name", "") if isinstance(entry, dict) else ""] = entry
+            for entry in entries:
+                merged[entry["Name"]] = entry
+            self._store(key, list(merged.values()), row[0] if row is not None else None)
+
+    def uploaded(self, remote: str, path: str, listing=None) -> list[str]:
+        """Bring the cache up to date after `rclone copy` into directory path.
+
+        listing is what the copy sent, as returned by local_listing(): its
+        entries are written through to the cached listings of path and the
+        directories below it. The directories above path are expired, as
+        their entries for it may have changed. With listing None (the copy
+        failed or was cut short) everything under path is invalidated
+        instead. Returns the paths written, relative to the remote, with
+        directories ending in /.
+        """
+        parts = path.rstrip("/").split("/") if path else []
+        for i in range(len(parts)):
+            self.expire(remote, "".join(part + "/" for part in parts[:i]))
+        if listing is None:
+            self.invalidate(remote, path, recursive=True)
+            return []
+        # A directory is new if its parent's cached listing lacks it
+        new = set()
+        for rel in listing:
+            if not rel:
+                continue
+            trimmed = rel.rstrip("/")
+            parent = trimmed[:trimmed.rfind("/") + 1]
+            cached = self._lookup(remote, path + parent, stale=True)
+            if cached is not None and trimmed[len(parent):] not in {e.get("Name") for e in cached}:
+                new.add(rel)
+        paths = []
+        # Parents first, so a new directory is only listed once its parent is
+        for rel in sorted(listing):
+            entries = listing[rel]
+            self.update(remote, path + rel, entries, new=any(rel.startswith(n) for n in new))
+            paths += [path + rel + e["Name"] + ("/" if e.get("IsDir") else "") for e in entries]
+        return paths
 
     def get_all_cached_paths(self, remote: str) -> list[str]:
         """Return all file paths from cached directories for a remote."""
-        cache = self._load_cache()
+        # Prefix match on the parent key as a range scan over the index
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT parent, name FROM entries WHERE parent >= ? AND parent < ?",
+                (remote, remote + "\U0010ffff"),
+            ).fetchall()
         paths = []
-        for key, val in cache.items():
-            if not key.startswith(remote):
-                continue
-            dir_path = key[len(remote):]
-            for entry in val.get("entries", []):
-                name = entry.get("Name", "")
-                if dir_path:
-                    paths.append(dir_path + name)
-                else:
-                    paths.append(name)
+        for parent, name in rows:
+            dir_path = parent[len(remote):]
+            if dir_path:
+                paths.append(dir_path + name)
+            else:
+                paths.append(name)
         return paths
 
+    def close(self):
+        """Stop prefetching and close the database connection."""
+        self.cancel_prefetch()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class cacheseeder:
+    """Fills an rclonecache with every directory of a remote at once.
+
+    add() each entry of an `lsjson -R` listing as it streams in; entries
+    are staged in a temporary table rather than in memory. Once the whole
+    remote has been listed, commit() replaces the cached listing of every
+    directory seen, empty ones included, stamped with timestamp (when the
+    listing started). Directories the cache wrote, expired or invalidated
+    in the meantime are left as they are, being newer than the listing.
+    discard() drops the staged entries of a listing that turned out
+    incomplete. add() may be called from several threads.
+    """
+
+    BATCH = 4096  # Entries staged per write, and directories replaced per transaction
+
+    def __init__(self, cache: rclonecache, remote: str, timestamp=None):
+        self.cache = cache
+        self.remote = remote
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self._table = f"seed_{id(self):x}"
+        self._rows = []  # Entries not written to the table yet
+        self._dirs = {""}  # Every directory listed, relative to the remote
+        self._skip = set()  # Keys the cache changed since; guarded by the cache's lock
+        self._skipBelow = []  # Keys whose whole subtree it changed
+        self._lock = threading.Lock()
+        with cache._lock:
+            cache._db().execute(
+                f"CREATE TEMP TABLE {self._table} (parent TEXT NOT NULL, name TEXT NOT NULL, data TEXT NOT NULL)"
+            )
+            cache._seeders.append(self)
+
+    def add(self, path: str, entry: dict):
+        """Stage entry, found at path relative to the remote (directories end in /)."""
+        trimmed = path.rstrip("/")
+        parent = trimmed[:trimmed.rfind("/") + 1]
+        name = entry.get("Name") or trimmed[len(parent):]
+        # A listing of the parent alone gives each entry's Path as its name
+        row = (self.cache._cache_key(self.remote, parent), name, json.dumps(dict(entry, Path=name, Name=name)))
+        with self._lock:
+            if path.endswith("/"):
+                self._dirs.add(path)
+            self._rows.append(row)
+            if len(self._rows) >= self.BATCH:
+                # Flushed under the lock so each directory keeps its order
+                self._flush()
+
+    def _flush(self):
+        rows, self._rows = self._rows, []
+        with self.cache._lock:
+            db = self.cache._db()
+            with db:
+                db.executemany(f"INSERT INTO {self._table} VALUES (?, ?, ?)", rows)
+
+    def commit(self):
+        """Replace the cached listing of every staged directory; return how many were replaced."""
+        cache = self.cache
+        with self._lock:
+            self._flush()
+            keys = {cache._cache_key(self.remote, path) for path in self._dirs}
+        with cache._lock:
+            db = cache._db()
+            db.execute(f"CREATE INDEX {self._table}_parent ON {self._table} (parent)")
+            keys.update(parent for (parent,) in db.execute(f"SELECT DISTINCT parent FROM {self._table}"))
+        keys = sorted(keys)
+        written = 0
+        # A transaction per batch, so browsing is not held up for the whole remote
+        for i in range(0, len(keys), self.BATCH):
+            with cache._lock:
+                below = tuple(self._skipBelow)
+                db = cache._db()
+                with db:
+                    for key in keys[i:i + self.BATCH]:
+                        if key in self._skip or key.startswith(below):
+                            continue
+                        written += 1
+                        rows = db.execute(
+                            f"SELECT parent, name, data FROM {self._table} WHERE parent = ? ORDER BY rowid",
+                            (key,),
+                        ).fetchall()
+                        cache._write(db, key, rows, self.timestamp)
+                        cache.memory.pop(key)
+        self.discard()
+        return written
+
+    def discard(self):
+        """Drop the staged entries."""
+        with self._lock:
+            self._rows = []
+            with self.cache._lock:
+                self.cache._db().execute(f"DROP TABLE IF EXISTS {self._table}")
+                if self in self.cache._seeders:
+                    self.cache._seeders.remove(self)
+
+
+def local_listing(local_path: str) -> dict:
+    """Return what `rclone copy local_path <dir>` puts into <dir>, as lsjson entries.
+
+    Maps each directory relative to <dir> ("" for <dir> itself, others
+    ending in /) to its entries. A file is copied into <dir>, while a
+    directory has its contents copied. As with rclone copy, symlinks and
+    directories holding no files are left out. Raises OSError if
+    local_path cannot be read.
+    """
+
+    def entry(name, st, is_dir):
+        modtime = datetime.fromtimestamp(st.st_mtime, timezone.utc).isoformat().replace("+00:00", "Z")
+        return {"Path": name, "Name": name, "Size": -1 if is_dir else st.st_size, "ModTime": modtime, "IsDir": is_dir}
+
+    if not os.path.isdir(local_path):
+        return {"": [entry(os.path.basename(local_path), os.stat(local_path), False)]}
+
+    def fail(e):
+        raise e
+
+    listing = {}
+    # Bottom up, so a directory is only listed if something went into it
+    for root, dirs, files in os.walk(local_path, topdown=False, onerror=fail):
+        rel = os.path.relpath(root, local_path)
+        rel = "" if rel == "." else rel.replace(os.sep, "/") + "/"
+        entries = []
+        for name in sorted(dirs):
+            if rel + name + "/" in listing:
+                entries.append(entry(name, os.stat(os.path.join(root, name)), True))
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            if not os.path.islink(full):
+                entries.append(entry(name, os.stat(full), False))
+        if entries or not rel:
+            listing[rel] = entries
+    return listing
+
+
+def iter_lsjson(lines):
+    """Yield entries from rclone lsjson output as it is read, line by line.
+
+    rclone prints "[", then one JSON object per line (each but the last
+    followed by a comma), then "]". A whole array on a single line is
+    accepted too. Raises ValueError on a line that is not valid JSON.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line == "[" or line == "]":
+            continue
+        if line.startswith("["):
+            entries = json.loads(line)
+            if not isinstance(entries, list):
+                raise ValueError("lsjson output is not a list")
+            yield from entries
+            continue
+        if line.endswith(","):
+            line = line[:-1]
+        yield json.loads(line)
+
+
+class listingerror(Exception):
+    """A recursive listing for the search index failed."""
+
 
 class searchindex:
     """Background search index that recursively lists all paths from a remote.
 
-    Runs `rclone lsjson -R` in a daemon thread. Thread-safe access to results
-    via is_ready() / has_failed() / get_paths(). Designed to survive network
-    errors, timeouts, and malformed responses without crashing.
+    Runs `rclone lsjson -R` in a daemon thread and parses its output as it
+    streams in, so paths become searchable before the listing finishes.
+    Thread-safe access to results via is_ready() / has_failed() /
+    get_paths(). Paths are packed into a pathstore, so even remotes with
+    millions of objects fit in memory. Designed to survive network errors,
+    timeouts, and malformed responses without crashing.
+
+    Given a cacheDir, a finished index is saved under <cacheDir>/index/ and
+    loaded by the next start() for the same remote, so search works at once.
+    The remote is then listed again in the background, and the fresh paths
+    replace the saved ones in one step once the listing completes.
+
+    Within FULL_REFRESH_INTERVAL of the last complete listing, that refresh
+    only lists objects modified since the previous one (`--max-age`) and
+    appends the paths not indexed yet. Deleted or renamed objects, and
+    objects copied in with an older ModTime, are caught up by the next
+    complete listing.
+
+    Given a cache (an rclonecache), every complete listing also seeds the
+    cached listing of each directory in the remote, so browsing it needs no
+    further rclone calls until those listings expire.
     """
 
-    MAX_PATHS = 500_000  # Cap to prevent OOM on very large remotes
+    MAX_PATHS = 10_000_000  # Cap to prevent OOM on very large remotes
+    TIMEOUT = 300  # Seconds before the recursive listing is abandoned
+    INDEX_BATCH = 4096  # Paths appended between trigram index updates
+    LOAD_BATCH = 65536  # Loaded paths trigram-indexed per step
+    FULL_REFRESH_INTERVAL = 24 * 60 * 60  # Seconds before a saved index is listed in full again
+    DELTA_SLACK = 10 * 60  # Extra seconds of modifications a delta listing looks back
+    CONCURRENCY = 8  # Top-level directories listed at once; 1 lists the remote in one go
+    SHARD_RETRIES = 2  # Extra attempts for a top-level directory that fails to list
 
-    def __init__(self, remote):
+    def __init__(self, remote, cacheDir=None, concurrency=None, backend=None, cache=None):
         self.remote = remote
-        self._paths = []
+        self.concurrency = concurrency if concurrency is not None else self.CONCURRENCY
+        self.backend = backend  # Asked for an object count to estimate progress, if given
+        self.cache = cache  # Seeded with every directory listing, if given
+        self.indexPath = None
+        if cacheDir is not None:
+            name = urllib.parse.quote(remote, safe="") + ".idx"
+            self.indexPath = os.path.join(cacheDir, "index", name)
+        self._paths = pathstore()
+        self._trigrams = trigramindex(self._paths)
+        self._built_at = None  # When the latest listing merged into _paths started
+        self._full_at = None  # When the latest complete listing started
+        self._version = 0  # Bumped whenever _paths is replaced
+        self._patched = []  # Paths from add_paths() not merged into _paths yet
+        self._building = False  # A listing is running; it owns the trigram index
+        self._merging = threading.Lock()  # Held while add_paths() extends the trigram index
         self._ready = False
         self._failed = False
+        self._refreshing = False
         self._lock = threading.Lock()
         self._thread = None
-        self._process = None  # Track subprocess for cleanup on exit
+        self._processes = set()  # Running rclone listings, killed by stop()
+        self._stopped = threading.Event()
+        self._shards = {}  # Shard directory -> [state, paths listed]
+        self._progress = self._new_progress()
 
     def start(self):
-        """Start background indexing in a daemon thread."""
-        self._thread = threading.Thread(target=self._build, daemon=True)
+        """Load the saved index if there is one, then index in a daemon thread."""
+        self._load()
+        self._thread = threading.Thread(target=self._run, daemon=True)
         self._thread.start()
 
-    def _build(self):
-        """Fetch all paths recursively from the remote."""
-        process = None
+    def _load(self):
+        """Serve the saved index for this remote, if there is a valid one."""
+        if self.indexPath is None or not os.path.exists(self.indexPath):
+            return
         try:
-            args = ["rclone", "lsjson", "-R", self.remote]
-            process = subprocess.Popen(
-                args,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
+            paths, (built_at, full_at) = pathstore.load(self.indexPath)
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring saved search index %s: %s", self.indexPath, e)
+            return
+        with self._lock:
+            self._paths = paths
+            self._trigrams = trigramindex(paths)
+            self._built_at = built_at
+            self._full_at = full_at
+            self._version += 1
+            self._ready = True
+        logging.info("Loaded saved search index: %d paths for %s", len(paths), self.remote)
+
+    def _save(self):
+        """Write the current index to disk for the next session."""
+        if self.indexPath is None:
+            return
+        with self._lock:
+            # A full_at of 0 means no complete listing has been saved yet
+            paths, stamps = self._paths, (self._built_at, self._full_at or 0.0)
+        try:
+            os.makedirs(os.path.dirname(self.indexPath), exist_ok=True)
+            paths.save(self.indexPath, stamps)
+        except OSError as e:
+            logging.warning("Could not save search index for %s: %s", self.remote, e)
+
+    def _run(self):
+        with self._merging, self._lock:
+            self._building = True
+            self._refreshing = self._ready
+            trigrams = self._trigrams
+            # A recent full listing only needs topping up with what changed since
+            since = None
+            if self._ready and self._full_at and time.time() - self._full_at < self.FULL_REFRESH_INTERVAL:
+                since = self._built_at
+        # Index loaded paths a slice at a time; searches scan the rest meanwhile
+        while len(trigrams) < len(trigrams.paths):
+            trigrams.update(self.LOAD_BATCH)
+        try:
+            self._build(since)
+        finally:
+            with self._lock:
+                self._building = False
+                self._progress["finished"] = time.time()
+        # The listing may have started before these reached the remote
+        if self._merge_patched():
+            self._save()
+
+    @staticmethod
+    def _entry_path(entry):
+        """Return the indexed path for an lsjson entry, or None to skip it."""
+        if not isinstance(entry, dict):
+            return None
+        path = entry.get("Path", "")
+        if not path:
+            path = entry.get("Name", "")
+        if not path:
+            return None
+        # Append trailing / to directories so fuzzy search can distinguish them
+        if entry.get("IsDir", False) and not path.endswith("/"):
+            path += "/"
+        return path
+
+    def _fail(self, message, *args):
+        with self._lock:
+            if self._refreshing:
+                # Keep serving the saved index
+                self._refreshing = False
+                message += " (keeping saved index)"
+            else:
+                self._failed = True
+        logging.warning(message, *args)
+
+    def _stream(self, args, add):
+        """Run an rclone listing, passing the path and entry of each one to add().
+
+        add() returns False to stop the listing early. Raises
+        listingerror if the listing fails, even after some entries arrived.
+        """
+        timed_out = threading.Event()
+        process = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        with self._lock:
+            self._processes.add(process)
+        timer = None
+        try:
+            if self._stopped.is_set():
+                raise listingerror("stopped")
+
+            # Drain stderr concurrently so a chatty rclone can't fill the pipe
+            # and stall the stdout stream.
+            errors = []
+            drain = threading.Thread(
+                target=lambda: errors.extend(process.stderr), daemon=True
             )
-            self._process = process
-            try:
-                output, error = process.communicate(timeout=300)
-            except subprocess.TimeoutExpired:
+            drain.start()
+
+            def kill_on_timeout():
+                timed_out.set()
                 process.kill()
-                process.communicate()
-                logging.warning("Search index timed out for %s", self.remote)
-                with self._lock:
-                    self._failed = True
-                return
-            finally:
-                self._process = None
 
-            if error:
-                logging.warning("Search index rclone stderr for %s: %s", self.remote, error.strip())
+            timer = threading.Timer(self.TIMEOUT, kill_on_timeout)
+            timer.daemon = True
+            timer.start()
 
-            if not output or not output.strip():
-                with self._lock:
-                    self._failed = True
-                logging.warning("Search index failed for %s: no data returned", self.remote)
-                return
+            def counted(lines):
+                for line in lines:
+                    with self._lock:
+                        self._progress["bytes"] += len(line.encode())
+                    yield line
 
+            killed = False  # Stopped on purpose by add(), not failed
             try:
-                entries = json.loads(output)
+                for entry in iter_lsjson(counted(process.stdout)):
+                    path = self._entry_path(entry)
+                    if path is not None and add(path, entry) is False:
+                        killed = True
+                        process.kill()
+                        break
             except (json.JSONDecodeError, ValueError):
-                with self._lock:
-                    self._failed = True
-                logging.warning("Search index failed for %s: malformed JSON", self.remote)
-                return
+                raise listingerror("malformed JSON")
+            finally:
+                timer.cancel()
 
-            if not isinstance(entries, list):
-                with self._lock:
-                    self._failed = True
-                return
+            process.wait()
+            drain.join(timeout=5)
 
-            paths = []
-            for entry in entries:
-                if not isinstance(entry, dict):
-                    continue
-                path = entry.get("Path", "")
-                if not path:
-                    path = entry.get("Name", "")
-                if not path:
-                    continue
-                # Append trailing / to directories so fuzzy search can distinguish them
-                if entry.get("IsDir", False) and not path.endswith("/"):
-                    path += "/"
-                paths.append(path)
-                if len(paths) >= self.MAX_PATHS:
-                    logging.warning("Search index capped at %d paths for %s", self.MAX_PATHS, self.remote)
-                    break
+            if timed_out.is_set():
+                raise listingerror("timed out")
+
+            error = "".join(errors)
+            if error:
+                logging.warning("Search index rclone stderr for %s: %s", args[-1], error.strip())
+
+            # A listing cut short, by a dropped connection say, still printed
+            # entries; only a clean exit means they are all there
+            if process.returncode != 0 and not killed:
+                if self._stopped.is_set():
+                    raise listingerror("stopped")
+                raise listingerror(f"rclone exited with status {process.returncode}")
+        finally:
+            if timer is not None:
+                timer.cancel()
             with self._lock:
-                self._paths = paths
-                self._ready = True
-            logging.info("Search index ready: %d paths for %s", len(paths), self.remote)
-        except Exception as e:
-            if process and process.poll() is None:
+                self._processes.discard(process)
+            if process.poll() is None:
                 process.kill()
                 try:
                     process.communicate(timeout=5)
                 except Exception:
                     pass
+
+    def _target(self, path: str) -> str:
+        """Return the rclone target for a directory path relative to the remote."""
+        if not path or self.remote.endswith((":", "/")):
+            return self.remote + path
+        return self.remote + "/" + path
+
+    def _build(self, since=None):
+        """Fetch all paths recursively from the remote.
+
+        With since, only list objects modified after that time and add the
+        ones not indexed yet to the current paths.
+
+        With CONCURRENCY above 1, the top level is listed first and each
+        top-level directory is then listed recursively as its own shard,
+        CONCURRENCY at a time. A failed shard is retried SHARD_RETRIES times;
+        if it still fails, the other shards' paths are kept and the listing
+        is not counted as complete.
+        """
+        started = time.time()
+        with self._lock:
+            refreshing = self._refreshing
+            base, base_trigrams = self._paths, self._trigrams
+        if since is not None:
+            paths, trigrams = None, None
+        elif refreshing:
+            # List into a fresh store; the saved one stays searchable meanwhile
+            paths = pathstore()
+            trigrams = trigramindex(paths)
+        else:
+            paths, trigrams = base, base_trigrams
+        found = []
+        count = 0
+        cap = self.MAX_PATHS - (len(base) if since is not None else 0)
+        capped = threading.Event()
+        indexing = threading.Lock()
+        # Only a full listing holds every directory, deleted entries included
+        seeder = None
+        if since is None and self.cache is not None:
+            try:
+                seeder = self.cache.seeder(self.remote, started)
+            except Exception as e:
+                logging.warning("Not seeding the cache for %s: %s", self.remote, e)
+
+        def add(path, entry):
+            """Store path; return its position, or None once the cap is reached."""
+            nonlocal count
+            if capped.is_set() or self._stopped.is_set():
+                return None
+            if seeder is not None:
+                seeder.add(path, entry)
             with self._lock:
-                self._failed = True
-            logging.warning("Search index failed for %s: %s", self.remote, e)
+                target = found if paths is None else paths
+                target.append(path)
+                position = len(target) - 1
+                count += 1
+                full = count >= cap
+                self._progress["paths"] = count
+                if not path.endswith("/"):
+                    self._progress["files"] += 1
+            if paths is not None and count % self.INDEX_BATCH == 0:
+                # Another shard may be indexing already; it will catch these up
+                if indexing.acquire(blocking=False):
+                    try:
+                        trigrams.update()
+                    finally:
+                        indexing.release()
+            if full and not capped.is_set():
+                capped.set()
+                logging.warning("Search index capped at %d paths for %s", self.MAX_PATHS, self.remote)
+            return position
+
+        def stored(position):
+            return found[position] if paths is None else paths[position]
+
+        extra = []
+        if since is not None:
+            # Slack covers clock skew between here and the remote
+            age = max(1, int(started - since + self.DELTA_SLACK))
+            extra = ["--max-age", f"{age}s"]
+
+        errors = {}  # Shard name -> its last error
+
+        with self._lock:
+            self._progress = self._new_progress(started)
+        if since is None and self.backend is not None:
+            threading.Thread(target=self._estimate, daemon=True).start()
+
+        def list_shard(name, retries):
+            """List one shard, retrying on failure. Return True on success."""
+            args = ["rclone", "lsjson", "-R", self._target(name)] + extra
+            positions = []  # Where this shard's paths went, to skip them on a retry
+            for attempt in range(retries + 1):
+                skip = set()
+                if positions:
+                    with self._lock:
+                        skip = {stored(i) for i in positions}
+                self._set_shard(name, "listing" if attempt == 0 else "retrying")
+
+                def add_shard_path(path, entry):
+                    path = name + path
+                    if path in skip:
+                        skip.discard(path)
+                        return True
+                    position = add(path, entry)
+                    if position is None:
+                        return False
+                    positions.append(position)
+                    self._set_shard(name, count=len(positions))
+                    return True
+
+                try:
+                    self._stream(args, add_shard_path)
+                    self._set_shard(name, "done")
+                    return True
+                except Exception as e:
+                    errors[name] = e
+                if self._stopped.is_set():
+                    break
+                logging.warning("Search index shard %r of %s failed: %s", name, self.remote, errors[name])
+            self._set_shard(name, "failed")
+            return False
+
+        complete = True
+        try:
+            if self.concurrency <= 1:
+                with self._lock:
+                    self._shards = {"": ["pending", 0]}
+                # A single listing is not retried; its failure fails the build
+                if not list_shard("", 0):
+                    raise errors[""]
+            else:
+                shards = []
+
+                def add_top(path, entry):
+                    if path.endswith("/"):
+                        shards.append(path)
+                    return add(path, entry) is not None
+
+                self._stream(["rclone", "lsjson", self._target("")] + extra, add_top)
+                with self._lock:
+                    self._shards = {name: ["pending", 0] for name in shards}
+                with concurrent.futures.ThreadPoolExecutor(self.concurrency) as pool:
+                    results = list(pool.map(lambda name: list_shard(name, self.SHARD_RETRIES), shards))
+                complete = all(results)
+                if not complete:
+                    failed = [name for name, ok in zip(shards, results) if not ok]
+                    logging.warning("Search index for %s is missing %s", self.remote, ", ".join(failed))
+            if self._stopped.is_set():
+                raise listingerror("stopped")
+            if since is not None:
+                paths, trigrams, _ = self._apply_delta(base, base_trigrams, found)
+            with indexing:
+                trigrams.update()
+        except Exception as e:
+            if seeder is not None:
+                self._seed(seeder, False)
+            self._fail("Search index failed for %s: %s", self.remote, e)
+            return
+
+        with self._lock:
+            self._paths, self._trigrams = paths, trigrams
+            self._built_at = started
+            if since is None and complete:
+                self._full_at = started
+            if self._refreshing:
+                self._version += 1
+                self._refreshing = False
+            self._ready = True
+        logging.info("Search index ready: %d paths for %s", len(paths), self.remote)
+        self._save()
+        if seeder is not None:
+            self._seed(seeder, complete and not capped.is_set())
+
+    def _seed(self, seeder, complete):
+        """Cache the directory listings staged by a full listing if it was complete."""
+        try:
+            if not complete:
+                seeder.discard()
+                return
+            dirs = seeder.commit()
+            logging.info("Seeded %d cached directory listings for %s", dirs, self.remote)
+        except Exception as e:
+            logging.warning("Could not seed the cache for %s: %s", self.remote, e)
+
+    def _apply_delta(self, base, trigrams, found):
+        """Return (paths, trigrams, added) with the new paths in found appended to base."""
+        new = dict.fromkeys(found)
+        if new:
+            for path in base:
+                if path in new:
+                    del new[path]
+                    if not new:
+                        break
+        if not new:
+            return base, trigrams, 0
+        paths = base.copy()
+        paths.extend(new)
+        logging.info("Search index delta: %d new paths for %s", len(new), self.remote)
+        return paths, trigrams.extended(paths), len(new)
+
+    def add_paths(self, paths):
+        """Add paths that now exist on the remote, such as an upload's, without listing it.
+
+        Directories end in /. While a listing runs the paths wait for it to
+        finish, then are added to its result.
+        """
+        paths = list(paths)
+        if not paths:
+            return
+        with self._lock:
+            self._patched.extend(paths)
+            if self._building:
+                return
+        if self._merge_patched():
+            self._save()
+
+    def _merge_patched(self):
+        """Append the paths from add_paths() to the served ones; return True if any were new."""
+        with self._merging:
+            with self._lock:
+                if not self._patched or not self._ready or self._building:
+                    return False
+                patched, self._patched = self._patched, []
+                base, trigrams = self._paths, self._trigrams
+            paths, trigrams, added = self._apply_delta(base, trigrams, patched)
+            if not added:
+                return False
+            trigrams.update()
+            with self._lock:
+                self._paths, self._trigrams = paths, trigrams
+                self._version += 1
+            return True
 
     def is_ready(self):
         """Return True if the index has been built successfully."""
@@ -309,17 +1401,102 @@ class searchindex:
         with self._lock:
             return self._failed
 
+    def count(self):
+        """Return how many paths have been indexed so far."""
+        with self._lock:
+            return len(self._paths)
+
     def get_paths(self):
-        """Return the list of all indexed paths, or empty list if not ready."""
+        """Return a read-only view of the paths indexed so far (all of them once is_ready())."""
+        with self._lock:
+            return self._paths.view()
+
+    def get_index(self):
+        """Return the trigram index over the paths, kept current as they stream in."""
         with self._lock:
-            return list(self._paths) if self._ready else []
+            return self._trigrams
+
+    def is_refreshing(self):
+        """Return True while a saved index is served and a new listing runs."""
+        with self._lock:
+            return self._refreshing
+
+    def built_at(self):
+        """Return when the listing behind the served paths started, or None."""
+        with self._lock:
+            return self._built_at
+
+    def version(self):
+        """Return a counter that changes whenever the served paths are replaced."""
+        with self._lock:
+            return self._version
+
+    @staticmethod
+    def _new_progress(started=None):
+        return {
+            "started": started, "finished": None,
+            "paths": 0, "files": 0, "bytes": 0, "objects": None,
+        }
+
+    def _estimate(self):
+        """Ask the backend how many objects the remote holds, for stats()."""
+        try:
+            about = self.backend.about(self.remote)
+        except Exception as e:
+            logging.info("No object count for %s: %s", self.remote, e)
+            return
+        objects = about.get("objects") if about else None
+        if isinstance(objects, int) and objects > 0:
+            with self._lock:
+                self._progress["objects"] = objects
+
+    def stats(self):
+        """Return live counters for the listing in progress (or the last one).
+
+        paths and files listed so far, bytes of lsjson parsed, elapsed
+        seconds and paths per second. When the backend reports an object
+        count, objects holds it and eta the estimated seconds left;
+        otherwise both are None.
+        """
+        with self._lock:
+            progress = dict(self._progress)
+        started = progress.pop("started")
+        finished = progress.pop("finished") or time.time()
+        elapsed = finished - started if started is not None else 0.0
+        rate = progress["paths"] / elapsed if elapsed > 0 else 0.0
+        file_rate = progress["files"] / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if progress["objects"] is not None and file_rate > 0:
+            eta = max(0.0, (progress["objects"] - progress["files"]) / file_rate)
+        progress.update(elapsed=elapsed, rate=rate, eta=eta)
+        return progress
+
+    def shards(self):
+        """Return [(directory, state, paths listed)] for the listing in progress.
+
+        state is one of pending, listing, retrying, done or failed. A
+        listing that is not sharded shows as one shard named "".
+        """
+        with self._lock:
+            return [(name, state, count) for name, (state, count) in self._shards.items()]
+
+    def _set_shard(self, name, state=None, count=None):
+        with self._lock:
+            shard = self._shards.setdefault(name, ["pending", 0])
+            if state is not None:
+                shard[0] = state
+            if count is not None:
+                shard[1] = count
 
     def stop(self):
-        """Kill the background rclone subprocess if still running."""
-        proc = self._process
-        if proc and proc.poll() is None:
-            proc.kill()
-            try:
-                proc.communicate(timeout=5)
-            except Exception:
-                pass
+        """Stop indexing and kill any rclone listings still running."""
+        self._stopped.set()
+        with self._lock:
+            processes = list(self._processes)
+        for proc in processes:
+            if proc.poll() is None:
+                proc.kill()
+                try:
+                    proc.communicate(timeout=5)
+                except Exception:
+                    pass
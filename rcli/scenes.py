@@ -4,9 +4,11 @@ from typing import Optional, List, Callable
 from .enums import CHOICE, SCENES
 from .rclone import *
 from .forms import *
+from .utils import format_size, format_duration
 import os
 import time
-from threading import Thread
+from threading import Thread, Event
+import logging
 
 class scene(ABC):
     def __init__(self):
@@ -37,35 +39,218 @@ class scene(ABC):
 
 
 class choosefilescene(scene):
-    def __init__(self, remote, cache, folderDir=None):
+    LOAD_GRACE = 0.05  # Seconds a listing may take before "Loading" is shown
+    SPINNER = "|/-\\"
+
+    TRANSFERS_POLL_MS = 500  # getch timeout while background transfers run
+
+    def __init__(self, remote, cache, folderDir=None, transfers=None):
         super().__init__()
         self.remote = remote
         self.cache = cache
         self.folderDir = folderDir if folderDir is not None else []
+        # transfermanager to queue downloads on; without one d does nothing
+        self.transfers = transfers
         self.choiceForum = None
         self.nextScene = None
         self.data = None
+        self._prefetchCursor = None  # Cursor position the queued prefetch was built for
+        self._loading = None  # (thread, cancel event, [entries]) for the listing under way
+        self._revalidating = None  # Event set once a stale listing on screen is refreshed
+        self._transfersVersion = transfers.version() if transfers is not None else None
+        self._quitArmed = False  # q pressed once with transfers unfinished
 
     def _current_path(self):
         if not self.folderDir:
             return ""
         return "/".join(self.folderDir) + "/"
 
+    def _startload(self):
+        """List the current directory on a background thread."""
+        path = self._current_path()
+        cancel = Event()
+        result = []
+
+        def load():
+            try:
+                result.append(self.cache.listdir(self.remote, path, cancel=cancel, stale=True))
+            except Exception:
+                logging.exception("Listing %s%s failed", self.remote, path)
+
+        thread = Thread(target=load, daemon=True)
+        thread.start()
+        # Cached listings come back at once; don't flash the loading screen
+        thread.join(self.LOAD_GRACE)
+        self._loading = (thread, cancel, result)
+
+    def _cancelload(self):
+        """Abandon the listing under way, killing its rclone process."""
+        if self._loading is not None:
+            self._loading[1].set()
+            self._loading = None
+
+    def _showloading(self, stdscr):
+        """Draw the loading row while the listing runs, and handle cancel keys."""
+        rows, cols = stdscr.getmaxyx()
+        frame = self.SPINNER[int(time.time() * 10) % len(self.SPINNER)]
+        bar = "[esc/h] back   [q] quit" if self.folderDir else "[q] quit"
+        try:
+            stdscr.addstr(1, 1, self._current_path()[:max(0, cols - 2)])
+            stdscr.addstr(3, 1, f"{frame} Loading {self.remote}{self._current_path()}..."[:max(0, cols - 2)])
+            padding = " " * max(0, cols - 1 - len(bar))
+            stdscr.addstr(rows - 1, 0, bar + padding, curses.A_REVERSE)
+        except curses.error:
+            pass
+
+        stdscr.timeout(100)
+        c = stdscr.getch()
+        stdscr.timeout(-1)
+
+        if c in (27, ord("h")) and self.folderDir:
+            self._cancelload()
+            self.folderDir.pop()
+        elif c == ord("q"):
+            self._cancelload()
+            self.nextScene = SCENES.EXIT
+        elif c == curses.KEY_RESIZE:
+            curses.resizeterm(*stdscr.getmaxyx())
+
+    def _prefetch(self):
+        """Queue the subdirectories around the cursor for listing, nearest first."""
+        component = self.choiceForum.choiceComponent
+        cursor = component.elementIndex
+        if cursor == self._prefetchCursor:
+            return
+        self._prefetchCursor = cursor
+        dirs = sorted(
+            (abs(i - cursor), i)
+            for i, entry in enumerate(component.choices)
+            if entry.get("IsDir", False)
+        )
+        # About a screenful: what the user can reach without scrolling far
+        base = self._current_path()
+        self.cache.prefetch(
+            self.remote,
+            [base + component.choices[i]["Name"].rstrip("/") + "/" for _, i in dirs[:component.brect.h]],
+        )
+
+    def _reload(self):
+        """Bring the cached listing of the current directory up to date in the background.
+
+        Returns an Event set once it is, for _swap_in_revalidated to pick up.
+        """
+        path = self._current_path()
+        done = Event()
+
+        def reload():
+            try:
+                self.cache.listdir(self.remote, path)
+            except Exception:
+                logging.exception("Reloading %s%s failed", self.remote, path)
+            finally:
+                done.set()
+
+        Thread(target=reload, daemon=True).start()
+        return done
+
+    def _watch_transfers(self):
+        """Show the background transfers' summary, and reload the listing when one ends.
+
+        A finished upload has already written itself through to the cache,
+        so the reload is usually a cache hit.
+        """
+        self.choiceForum.settransfers(format_transfers(self.transfers))
+        version = self.transfers.version()
+        if version != self._transfersVersion and self._revalidating is None:
+            self._transfersVersion = version
+            self._revalidating = self._reload()
+
+    def _download(self, path, is_dir):
+        """Queue a download of path, a folder into the same relative path, a file into the current directory."""
+        self.transfers.add(
+            self.remote + path,
+            path if is_dir else ".",
+            title=f"Download {self.remote}{path}",
+            src_is_file=not is_dir,
+        )
+
+    def _download_marked(self, entries):
+        """Queue the marked entries: the files as one batch copy, each folder on its own.
+
+        One rclone call for the files lets rclone run them side by side with
+        its own --transfers, instead of starting and authenticating rclone
+        once per file. A name with a line break cannot go in the
+        --files-from-raw list, so such a file is downloaded by itself.
+        """
+        base = self._current_path()
+        files = []
+        for entry in entries:
+            name = entry["Name"]
+            if entry.get("IsDir", False) or "\n" in name or "\r" in name:
+                self._download(base + name, entry.get("IsDir", False))
+            else:
+                files.append(name)
+        if len(files) == 1:
+            self._download(base + files[0], False)
+        elif files:
+            self.transfers.add(
+                self.remote + base.rstrip("/"),
+                ".",
+                title=f"Download {len(files)} files from {self.remote}{base}",
+                src_is_file=False,
+                files=files,
+            )
+
+    def _swap_in_revalidated(self):
+        """Patch the refreshed listing into the open forum if it changed."""
+        self._revalidating = None
+        entries = self.cache.listdir(self.remote, self._current_path(), stale=True)
+        if entries != self.choiceForum.options:
+            self.choiceForum.setoptions(entries)
+            self._prefetchCursor = None
+        self.choiceForum.setstatus(None)
+
     def show(self, stdscr):
         if self.choiceForum is None:
-            entries = self.cache.listdir(self.remote, self._current_path())
+            if self._loading is None:
+                self._startload()
+            thread, _, result = self._loading
+            if thread.is_alive():
+                self._showloading(stdscr)
+                return
+            self._loading = None
+            entries = result[0] if result and result[0] is not None else []
             self.choiceForum = choiceforum(
                 entries,
                 len(self.folderDir) > 0,
                 self._current_path(),
                 self.registerKeyListener,
             )
+            self._revalidating = self.cache.revalidate(self.remote, self._current_path())
+            if self._revalidating is not None:
+                self.choiceForum.setstatus("cached, refreshing")
+        elif self._revalidating is not None and self._revalidating.is_set():
+            self._swap_in_revalidated()
+        if self.transfers is not None:
+            self._watch_transfers()
 
         self.choiceForum.draw(stdscr)
+        self._prefetch()
 
+        # Poll while a stale listing is refreshed, to show the result,
+        # and while transfers run, to keep their progress current
+        if self._revalidating is not None:
+            stdscr.timeout(200)
+        elif self.transfers is not None and self.transfers.active():
+            stdscr.timeout(self.TRANSFERS_POLL_MS)
         c = stdscr.getch()
+        stdscr.timeout(-1)
         self.broadcastKeyEvent(c)
 
+        if self._quitArmed and c not in (-1, ord("q")):
+            self._quitArmed = False
+            self.choiceForum.setstatus(None)
+
         if c == ord("/"):
             self.nextScene = SCENES.FUZZY_SEARCH
 
@@ -86,19 +271,45 @@ class choosefilescene(scene):
 
             elif choice.choice == CHOICE.DOWNLOAD:
                 entry = choice.data
-                name = entry["Name"]
-                fullPath = self._current_path() + name
-                self.data = (fullPath, entry.get("IsDir", False))
-                self.nextScene = SCENES.DOWNLOAD
+                marked = self.choiceForum.choiceComponent.markedchoices()
+                if self.transfers is not None and marked:
+                    # The marked entries rather than the one under the cursor
+                    self._download_marked(marked)
+                    self.choiceForum.choiceComponent.clearmarks()
+                    self.choiceForum.clearchoice()
+                elif entry is None or self.transfers is None:
+                    self.choiceForum.clearchoice()
+                else:
+                    # Queue it and keep browsing
+                    self._download(self._current_path() + entry["Name"], entry.get("IsDir", False))
+                    self.choiceForum.clearchoice()
 
             elif choice.choice == CHOICE.UPLOAD:
                 self.nextScene = SCENES.UPLOAD
 
+            elif choice.choice == CHOICE.TRANSFERS:
+                if self.transfers is not None:
+                    self.nextScene = SCENES.TRANSFERS
+                else:
+                    self.choiceForum.clearchoice()
+
             elif choice.choice == CHOICE.REFRESH:
                 self.nextScene = SCENES.REFRESH_DATABASE
 
             elif choice.choice == CHOICE.QUIT:
-                self.nextScene = SCENES.EXIT
+                active = self.transfers.active() if self.transfers is not None else 0
+                if active and not self._quitArmed:
+                    self._quitArmed = True
+                    self.choiceForum.setstatus(f"{active} transfers unfinished, [q] again to cancel them and quit")
+                    self.choiceForum.clearchoice()
+                else:
+                    self.nextScene = SCENES.EXIT
+
+        if self.choiceForum is None or self.nextScene is not None:
+            # Leaving this directory: its subdirectories are no longer wanted
+            self.cache.cancel_prefetch()
+            self._prefetchCursor = None
+            self._revalidating = None
 
     def getNextScene(self) -> Optional[int]:
         return self.nextScene
@@ -108,14 +319,21 @@ class choosefilescene(scene):
 
 
 class fuzzyscene(scene):
-    def __init__(self, remote, cache, folderDir=None, search_index=None):
+    REFRESH_INTERVAL = 0.5  # Seconds between pulls from a still-building index
+    SEARCH_POLL_MS = 30  # getch timeout while a search is running
+
+    def __init__(self, remote, cache, folderDir=None, search_index=None, processes=0):
         super().__init__()
         self.remote = remote
         self.cache = cache
         self.folderDir = folderDir if folderDir is not None else []
         self.search_index = search_index
+        self.processes = processes  # Processes to match a finished index on
         self.fuzzyForum = None
         self.nextScene = None
+        self._lastRefresh = 0
+        self._searchingIndex = False
+        self._indexVersion = None  # search_index.version() the open search shows
 
     def _index_is_building(self):
         """Return True if the search index exists and is still in progress."""
@@ -123,13 +341,79 @@ class fuzzyscene(scene):
             return False
         return not self.search_index.is_ready() and not self.search_index.has_failed()
 
+    def _index_is_refreshing(self):
+        return self._indexVersion is not None and self.search_index.is_refreshing()
+
+    def _indexing_text(self):
+        stats = self.search_index.stats()
+        text = f"[esc] back   [!] indexing remote, {self.search_index.count():,} paths so far"
+        shards = self.search_index.shards()
+        if len(shards) > 1:
+            done = sum(1 for _, state, _ in shards if state in ("done", "failed"))
+            text += f", {done}/{len(shards)} folders"
+        text += f", {stats['rate']:,.0f}/s"
+        if stats["eta"] is not None:
+            text += f", ~{format_duration(stats['eta'])} left"
+        return text
+
+    def _progress_lines(self):
+        """Return the lines describing the index build on the wait screen."""
+        stats = self.search_index.stats()
+        lines = [
+            f"{stats['paths']:,} paths · {format_size(stats['bytes'])} parsed · "
+            f"{stats['rate']:,.0f} paths/s · {format_duration(stats['elapsed'])} elapsed"
+        ]
+        if stats["objects"] is not None:
+            line = f"about {stats['objects']:,} objects"
+            if stats["eta"] is not None:
+                line += f", ~{format_duration(stats['eta'])} left"
+            lines.append(line)
+        return lines
+
+    def _swap_in_refreshed_index(self):
+        """Switch the open search over once a saved index has been replaced."""
+        version = self.search_index.version()
+        if version != self._indexVersion:
+            self._indexVersion = version
+            self.fuzzyForum.fuzzycomponent.setdata(
+                self.search_index.get_paths(), index=self.search_index.get_index()
+            )
+        if self.search_index.is_refreshing():
+            self.fuzzyForum.setpartial("[esc] back   [!] searching saved index, refreshing")
+        else:
+            self.fuzzyForum.setpartial(None)
+
+    def _refresh_from_index(self):
+        """Pull newly indexed paths into the open search while the index builds."""
+        building = self._index_is_building()
+        now = time.time()
+        if building and now - self._lastRefresh < self.REFRESH_INTERVAL:
+            return
+        self._lastRefresh = now
+        if not building and self.search_index.has_failed():
+            # Keep what was indexed before the failure
+            self._searchingIndex = False
+            self.fuzzyForum.setpartial("[esc] back   [!] indexing failed, showing partial results")
+            return
+        if not building:
+            # Only shard the paths across processes once they stop growing
+            self.fuzzyForum.fuzzycomponent.processes = self.processes
+        self.fuzzyForum.fuzzycomponent.setdata(self.search_index.get_paths())
+        if building:
+            self.fuzzyForum.setpartial(self._indexing_text())
+        else:
+            self._searchingIndex = False
+            self.fuzzyForum.setpartial(None)
+
     def show(self, stdscr):
-        # If we haven't built the fuzzy forum yet, check index status
-        if self.fuzzyForum is None and self._index_is_building():
+        # Wait for the index to produce its first paths before searching it
+        if self.fuzzyForum is None and self._index_is_building() and self.search_index.count() == 0:
             rows, cols = stdscr.getmaxyx()
-            msg = "Indexing remote for search..."
+            lines = ["Indexing remote for search..."] + self._progress_lines()
             try:
-                stdscr.addstr(rows // 2, max(0, (cols - len(msg)) // 2), msg)
+                for i, msg in enumerate(lines):
+                    msg = msg[:max(0, cols - 1)]
+                    stdscr.addstr(rows // 2 + i, max(0, (cols - len(msg)) // 2), msg)
                 bar = "[esc] back   [s] search visited paths"
                 padding = " " * max(0, cols - 1 - len(bar))
                 stdscr.addstr(rows - 1, 0, bar + padding, curses.A_REVERSE)
@@ -150,21 +434,49 @@ class fuzzyscene(scene):
 
         # Build fuzzy forum from the best available source
         if self.fuzzyForum is None:
-            partial = False
-            if self.search_index is not None and self.search_index.is_ready():
+            if self._index_is_building():
+                pathList = self.search_index.get_paths()
+                self.fuzzyForum = fuzzyforum(
+                    pathList, self.registerKeyListener, partial=True,
+                    index=self.search_index.get_index(),
+                )
+                self.fuzzyForum.setpartial(self._indexing_text())
+                self._lastRefresh = time.time()
+                self._searchingIndex = True
+            elif self.search_index is not None and self.search_index.is_ready():
+                self._indexVersion = self.search_index.version()
                 pathList = self.search_index.get_paths()
+                self.fuzzyForum = fuzzyforum(
+                    pathList, self.registerKeyListener,
+                    index=self.search_index.get_index(), processes=self.processes,
+                )
+                self._swap_in_refreshed_index()
             else:
                 pathList = self.cache.get_all_cached_paths(self.remote)
-                partial = True
-            self.fuzzyForum = fuzzyforum(pathList, self.registerKeyListener, partial=partial)
+                self.fuzzyForum = fuzzyforum(pathList, self.registerKeyListener, partial=True)
+        elif self._searchingIndex:
+            self._refresh_from_index()
+        elif self._indexVersion is not None:
+            self._swap_in_refreshed_index()
 
         self.fuzzyForum.draw(stdscr)
 
+        # Redraw soon while a search runs in the background, and
+        # periodically while the index is still growing
+        if self.fuzzyForum.searching():
+            stdscr.timeout(self.SEARCH_POLL_MS)
+        elif self._searchingIndex or self._index_is_refreshing():
+            stdscr.timeout(200)
+        else:
+            stdscr.timeout(-1)
         c = stdscr.getch()
-        self.broadcastKeyEvent(c)
+        stdscr.timeout(-1)
+        if c != -1:
+            self.broadcastKeyEvent(c)
 
         # User selected a path
         if self.fuzzyForum.getdata() is not None:
+            self.fuzzyForum.stop()
             self.nextScene = SCENES.CHOOSE_FILE
 
     def getNextScene(self) -> Optional[int]:
@@ -176,46 +488,6 @@ class fuzzyscene(scene):
         return None
 
 
-class downloadscene(scene):
-    def __init__(self, downloadPath, destination, folderDir=None):
-        super().__init__()
-        self.rclone = rclone()
-        self.downloadPath = downloadPath
-        self.destination = destination
-        self.folderDir = folderDir if folderDir else []
-        self.nextScene = None
-        self.commandforum = commandforum(
-            ["rclone", "copy", "-P", self.downloadPath, self.destination]
-        )
-
-    def show(self, stdscr) -> None:
-        self.commandforum.draw(stdscr)
-
-        if self.commandforum.getdata() != None:
-            self.nextScene = SCENES.CHOOSE_FILE
-            return
-
-        # Allow user to cancel with q or ESC while command is running
-        stdscr.timeout(200)
-        c = stdscr.getch()
-        stdscr.timeout(-1)
-        if c == ord('q') or c == 27:
-            self.commandforum.commandcomponent.kill()
-            self.nextScene = SCENES.CHOOSE_FILE
-        elif c == curses.KEY_RESIZE:
-            curses.resizeterm(*stdscr.getmaxyx())
-
-    def getNextScene(self) -> Optional[int]:
-        return self.nextScene
-
-    def getdata(self) -> Optional[object]:
-        if self.commandforum.getdata() == True:
-            # Return path that restores to the original folder
-            # Adding a dummy element since cursedcli removes the last element
-            return "/".join(self.folderDir + ["_"])
-        return None
-
-
 class remotepickerscene(scene):
     def __init__(self, rc):
         super().__init__()
@@ -274,14 +546,18 @@ class remotepickerscene(scene):
 
 
 class uploadscene(scene):
-    def __init__(self, remote, cache, folderDir=None):
+    def __init__(self, remote, cache, transfers, folderDir=None, search_index=None):
         super().__init__()
         self.remote = remote
         self.cache = cache
+        self.search_index = search_index
+        self.transfers = transfers  # transfermanager to queue the upload on
         self.folderDir = folderDir if folderDir else []
         self.nextScene = None
         self.local_path = ""
-        self.commandforum = None
+        self.transfer = None
+        self.queued = False
+        self._written = False  # Whether the cache has been brought up to date
 
     def _current_path(self):
         if not self.folderDir:
@@ -291,56 +567,127 @@ class uploadscene(scene):
     def _remote_dest(self):
         return self.remote + self._current_path()
 
-    def show(self, stdscr) -> None:
-        if self.commandforum is None:
-            # Input phase: prompt for local file path
-            rows, cols = stdscr.getmaxyx()
-            try:
-                stdscr.addstr(1, 1, f"Upload to: {self._remote_dest()}")
-                stdscr.addstr(3, 1, "Local path: " + self.local_path)
-                bar_text = "[enter] upload   [esc] cancel"
-                padding = " " * max(0, cols - 1 - len(bar_text))
-                stdscr.addstr(rows - 1, 0, bar_text + padding, curses.A_REVERSE)
-            except curses.error:
-                pass
+    def _update_cache(self, succeeded: bool):
+        """Write the uploaded files through to the cache and search index.
 
-            c = stdscr.getch()
+        If the upload failed or was cancelled, or the local files cannot be
+        read back, the destination is invalidated instead.
+        """
+        if self._written:
+            return
+        self._written = True
+        listing = None
+        if succeeded:
+            try:
+                listing = local_listing(self.local_path)
+            except OSError as e:
+                logging.warning("Could not read back upload %s: %s", self.local_path, e)
+        paths = self.cache.uploaded(self.remote, self._current_path(), listing)
+        if paths and self.search_index is not None:
+            self.search_index.add_paths(paths)
 
-            if c == 27:  # Escape
-                self.nextScene = SCENES.CHOOSE_FILE
-            elif c == curses.KEY_ENTER or c == 10:
-                if self.local_path:
-                    self.commandforum = commandforum(
-                        ["rclone", "copy", "-P", self.local_path, self._remote_dest()]
-                    )
-            elif c == curses.KEY_BACKSPACE or c == 127:
-                self.local_path = self.local_path[:-1]
-            elif 32 <= c < 127:  # Printable ASCII
-                self.local_path += chr(c)
-        else:
-            # Command phase: show upload progress
-            self.commandforum.draw(stdscr)
+    def show(self, stdscr) -> None:
+        # Prompt for the local path; the upload itself runs in the background
+        rows, cols = stdscr.getmaxyx()
+        try:
+            stdscr.addstr(1, 1, f"Upload to: {self._remote_dest()}")
+            stdscr.addstr(3, 1, "Local path: " + self.local_path)
+            bar_text = "[enter] upload   [esc] cancel"
+            padding = " " * max(0, cols - 1 - len(bar_text))
+            stdscr.addstr(rows - 1, 0, bar_text + padding, curses.A_REVERSE)
+        except curses.error:
+            pass
 
-            if self.commandforum.getdata() is not None:
-                self.cache.invalidate(self.remote, self._current_path())
-                self.nextScene = SCENES.CHOOSE_FILE
-                return
+        c = stdscr.getch()
 
-            # Allow user to cancel with q or ESC while command is running
-            stdscr.timeout(200)
-            c = stdscr.getch()
-            stdscr.timeout(-1)
-            if c == ord('q') or c == 27:
-                self.commandforum.commandcomponent.kill()
+        if c == 27:  # Escape
+            self.nextScene = SCENES.CHOOSE_FILE
+        elif c == curses.KEY_ENTER or c == 10:
+            if self.local_path:
+                # Written through to the cache from the job's thread once it ends
+                self.transfer = self.transfers.add(
+                    self.local_path,
+                    self._remote_dest(),
+                    title=f"Upload {self.local_path} to {self._remote_dest()}",
+                    on_done=lambda job, succeeded: self._update_cache(succeeded),
+                )
+                self.queued = True
                 self.nextScene = SCENES.CHOOSE_FILE
-            elif c == curses.KEY_RESIZE:
-                curses.resizeterm(*stdscr.getmaxyx())
+        elif c == curses.KEY_BACKSPACE or c == 127:
+            self.local_path = self.local_path[:-1]
+        elif 32 <= c < 127:  # Printable ASCII
+            self.local_path += chr(c)
 
     def getNextScene(self) -> Optional[int]:
         return self.nextScene
 
     def getdata(self) -> Optional[object]:
-        if self.commandforum and self.commandforum.getdata() == True:
+        if self.queued:
+            # Return path that restores to the original folder
+            return "/".join(self.folderDir + ["_"])
+        return None
+
+
+class transferscene(scene):
+    """The jobs panel: the background transfers, to follow, cancel and reorder."""
+
+    POLL_MS = 500  # getch timeout, to keep the progress current
+
+    def __init__(self, manager, folderDir=None, profiles=None):
+        super().__init__()
+        self.manager = manager
+        self.folderDir = folderDir if folderDir else []
+        self.profiles = profiles  # transferprofiles that f cycles through
+        self.nextScene = None
+        self.jobsForum = jobsforum(manager, self.registerKeyListener, switchable=profiles is not None)
+        self.detail = None  # transferforum of the job opened with enter
+
+    def _getch(self, stdscr):
+        stdscr.timeout(self.POLL_MS)
+        c = stdscr.getch()
+        stdscr.timeout(-1)
+        if c == curses.KEY_RESIZE:
+            curses.resizeterm(*stdscr.getmaxyx())
+        return c
+
+    def _show_detail(self, stdscr):
+        job = self.detail.transfer
+        if not job.is_done():
+            self.detail.bar.text = "[x] cancel   [esc] back"
+        self.detail.draw(stdscr)
+        c = self._getch(stdscr)
+        if c == ord("x"):
+            self.manager.cancel(job)
+        elif c in (27, ord("h"), ord("q"), curses.KEY_ENTER, 10):
+            self.detail = None
+
+    def show(self, stdscr):
+        if self.detail is not None:
+            self._show_detail(stdscr)
+            return
+
+        self.jobsForum.draw(stdscr)
+        c = self._getch(stdscr)
+        if c in (27, ord("h"), ord("q")):
+            self.nextScene = SCENES.CHOOSE_FILE
+        elif c == ord("c"):
+            self.manager.clear_finished()
+        elif c == ord("f") and self.profiles is not None:
+            # Jobs already queued keep the profile they were added with
+            self.manager.profile = self.profiles.next(self.manager.profile)
+        elif c != -1:
+            self.broadcastKeyEvent(c)
+
+        job = self.jobsForum.getdata()
+        if job is not None:
+            self.jobsForum.jobscomponent.opened = None
+            self.detail = transferforum(job, job.title)
+
+    def getNextScene(self) -> Optional[int]:
+        return self.nextScene
+
+    def getdata(self):
+        if self.nextScene is not None:
             # Return path that restores to the original folder
             return "/".join(self.folderDir + ["_"])
         return None
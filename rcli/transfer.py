@@ -0,0 +1,483 @@
+import os
+import io
+import re
+import json
+import codecs
+import locale
+import logging
+import subprocess
+import tempfile
+import threading
+from .rclone import rclonercd
+
+
+class transferstats:
+    """One snapshot of a transfer's progress, as rclone reports it.
+
+    Built from the stats block rclone logs with --use-json-log, which has the
+    same shape as the rc core/stats response. eta is None while unknown.
+    transferring lists the files in flight, each a dict with name, bytes,
+    size, percentage, speed and eta.
+    """
+
+    def __init__(self, bytes=0, total_bytes=0, speed=0.0, eta=None, transfers=0, total_transfers=0,
+                 checks=0, total_checks=0, errors=0, last_error="", elapsed=0.0, transferring=None):
+        self.bytes = bytes
+        self.total_bytes = total_bytes
+        self.speed = speed  # Bytes per second
+        self.eta = eta  # Seconds
+        self.transfers = transfers
+        self.total_transfers = total_transfers
+        self.checks = checks
+        self.total_checks = total_checks
+        self.errors = errors
+        self.last_error = last_error
+        self.elapsed = elapsed
+        self.transferring = transferring or []
+
+    @staticmethod
+    def _number(value, default=0):
+        return value if isinstance(value, (int, float)) and not isinstance(value, bool) else default
+
+    @classmethod
+    def fromrclone(cls, stats: dict):
+        """Build a snapshot from an rclone stats dict, tolerating missing or odd fields."""
+        number = cls._number
+        transferring = []
+        for item in stats.get("transferring") or []:
+            if not isinstance(item, dict):
+                continue
+            transferring.append({
+                "name": str(item.get("name", "")),
+                "bytes": number(item.get("bytes")),
+                "size": number(item.get("size")),
+                "percentage": number(item.get("percentage")),
+                "speed": number(item.get("speedAvg", item.get("speed")), 0.0),
+                "eta": number(item.get("eta"), None),
+            })
+        return cls(
+            bytes=number(stats.get("bytes")),
+            total_bytes=number(stats.get("totalBytes")),
+            speed=number(stats.get("speed"), 0.0),
+            eta=number(stats.get("eta"), None),
+            transfers=number(stats.get("transfers")),
+            total_transfers=number(stats.get("totalTransfers")),
+            checks=number(stats.get("checks")),
+            total_checks=number(stats.get("totalChecks")),
+            errors=number(stats.get("errors")),
+            last_error=str(stats.get("lastError") or ""),
+            elapsed=number(stats.get("elapsedTime"), 0.0),
+            transferring=transferring,
+        )
+
+    def fraction(self):
+        """Return the share of bytes done, from 0 to 1, or None before the total is known."""
+        if self.total_bytes <= 0:
+            return None
+        return min(1.0, self.bytes / self.total_bytes)
+
+
+class transfer:
+    """Runs one rclone copy in the background and tracks its progress as data.
+
+    The copy runs as `rclone copy --use-json-log --stats`, so every
+    STATS_INTERVAL rclone logs a JSON line with its stats, and each error
+    as a JSON line of its own; they are read from stderr as they come.
+    Given an rclonercd backend, the copy runs on the daemon as a job
+    instead, and core/stats is polled for the job's stats group.
+
+    Like `rclone copy`, a file src is copied into the directory dst and a
+    directory src has its contents copied into dst. Given files, only those
+    names under the directory src are copied, all in the one rclone call,
+    through a --files-from-raw list. A transferprofile's options are passed
+    on as flags, or as the rc call's _config on the daemon. stats(), errors() and
+    the state are safe to read from any thread. on_done, if given, is
+    called as on_done(transfer, succeeded) on the copy's thread once it
+    ends, before wait() returns.
+    """
+
+    STATS_INTERVAL = "500ms"
+    READ_SIZE = 65536  # Most bytes of rclone's log taken in one read
+    STATS_KEY = re.compile(r'"stats"\s*:\s*\{')  # Only a stats line has this unescaped in its JSON
+    POLL_INTERVAL = 0.5  # Seconds between core/stats calls on the daemon
+    MAX_ERRORS = 100  # Error messages kept; rclone still counts them all
+
+    def __init__(self, src: str, dst: str, backend=None, src_is_file=None, title=None, on_done=None,
+                 files=None, profile=None):
+        self.src = src
+        self.dst = dst
+        self.files = files  # Paths relative to src to copy, or None for all of it
+        self.profile = profile  # transferprofile tuning the copy, or None for rclone's defaults
+        self.title = title or f"{src} to {dst}"
+        self.on_done = on_done
+        self.backend = backend  # Run on this daemon if it is an rclonercd
+        # Whether src is a single file; only the daemon needs to know, and
+        # a local src is checked when not given
+        self.src_is_file = src_is_file
+        self.returncode = None  # rclone's exit status, or 0/1 for a daemon job
+        self.process = None
+        self._stats = transferstats()
+        self._errors = []
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+        self._filesFrom = None  # The --files-from-raw list while the copy runs
+
+    def command(self) -> list[str]:
+        command = [
+            "rclone", "copy", self.src, self.dst,
+            "--use-json-log", "--stats", self.STATS_INTERVAL, "--stats-log-level", "NOTICE",
+        ]
+        if self._filesFrom is not None:
+            command += ["--files-from-raw", self._filesFrom]
+        if self.profile is not None:
+            command += self.profile.flags()
+        return command
+
+    def start(self):
+        """Start the copy in a daemon thread; does nothing if it was cancelled first."""
+        if self._done.is_set():
+            return
+        target = self._run_job if isinstance(self.backend, rclonercd) else self._run_process
+        self._thread = threading.Thread(target=self._run, args=(target,), daemon=True)
+        self._thread.start()
+
+    def stats(self) -> transferstats:
+        """Return the latest progress snapshot."""
+        with self._lock:
+            return self._stats
+
+    def errors(self) -> list[str]:
+        """Return the error messages so far, oldest first."""
+        with self._lock:
+            return list(self._errors)
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout=None) -> bool:
+        """Wait for the copy to finish; return True if it has."""
+        return self._done.wait(timeout)
+
+    def succeeded(self):
+        """Return True if the copy finished cleanly, False if not, None while it runs."""
+        if not self._done.is_set():
+            return None
+        return self._result()
+
+    def state(self) -> str:
+        """Return "queued", "running", "done", "failed" or "cancelled"."""
+        if not self._done.is_set():
+            return "queued" if self._thread is None else "running"
+        if self._cancelled.is_set():
+            return "cancelled"
+        return "done" if self.returncode == 0 else "failed"
+
+    def cancel(self):
+        """Stop the copy; files already copied stay."""
+        self._cancelled.set()
+        if self._thread is None:
+            # Never started, so there is nothing to stop
+            self._done.set()
+            return
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.terminate()
+
+    def _result(self) -> bool:
+        return self.returncode == 0 and not self._cancelled.is_set()
+
+    def _write_files_from(self):
+        """Write the names to copy, one per line, to a file for --files-from-raw."""
+        fd, path = tempfile.mkstemp(prefix="rcli-files-", suffix=".txt")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("".join(name + "\n" for name in self.files))
+        self._filesFrom = path
+
+    def _run(self, target):
+        try:
+            if self.files is not None:
+                self._write_files_from()
+            target()
+        except OSError as e:
+            self._error(f"Could not write the list of files: {e}")
+            self.returncode = 1
+        finally:
+            if self._filesFrom is not None:
+                try:
+                    os.remove(self._filesFrom)
+                except OSError:
+                    pass
+            if self.on_done is not None:
+                try:
+                    self.on_done(self, self._result())
+                except Exception:
+                    logging.exception("Handling the end of %s failed", self.title)
+            self._done.set()
+
+    def _error(self, message: str):
+        with self._lock:
+            if len(self._errors) < self.MAX_ERRORS:
+                self._errors.append(message)
+
+    def _set_stats(self, stats):
+        if isinstance(stats, dict):
+            snapshot = transferstats.fromrclone(stats)
+            with self._lock:
+                self._stats = snapshot
+
+    def _handle_line(self, line: str):
+        """Take in one line of rclone's JSON log."""
+        line = line.strip()
+        if not line:
+            return
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            # Not from the logger, such as a crash; keep it for the user
+            self._error(line)
+            return
+        if "stats" in record:
+            self._set_stats(record["stats"])
+        elif record.get("level") in ("error", "critical", "emergency", "alert"):
+            message = str(record.get("msg", "")).strip()
+            if record.get("object"):
+                message = f"{record['object']}: {message}"
+            self._error(message)
+
+    def _handle_lines(self, lines: list[str]):
+        """Take in lines of rclone's JSON log read together.
+
+        A stats line followed by another in the same read is skipped
+        without parsing it, as the later snapshot replaces it anyway.
+        """
+        stats = [i for i, line in enumerate(lines) if self.STATS_KEY.search(line)]
+        skip = set(stats[:-1])
+        for i, line in enumerate(lines):
+            if i not in skip:
+                self._handle_line(line)
+
+    def _read_log(self, stream):
+        """Read rclone's log from the binary stream until it closes.
+
+        read1() returns whatever the pipe holds, up to READ_SIZE, so a
+        reader that fell behind catches up in one step, and live progress
+        never waits for a read to fill.
+        """
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder(locale.getpreferredencoding(False))("replace"), translate=True
+        )
+        pending = ""
+        while True:
+            data = stream.read1(self.READ_SIZE)
+            lines = (pending + decoder.decode(data, final=not data)).split("\n")
+            pending = lines.pop()
+            self._handle_lines(lines)
+            if not data:
+                break
+        self._handle_line(pending)
+
+    def _run_process(self):
+        try:
+            self.process = subprocess.Popen(
+                self.command(),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+            if self._cancelled.is_set():
+                self.process.terminate()
+            self._read_log(self.process.stderr)
+            self.returncode = self.process.wait()
+            if self.returncode != 0 and not self._cancelled.is_set():
+                logging.warning("rclone copy %s %s exited with status %d", self.src, self.dst, self.returncode)
+        except OSError as e:
+            self._error(f"Could not run rclone: {e}")
+            self.returncode = 1
+
+    def _job_params(self):
+        """Return the rc method and parameters that copy src to dst."""
+        if self._filesFrom is not None:
+            return "sync/copy", {
+                "srcFs": self.src, "dstFs": self.dst, "_filter": {"FilesFromRaw": [self._filesFrom]},
+            }
+        is_file = self.src_is_file
+        if is_file is None:
+            is_file = os.path.isfile(self.src)
+        if not is_file:
+            return "sync/copy", {"srcFs": self.src, "dstFs": self.dst}
+        # operations/copyfile takes the file's directory and its name apart
+        head, sep, name = self.src.rpartition("/")
+        if not sep:
+            head, sep, name = self.src.rpartition(":")
+            head += sep
+        return "operations/copyfile", {
+            "srcFs": head or ".", "srcRemote": name, "dstFs": self.dst, "dstRemote": name,
+        }
+
+    def _run_job(self):
+        backend = self.backend
+        method, params = self._job_params()
+        params = dict(params, _async=True)
+        config = self.profile.rcconfig() if self.profile is not None else {}
+        if config:
+            params["_config"] = config
+        job = backend.call(method, params)
+        if job is None or "jobid" not in job:
+            self._error(f"rclone rc {method} could not be started")
+            self.returncode = 1
+            return
+        jobid = job["jobid"]
+        while True:
+            status = backend.call("job/status", {"jobid": jobid})
+            self._set_stats(backend.call("core/stats", {"group": f"job/{jobid}"}, quiet=True))
+            if status is None:
+                self._error("Lost track of the rclone rc job")
+                self.returncode = 1
+                return
+            if status.get("finished"):
+                if not status.get("success"):
+                    self._error(str(status.get("error") or "rclone rc job failed"))
+                self.returncode = 0 if status.get("success") else 1
+                return
+            if self._cancelled.wait(self.POLL_INTERVAL):
+                backend.call("job/stop", {"jobid": jobid}, quiet=True)
+                self.returncode = 1
+                return
+
+
+class transfermanager:
+    """Queues transfers and runs up to `concurrency` of them at once in the background.
+
+    Jobs start in the order they were added unless moved with move(). A
+    job's on_done runs on its own thread as it ends, and the next queued job
+    starts right after. version() changes whenever a job is added, ends,
+    is cancelled or moved, so a screen can tell when to redraw.
+    """
+
+    CONCURRENCY = 2  # Jobs run at once; each one copies several files itself
+    GROUPS = {"running": 0, "queued": 1}  # Order of jobs() by state; the rest come last
+
+    def __init__(self, backend=None, concurrency=CONCURRENCY, profile=None):
+        self.backend = backend
+        self.concurrency = max(1, concurrency)
+        self.profile = profile  # transferprofile for the jobs added from now on
+        self._jobs = []  # Every job not cleared, queued ones in the order they start
+        self._running = set()
+        self._lock = threading.RLock()
+        self._version = 0
+
+    def add(self, src: str, dst: str, title=None, src_is_file=None, on_done=None, files=None) -> transfer:
+        """Queue a copy of src into dst, or of just files under it, and return its transfer."""
+
+        def finished(job, succeeded):
+            try:
+                if on_done is not None:
+                    on_done(job, succeeded)
+            finally:
+                self._finished(job)
+
+        job = transfer(
+            src, dst, self.backend, src_is_file=src_is_file, title=title, on_done=finished, files=files,
+            profile=self.profile,
+        )
+        with self._lock:
+            self._jobs.append(job)
+            self._version += 1
+            self._schedule()
+        return job
+
+    def jobs(self) -> list[transfer]:
+        """Return the jobs running, then queued in the order they will start, then ended."""
+        with self._lock:
+            jobs = list(self._jobs)
+        return sorted(jobs, key=lambda job: self.GROUPS.get(job.state(), 2))
+
+    def active(self) -> int:
+        """Return the number of jobs running or queued."""
+        with self._lock:
+            return sum(1 for job in self._jobs if job.state() in self.GROUPS)
+
+    def counts(self) -> dict:
+        """Return how many jobs are in each state."""
+        counts = {}
+        with self._lock:
+            for job in self._jobs:
+                state = job.state()
+                counts[state] = counts.get(state, 0) + 1
+        return counts
+
+    def stats(self) -> transferstats:
+        """Return the running jobs' progress added together."""
+        total = transferstats()
+        with self._lock:
+            running = list(self._running)
+        for job in running:
+            stats = job.stats()
+            total.bytes += stats.bytes
+            total.total_bytes += stats.total_bytes
+            total.speed += stats.speed
+            total.transfers += stats.transfers
+            total.total_transfers += stats.total_transfers
+            total.errors += stats.errors
+        if total.speed > 0 and total.total_bytes > total.bytes:
+            total.eta = (total.total_bytes - total.bytes) / total.speed
+        return total
+
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    def cancel(self, job: transfer):
+        """Cancel a queued or running job."""
+        with self._lock:
+            job.cancel()
+            self._version += 1
+
+    def cancel_all(self):
+        with self._lock:
+            for job in self._jobs:
+                job.cancel()
+            self._version += 1
+
+    def move(self, job: transfer, offset: int) -> bool:
+        """Move a queued job offset places earlier (negative) or later in the queue.
+
+        Returns False if the job is not queued or is already at that end.
+        """
+        with self._lock:
+            if job.state() != "queued":
+                return False
+            queued = [i for i, other in enumerate(self._jobs) if other.state() == "queued"]
+            position = queued.index(self._jobs.index(job))
+            target = max(0, min(len(queued) - 1, position + offset))
+            if target == position:
+                return False
+            # Take the place of the queued job at target; the others keep their order
+            self._jobs.remove(job)
+            self._jobs.insert(queued[target], job)
+            self._version += 1
+            return True
+
+    def clear_finished(self):
+        """Forget the jobs that have ended."""
+        with self._lock:
+            self._jobs = [job for job in self._jobs if job.state() in self.GROUPS]
+            self._version += 1
+
+    def _schedule(self):
+        with self._lock:
+            for job in self._jobs:
+                if len(self._running) >= self.concurrency:
+                    break
+                if job.state() == "queued":
+                    self._running.add(job)
+                    job.start()
+
+    def _finished(self, job: transfer):
+        with self._lock:
+            self._running.discard(job)
+            self._version += 1
+            self._schedule()
@@ -1,3 +1,4 @@
+import re
 from datetime import datetime
 
 
@@ -29,3 +30,50 @@ def format_date(iso_str):
         return dt.strftime("%Y-%m-%d %H:%M")
     except (ValueError, TypeError):
         return "unknown"
+
+
+def format_duration(seconds):
+    """Format a number of seconds as 'M:SS' or 'H:MM:SS'."""
+    if seconds is None or seconds < 0:
+        return "unknown"
+
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def parse_duration(text):
+    """Parse '90', '30s', '5m', '2h' or '30d' into seconds. Raises ValueError."""
+    text = str(text).strip().lower()
+    unit = DURATION_UNITS.get(text[-1:]) if text else None
+    number = text[:-1] if unit is not None else text
+    try:
+        seconds = float(number) * (unit or 1)
+    except ValueError:
+        raise ValueError(f"invalid duration {text!r}") from None
+    if seconds < 0:
+        raise ValueError(f"invalid duration {text!r}")
+    return seconds
+
+
+SIZE_UNITS = {"b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4, "p": 1024 ** 5}
+SIZE_PATTERN = re.compile(r"(\d+(?:\.\d*)?)(?:([kmgtp])i?b?|(b))?")
+
+
+def parse_size(text):
+    """Parse an rclone size such as '512', '16M', '64Mi' or '1.5GiB' into bytes. Raises ValueError.
+
+    As in rclone, a bare number is KiB and the units are powers of 1024.
+    """
+    text = str(text).strip().lower()
+    match = SIZE_PATTERN.fullmatch(text)
+    if match is None:
+        raise ValueError(f"invalid size {text!r}")
+    number, unit, byte = match.groups()
+    return int(float(number) * SIZE_UNITS[unit or byte or "k"])
@@ -1,7 +1,10 @@
 import curses
+import threading
+import time
 from unittest.mock import MagicMock, patch
 import pytest
-from rcli.components import choicecomponent
+from rcli.components import choicecomponent, fuzzycomponent, transfercomponent, jobscomponent, format_transfers
+from rcli.transfer import transferstats
 from rcli.enums import CHOICE
 from rcli.brect import brect
 
@@ -102,6 +105,73 @@ class TestChoiceComponentMetadata:
                 break
 
 
+class TestChoiceComponentSetChoices:
+    def test_cursor_follows_entry_by_name(self):
+        comp = choicecomponent(SAMPLE_ENTRIES, rect=brect(0, 0, 80, 20))
+        comp.handleinput(ord("j"))  # notes.txt
+        comp.setchoices([{"Name": "new.txt", "IsDir": False}] + SAMPLE_ENTRIES)
+        assert comp.elements[comp.elementIndex]["Name"] == "notes.txt"
+
+    def test_cursor_clamped_when_entry_removed(self):
+        comp = choicecomponent(SAMPLE_ENTRIES, back=True, rect=brect(0, 0, 80, 20))
+        comp.handleinput(ord("j"))
+        comp.handleinput(ord("j"))  # backup.tar.gz
+        comp.setchoices(SAMPLE_ENTRIES[:1])
+        assert comp.elementIndex == 1
+        assert comp.cursorOnBack()
+
+    def test_cursor_stays_on_back(self):
+        comp = choicecomponent(SAMPLE_ENTRIES, back=True, rect=brect(0, 0, 80, 20))
+        comp.handleinput(ord("k"))  # wraps to Back
+        comp.setchoices(SAMPLE_ENTRIES[:2])
+        assert comp.cursorOnBack()
+
+
+class TestChoiceComponentMarks:
+    def test_space_toggles_mark_and_moves_down(self):
+        comp = choicecomponent(SAMPLE_ENTRIES, back=True, rect=brect(0, 0, 80, 20))
+        comp.handleinput(ord("j"))
+        comp.handleinput(ord(" "))
+        comp.handleinput(ord(" "))
+        assert comp.marked == {"notes.txt", "backup.tar.gz"}
+        assert comp.cursorOnBack()
+        comp.handleinput(ord(" "))  # Nothing to mark on Back
+        comp.handleinput(ord("k"))
+        comp.handleinput(ord(" "))
+        assert [e["Name"] for e in comp.markedchoices()] == ["notes.txt"]
+
+    def test_marks_dropped_with_their_entries(self):
+        comp = choicecomponent(SAMPLE_ENTRIES, rect=brect(0, 0, 80, 20))
+        comp.handleinput(ord(" "))
+        comp.handleinput(ord(" "))
+        comp.setchoices(SAMPLE_ENTRIES[1:])
+        assert comp.marked == {"notes.txt"}
+        comp.clearmarks()
+        assert comp.markedchoices() == []
+
+    def test_download_with_marks_from_back(self):
+        comp = choicecomponent(SAMPLE_ENTRIES, back=True, rect=brect(0, 0, 80, 20))
+        comp.handleinput(ord("k"))
+        comp.handleinput(ord("d"))
+        assert comp.getChoice().choice == CHOICE.NONE
+        comp.marked = {"notes.txt"}
+        comp.handleinput(ord("d"))
+        assert comp.getChoice().choice == CHOICE.DOWNLOAD
+        assert comp.getChoice().data is None
+
+    def test_marked_rows_drawn_bold_with_star(self):
+        stdscr = make_stdscr()
+        comp = choicecomponent(SAMPLE_ENTRIES, rect=brect(2, 0, 80, 20))
+        comp.marked = {"photos", "notes.txt"}
+        comp.draw(stdscr)
+        calls = [c[0] for c in stdscr.addstr.call_args_list]
+        assert calls[0][1] == 2 and calls[0][2].startswith(">*photos/")
+        assert calls[0][3] == 1 | curses.A_BOLD
+        assert calls[1][1] == 2 and calls[1][2].startswith(" *notes.txt")
+        assert calls[1][3] == curses.A_BOLD
+        assert calls[2][1] == 4 and len(calls[2]) == 3
+
+
 class TestChoiceComponentResize:
     def test_key_resize_sets_flag(self):
         comp = choicecomponent(SAMPLE_ENTRIES, rect=brect(0, 0, 80, 20))
@@ -121,3 +191,272 @@ class TestChoiceComponentResize:
         comp.handleinput(curses.KEY_RESIZE)
         comp.draw(stdscr)
         assert stdscr.addstr.called
+
+
+def keyword_counts(results, inputtext):
+    keywords = [kw.lower() for kw in inputtext.split(" ") if kw]
+    return [sum(kw in p.lower() for kw in keywords) for p in results]
+
+
+class TestFuzzyComponentResults:
+    PATHS = [
+        "docs/",
+        "docs/Readme.md",
+        "photos/2024/beach.jpg",
+        "music/readme.txt",
+        "src/readme_photos.py",
+    ]
+
+    def _type(self, comp, text):
+        for ch in text:
+            comp.handleinput(ord(ch))
+        assert comp.wait(timeout=5)
+
+    def test_best_keyword_count_first(self):
+        for query in ["readme", "readme photos", "zz", "", "doc md", "a"]:
+            comp = fuzzycomponent(self.PATHS)
+            comp.inputtext = query
+            comp.updateresults()
+            assert comp.wait(timeout=5)
+            counts = keyword_counts(comp.topresults, query)
+            assert counts == sorted(counts, reverse=True)
+            assert sorted(comp.topresults) == sorted(self.PATHS)
+
+    def test_result_cap(self):
+        paths = [f"file{i}.txt" for i in range(50)]
+        comp = fuzzycomponent(paths)
+        comp.MAX_RESULTS = 10
+        self._type(comp, "file4")
+        assert len(comp.topresults) == 10
+        assert comp.topresults[0] == "file4.txt"
+        assert set(comp.topresults[:11]) >= {f"file4{i}.txt" for i in range(9)}
+
+    def test_setdata_keeps_query(self):
+        comp = fuzzycomponent(["a.txt"])
+        self._type(comp, "readme")
+        comp.setdata(["a.txt", "readme.md"])
+        comp.wait(timeout=5)
+        assert comp.topresults[0] == "readme.md"
+
+    def test_backspace_updates_results(self):
+        comp = fuzzycomponent(self.PATHS)
+        self._type(comp, "beachx")
+        comp.handleinput(127)
+        comp.wait(timeout=5)
+        assert comp.topresults[0] == "photos/2024/beach.jpg"
+
+    def test_results_published_on_draw(self):
+        comp = fuzzycomponent(self.PATHS)
+        comp.handleinput(ord("z"))
+        comp._worker.wait(timeout=5)
+        assert comp.topresults == []
+        stdscr = MagicMock()
+        stdscr.getmaxyx.return_value = (40, 120)
+        comp.draw(stdscr)
+        assert len(comp.topresults) == len(self.PATHS)
+        assert not comp.searching()
+
+    def test_enter_takes_finished_results(self):
+        comp = fuzzycomponent(self.PATHS)
+        comp.handleinput(ord("b"))
+        comp._worker.wait(timeout=5)
+        comp.handleinput(10)
+        assert comp.choice == "photos/2024/beach.jpg"
+
+    def test_stop_ends_worker(self):
+        comp = fuzzycomponent(self.PATHS)
+        self._type(comp, "doc")
+        worker = comp._worker
+        comp.stop()
+        worker._thread.join(timeout=5)
+        assert not worker._thread.is_alive()
+
+    def test_search_does_not_wait_for_own_index(self):
+        release = threading.Event()
+        with patch("rcli.components.trigramindex.update", side_effect=lambda limit=None: release.wait(5)):
+            comp = fuzzycomponent(self.PATHS)
+            self._type(comp, "beach")
+            assert comp.topresults[0] == "photos/2024/beach.jpg"
+            assert len(comp.index) == 0
+            comp.stop()
+            release.set()
+
+    def test_own_index_built_in_background(self):
+        paths = [f"dir{i}/file{i}.txt" for i in range(25)]
+        comp = fuzzycomponent(paths)
+        comp.INDEX_STEP = 10
+        self._type(comp, "file2")
+        deadline = time.time() + 5
+        while len(comp.index) < len(paths) and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(comp.index) == len(paths)
+        self._type(comp, "3")
+        assert comp.topresults[0] == "dir23/file23.txt"
+
+
+class TestFuzzyComponentProcesses:
+    PATHS = ["docs/readme.md", "photos/beach.jpg", "src/main.py"]
+
+    def _search(self, comp, text):
+        comp.inputtext = text
+        comp.updateresults()
+        assert comp.wait(timeout=5)
+
+    def test_large_data_searched_on_processes(self):
+        with patch("rcli.components.parallelmatcher") as cls:
+            cls.MIN_SHARD = 1
+            cls.return_value.search.return_value = [2, 0]
+            comp = fuzzycomponent(self.PATHS, processes=4)
+            self._search(comp, "m")
+            cls.assert_called_once_with(self.PATHS, 4)
+            assert comp.topresults == ["src/main.py", "docs/readme.md"]
+            comp.stop()
+            cls.return_value.stop.assert_called_once()
+
+    def test_small_data_stays_in_thread(self):
+        with patch("rcli.components.parallelmatcher") as cls:
+            cls.MIN_SHARD = 10
+            comp = fuzzycomponent(self.PATHS, processes=4)
+            self._search(comp, "beach")
+            cls.assert_not_called()
+            assert comp.topresults[0] == "photos/beach.jpg"
+
+    def test_falls_back_when_processes_fail(self):
+        with patch("rcli.components.parallelmatcher") as cls:
+            cls.MIN_SHARD = 1
+            cls.return_value.search.side_effect = OSError("worker died")
+            comp = fuzzycomponent(self.PATHS, processes=4)
+            self._search(comp, "beach")
+            assert comp.topresults[0] == "photos/beach.jpg"
+            assert comp.processes == 0
+            cls.return_value.stop.assert_called_once()
+
+
+class TestTransferComponent:
+    def _transfer(self, stats, errors=()):
+        job = MagicMock()
+        job.stats.return_value = stats
+        job.errors.return_value = list(errors)
+        return job
+
+    def test_overall_progress(self):
+        stats = transferstats(bytes=512 * 1024, total_bytes=1024 * 1024, speed=2048, eta=65,
+                              transfers=1, total_transfers=4, errors=0)
+        lines = transfercomponent(self._transfer(stats), "Downloading b2:x").lines(80)
+        assert lines[0] == "Downloading b2:x"
+        assert lines[2].endswith(" 50%")
+        assert lines[2].count("#") == lines[2].count("-")
+        assert lines[3] == "512.0 KB / 1.0 MB   2.0 KB/s   ETA 1:05"
+        assert lines[4] == "Files 1 / 4   Errors 0"
+
+    def test_unknown_total(self):
+        lines = transfercomponent(self._transfer(transferstats()), "t").lines(80)
+        assert lines[2].endswith("  ?%")
+        assert "ETA unknown" in lines[3]
+
+    def test_files_in_flight_and_errors(self):
+        stats = transferstats(total_bytes=10, transferring=[
+            {"name": "a.bin", "bytes": 5, "size": 10, "percentage": 50, "speed": 1024.0, "eta": 5},
+        ])
+        job = self._transfer(stats, [f"e{i}" for i in range(8)])
+        lines = transfercomponent(job, "t").lines(80)
+        assert "Transferring:" in lines
+        [row] = [line for line in lines if line.endswith("a.bin")]
+        assert "[#####-----]  50%" in row and "1.0 KB/s" in row
+        assert lines[-transfercomponent.ERROR_LINES - 1:] == ["Errors:"] + [f"  e{i}" for i in range(3, 8)]
+
+    def test_draw_fits_screen(self):
+        stats = transferstats(transferring=[
+            {"name": "x" * 200, "bytes": 0, "size": 0, "percentage": 0, "speed": 0.0, "eta": None}
+        ] * 20)
+        stdscr = MagicMock()
+        stdscr.getmaxyx.return_value = (10, 40)
+        transfercomponent(self._transfer(stats), "t").draw(stdscr)
+        rows = [c.args[0] for c in stdscr.addstr.call_args_list]
+        assert max(rows) < 9
+        assert all(len(c.args[2]) <= 40 - 2 - 1 for c in stdscr.addstr.call_args_list)
+
+
+def make_job(title, state, stats=None):
+    job = MagicMock()
+    job.title = title
+    job.state.return_value = state
+    job.stats.return_value = stats or transferstats()
+    return job
+
+
+def make_manager(jobs, counts=None, speed=0.0):
+    manager = MagicMock()
+    manager.jobs.side_effect = lambda: list(jobs)
+    manager.counts.return_value = counts or {}
+    manager.stats.return_value = transferstats(speed=speed)
+    return manager
+
+
+class TestFormatTransfers:
+    def test_none_without_jobs(self):
+        assert format_transfers(make_manager([])) is None
+
+    def test_counts_and_speed(self):
+        manager = make_manager([], {"running": 2, "queued": 3, "done": 4}, speed=2048)
+        assert format_transfers(manager) == "2 running, 3 queued · 2.0 KB/s"
+
+    def test_only_ended_jobs(self):
+        assert format_transfers(make_manager([], {"done": 1})) is None
+        assert format_transfers(make_manager([], {"failed": 1, "done": 1})) == "1 failed"
+
+
+class TestJobsComponent:
+    def test_rows(self):
+        running = make_job("Download b2:a", "running", transferstats(bytes=5, total_bytes=10, speed=1024))
+        queued = make_job("Upload b", "queued")
+        component = jobscomponent(make_manager([running, queued]))
+        assert component.row(running).startswith("running   [##########----------]  50%    1.0 KB/s")
+        assert component.row(running).endswith("  Download b2:a")
+        assert component.row(queued).startswith("queued    ")
+        assert component.row(queued).endswith("  Upload b")
+
+    def test_cursor_follows_job_when_list_reorders(self):
+        jobs = [make_job("a", "running"), make_job("b", "queued"), make_job("c", "queued")]
+        manager = make_manager(jobs)
+        component = jobscomponent(manager)
+        component.handleinput(ord("j"))
+        component.handleinput(ord("j"))
+        assert component.current() is jobs[2]
+        jobs.insert(0, jobs.pop())
+        component.handleinput(-1)
+        assert component.selected == 0
+        assert component.current().title == "c"
+
+    def test_keys_act_on_job_under_cursor(self):
+        jobs = [make_job("a", "running"), make_job("b", "queued")]
+        manager = make_manager(jobs)
+        component = jobscomponent(manager)
+        component.handleinput(ord("j"))
+        component.handleinput(ord("K"))
+        manager.move.assert_called_once_with(jobs[1], -1)
+        component.handleinput(ord("J"))
+        manager.move.assert_called_with(jobs[1], 1)
+        component.handleinput(ord("x"))
+        manager.cancel.assert_called_once_with(jobs[1])
+        component.handleinput(10)
+        assert component.opened is jobs[1]
+
+    def test_cursor_kept_in_range_when_jobs_go(self):
+        jobs = [make_job("a", "done"), make_job("b", "done")]
+        component = jobscomponent(make_manager(jobs))
+        component.handleinput(ord("j"))
+        jobs.clear()
+        component.handleinput(ord("x"))
+        assert component.current() is None
+
+    def test_draw_highlights_selected(self):
+        jobs = [make_job("a", "queued"), make_job("b", "queued")]
+        component = jobscomponent(make_manager(jobs))
+        component.handleinput(ord("j"))
+        stdscr = MagicMock()
+        stdscr.getmaxyx.return_value = (20, 80)
+        component.draw(stdscr)
+        rows = [c.args for c in stdscr.addstr.call_args_list]
+        assert rows[0][3] == curses.A_NORMAL and rows[0][2].endswith("a")
+        assert rows[1][3] == curses.A_REVERSE and rows[1][2].endswith("b")
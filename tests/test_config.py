@@ -0,0 +1,143 @@
+import pytest
+
+from rcli.config import load_config, ttlpolicy, transferprofile, transferprofiles
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+def policy_from(tmp_path, text):
+    path = tmp_path / "config.ini"
+    path.write_text(text)
+    return ttlpolicy.fromconfig(load_config(str(path)))
+
+
+class TestLoadConfig:
+    def test_missing_file_is_empty(self, tmp_path):
+        assert load_config(str(tmp_path / "nope.ini")).sections() == []
+
+    def test_unparsable_file_raises_value_error(self, tmp_path):
+        path = tmp_path / "config.ini"
+        path.write_text("ttl = 1h\n")  # No section header
+        with pytest.raises(ValueError):
+            load_config(str(path))
+
+
+class TestTtlPolicy:
+    def test_defaults(self):
+        policy = ttlpolicy.fromconfig(None)
+        assert policy.ttl("b2:", "docs/") == ttlpolicy.DEFAULT_TTL
+
+    def test_cache_section_sets_default(self, tmp_path):
+        policy = policy_from(tmp_path, "[cache]\nttl = 10m\n")
+        assert policy.ttl("b2:", "") == 600
+
+    def test_remote_overrides_default(self, tmp_path):
+        policy = policy_from(tmp_path, "[cache]\nttl = 10m\n\n[remote archive:]\nttl = 30d\n")
+        assert policy.ttl("archive:", "2020/") == 30 * DAY
+        assert policy.ttl("b2:", "") == 600
+
+    def test_first_matching_path_wins(self, tmp_path):
+        policy = policy_from(tmp_path, (
+            "[remote scratch:]\nttl = 1h\n\n"
+            "[path scratch:tmp/*]\nttl = 1m\n\n"
+            "[path scratch:*]\nttl = 5m\n"
+        ))
+        assert policy.ttl("scratch:", "tmp/a/b/") == 60
+        assert policy.ttl("scratch:", "docs/") == 300
+        assert policy.ttl("other:", "tmp/") == HOUR
+
+    def test_path_rule_inherits_remote_keys(self, tmp_path):
+        policy = policy_from(tmp_path, (
+            "[remote archive:]\nttl = 1d\nadaptive = yes\nmax_ttl = 30d\n\n"
+            "[path archive:photos/*]\nttl = 2d\n"
+        ))
+        assert policy.rule("archive:", "photos/2020/") == {"ttl": 2 * DAY, "adaptive": True, "max_ttl": 30 * DAY}
+
+    def test_adaptive_ttl_doubles_up_to_max(self):
+        policy = ttlpolicy(ttl=HOUR, adaptive=True, max_ttl=6 * HOUR)
+        assert [policy.ttl("b2:", "", n) for n in range(5)] == [HOUR, 2 * HOUR, 4 * HOUR, 6 * HOUR, 6 * HOUR]
+
+    def test_not_adaptive_ignores_unchanged(self):
+        assert ttlpolicy(ttl=HOUR).ttl("b2:", "", 5) == HOUR
+
+    def test_unknown_key_raises(self, tmp_path):
+        with pytest.raises(ValueError, match="unknown key"):
+            policy_from(tmp_path, "[cache]\nttl = 1h\nttls = 2h\n")
+
+    def test_bad_duration_raises(self, tmp_path):
+        with pytest.raises(ValueError, match="ttl"):
+            policy_from(tmp_path, "[remote b2:]\nttl = soon\n")
+
+
+def profiles_from(tmp_path, text):
+    path = tmp_path / "config.ini"
+    path.write_text(text)
+    return transferprofiles.fromconfig(load_config(str(path)))
+
+
+class TestTransferProfiles:
+    def test_builtin_profiles(self):
+        profiles = transferprofiles.fromconfig(None)
+        assert profiles.names() == ["default", "many-small-files", "few-huge-files", "low-bandwidth"]
+        assert profiles.forremote("b2:").name == "default"
+        assert profiles.get("default").flags() == []
+        assert profiles.get("many-small-files").flags() == [
+            "--transfers", "16", "--checkers", "16", "--fast-list",
+        ]
+
+    def test_flags_and_rc_config(self):
+        profile = transferprofile("x", transfers=2, multi_thread_streams=8, buffer_size="64M", fast_list=False)
+        assert profile.flags() == ["--transfers", "2", "--multi-thread-streams", "8", "--buffer-size", "64M"]
+        assert profile.rcconfig() == {
+            "Transfers": 2, "MultiThreadStreams": 8, "BufferSize": 64 * 1024 * 1024, "UseListR": False,
+        }
+        assert profile.describe() == "x (--transfers 2 --multi-thread-streams 8 --buffer-size 64M)"
+        assert transferprofile("y").describe() == "y (rclone defaults)"
+
+    def test_default_and_per_remote(self, tmp_path):
+        profiles = profiles_from(
+            tmp_path,
+            "[transfers]\nprofile = many-small-files\n\n"
+            "[remote archive:]\nttl = 30d\nprofile = few-huge-files\n",
+        )
+        assert profiles.forremote("b2:").name == "many-small-files"
+        assert profiles.forremote("archive:").name == "few-huge-files"
+
+    def test_profile_section_overrides_builtin(self, tmp_path):
+        profiles = profiles_from(tmp_path, "[profile few-huge-files]\nmulti_thread_streams = 16\n")
+        profile = profiles.get("few-huge-files")
+        assert (profile.transfers, profile.multi_thread_streams, profile.buffer_size) == (2, 16, "64M")
+
+    def test_custom_profile(self, tmp_path):
+        profiles = profiles_from(
+            tmp_path,
+            "[remote b2:]\nprofile = lan\n\n"
+            "[profile lan]\ntransfers = 32\nbuffer_size = 1G\nfast_list = yes\n",
+        )
+        assert profiles.names()[-1] == "lan"
+        assert profiles.forremote("b2:").flags() == ["--transfers", "32", "--buffer-size", "1G", "--fast-list"]
+
+    def test_next_cycles(self):
+        profiles = transferprofiles.fromconfig(None)
+        assert profiles.next(profiles.get("default")).name == "many-small-files"
+        assert profiles.next(profiles.get("low-bandwidth")).name == "default"
+        assert profiles.next(None).name == "default"
+
+    def test_ttl_policy_accepts_remote_profile(self, tmp_path):
+        policy = policy_from(tmp_path, "[remote b2:]\nttl = 1m\nprofile = low-bandwidth\n")
+        assert policy.ttl("b2:") == 60
+
+    @pytest.mark.parametrize("text", [
+        "[transfers]\nprofile = fastest\n",
+        "[remote b2:]\nprofile = fastest\n",
+        "[transfers]\nspeed = 1\n",
+        "[profile x]\nspeed = 1\n",
+        "[profile x]\ntransfers = 0\n",
+        "[profile x]\ncheckers = many\n",
+        "[profile x]\nbuffer_size = big\n",
+        "[profile x]\nfast_list = maybe\n",
+    ])
+    def test_invalid_raises(self, tmp_path, text):
+        with pytest.raises(ValueError):
+            profiles_from(tmp_path, text)
@@ -175,50 +175,37 @@ class TestMainLoopTransitions:
 
     @patch("rcli.cursedcli.time.sleep")
     @patch("rcli.cursedcli.uploadscene")
-    @patch("rcli.cursedcli.downloadscene")
     @patch("rcli.cursedcli.fuzzyscene")
     @patch("rcli.cursedcli.choosefilescene")
     @patch("rcli.cursedcli.rclonecache")
     @patch("rcli.cursedcli.rclone")
     @patch("rcli.cursedcli.curses")
-    def test_browse_download_fuzzy_exit(
+    def test_browse_fuzzy_exit(
         self, mock_curses, mock_rclone_cls, mock_cache_cls,
-        mock_choosefile_cls, mock_fuzzy_cls, mock_download_cls,
+        mock_choosefile_cls, mock_fuzzy_cls,
         mock_upload_cls, mock_sleep,
     ):
-        """Simulate: browse → download → back → fuzzy → back → exit."""
+        """Simulate: browse docs/ → fuzzy → pick a path → exit."""
         mock_cache, _ = self._setup_connection(
             mock_curses, mock_rclone_cls, mock_cache_cls
         )
 
-        # Scene 1: Browse root → download a file in docs/
+        # Scene 1: Browse docs/ → fuzzy search
         scene1 = MagicMock()
-        scene1.getNextScene.return_value = SCENES.DOWNLOAD
-        scene1.getdata.return_value = ("docs/readme.txt", False)
+        scene1.getNextScene.return_value = SCENES.FUZZY_SEARCH
         scene1.folderDir = ["docs"]
 
-        # Scene 2: Download completes → back to CHOOSE_FILE
+        # Scene 2: Fuzzy → select path → CHOOSE_FILE
         scene2 = MagicMock()
         scene2.getNextScene.return_value = SCENES.CHOOSE_FILE
-        scene2.getdata.return_value = "docs/_"
+        scene2.getdata.return_value = "photos/vacation/img.jpg"
 
-        # Scene 3: Browse docs/ → fuzzy search
+        # Scene 3: Browse → EXIT
         scene3 = MagicMock()
-        scene3.getNextScene.return_value = SCENES.FUZZY_SEARCH
-        scene3.folderDir = ["docs"]
-
-        # Scene 4: Fuzzy → select path → CHOOSE_FILE
-        scene4 = MagicMock()
-        scene4.getNextScene.return_value = SCENES.CHOOSE_FILE
-        scene4.getdata.return_value = "photos/vacation/img.jpg"
-
-        # Scene 5: Browse → EXIT
-        scene5 = MagicMock()
-        scene5.getNextScene.return_value = SCENES.EXIT
+        scene3.getNextScene.return_value = SCENES.EXIT
 
-        mock_choosefile_cls.side_effect = [scene1, scene3, scene5]
-        mock_download_cls.return_value = scene2
-        mock_fuzzy_cls.return_value = scene4
+        mock_choosefile_cls.side_effect = [scene1, scene3]
+        mock_fuzzy_cls.return_value = scene2
 
         from rcli.cursedcli import cursedcli
 
@@ -227,23 +214,17 @@ class TestMainLoopTransitions:
 
         # Verify choosefilescene construction params
         cf_calls = mock_choosefile_cls.call_args_list
-        assert cf_calls[0] == call("b2:", mock_cache)  # initial: root
-        assert cf_calls[1] == call("b2:", mock_cache, ["docs"])  # after download
-        assert cf_calls[2] == call(
-            "b2:", mock_cache, ["photos", "vacation"]
+        transfers = cli._transfers
+        assert cf_calls[0] == call("b2:", mock_cache, transfers=transfers)  # initial: root
+        assert cf_calls[1] == call(
+            "b2:", mock_cache, ["photos", "vacation"], transfers=transfers
         )  # after fuzzy
 
-        # Download scene: file (not dir), so destination is "."
-        mock_download_cls.assert_called_once_with(
-            "b2:docs/readme.txt", ".", ["docs"]
-        )
-
         # Fuzzy scene: receives remote, cache, folderDir, and search_index (None when no_index=True)
-        mock_fuzzy_cls.assert_called_once_with("b2:", mock_cache, ["docs"], None)
+        mock_fuzzy_cls.assert_called_once_with("b2:", mock_cache, ["docs"], None, processes=0)
 
     @patch("rcli.cursedcli.time.sleep")
     @patch("rcli.cursedcli.uploadscene")
-    @patch("rcli.cursedcli.downloadscene")
     @patch("rcli.cursedcli.fuzzyscene")
     @patch("rcli.cursedcli.choosefilescene")
     @patch("rcli.cursedcli.rclonecache")
@@ -251,7 +232,7 @@ class TestMainLoopTransitions:
     @patch("rcli.cursedcli.curses")
     def test_upload_transition(
         self, mock_curses, mock_rclone_cls, mock_cache_cls,
-        mock_choosefile_cls, mock_fuzzy_cls, mock_download_cls,
+        mock_choosefile_cls, mock_fuzzy_cls,
         mock_upload_cls, mock_sleep,
     ):
         """Simulate: browse → upload → back → exit."""
@@ -281,12 +262,13 @@ class TestMainLoopTransitions:
         cli = cursedcli("b2:", no_index=True)
         cli.main()
 
-        # Upload scene got correct params: remote, cache, folderDir
-        mock_upload_cls.assert_called_once_with("b2:", mock_cache, ["photos"])
+        # Upload scene got correct params: remote, cache, transfers, folderDir
+        mock_upload_cls.assert_called_once_with(
+            "b2:", mock_cache, cli._transfers, ["photos"], search_index=None
+        )
 
     @patch("rcli.cursedcli.time.sleep")
     @patch("rcli.cursedcli.uploadscene")
-    @patch("rcli.cursedcli.downloadscene")
     @patch("rcli.cursedcli.fuzzyscene")
     @patch("rcli.cursedcli.choosefilescene")
     @patch("rcli.cursedcli.rclonecache")
@@ -294,7 +276,7 @@ class TestMainLoopTransitions:
     @patch("rcli.cursedcli.curses")
     def test_refresh_invalidates_current_dir_only(
         self, mock_curses, mock_rclone_cls, mock_cache_cls,
-        mock_choosefile_cls, mock_fuzzy_cls, mock_download_cls,
+        mock_choosefile_cls, mock_fuzzy_cls,
         mock_upload_cls, mock_sleep,
     ):
         """Refresh invalidates only the current directory's cache."""
@@ -323,81 +305,84 @@ class TestMainLoopTransitions:
 
         # Scene recreated with same folder
         assert mock_choosefile_cls.call_args_list[1] == call(
-            "b2:", mock_cache, ["docs", "archive"]
+            "b2:", mock_cache, ["docs", "archive"], transfers=cli._transfers
         )
 
     @patch("rcli.cursedcli.time.sleep")
-    @patch("rcli.cursedcli.uploadscene")
-    @patch("rcli.cursedcli.downloadscene")
-    @patch("rcli.cursedcli.fuzzyscene")
+    @patch("rcli.cursedcli.transferscene")
     @patch("rcli.cursedcli.choosefilescene")
     @patch("rcli.cursedcli.rclonecache")
     @patch("rcli.cursedcli.rclone")
     @patch("rcli.cursedcli.curses")
-    def test_refresh_root_passes_empty_path(
+    def test_transfers_panel_and_back(
         self, mock_curses, mock_rclone_cls, mock_cache_cls,
-        mock_choosefile_cls, mock_fuzzy_cls, mock_download_cls,
-        mock_upload_cls, mock_sleep,
+        mock_choosefile_cls, mock_transfer_cls, mock_sleep,
     ):
-        """Refreshing at root passes empty string to cache.invalidate."""
+        """Simulate: browse → jobs panel → back to the same folder → exit."""
         mock_cache, _ = self._setup_connection(
             mock_curses, mock_rclone_cls, mock_cache_cls
         )
 
         scene1 = MagicMock()
-        scene1.getNextScene.return_value = SCENES.REFRESH_DATABASE
-        scene1.folderDir = []
+        scene1.getNextScene.return_value = SCENES.TRANSFERS
+        scene1.folderDir = ["docs"]
 
         scene2 = MagicMock()
-        scene2.getNextScene.return_value = SCENES.EXIT
+        scene2.getNextScene.return_value = SCENES.CHOOSE_FILE
+        scene2.getdata.return_value = "docs/_"
 
-        mock_choosefile_cls.side_effect = [scene1, scene2]
+        scene3 = MagicMock()
+        scene3.getNextScene.return_value = SCENES.EXIT
+
+        mock_choosefile_cls.side_effect = [scene1, scene3]
+        mock_transfer_cls.return_value = scene2
 
         from rcli.cursedcli import cursedcli
 
-        cli = cursedcli("b2:", no_index=True)
+        cli = cursedcli("b2:", no_index=True, jobs=5)
         cli.main()
 
-        mock_cache.invalidate.assert_called_once_with("b2:", "")
+        transfers = cli._transfers
+        assert transfers.concurrency == 5
+        assert transfers.profile is cli.profiles.forremote("b2:")
+        assert transfers.backend is mock_cache.rclone
+        mock_transfer_cls.assert_called_once_with(transfers, ["docs"], profiles=cli.profiles)
+        assert mock_choosefile_cls.call_args_list[1] == call(
+            "b2:", mock_cache, ["docs"], transfers=transfers
+        )
 
     @patch("rcli.cursedcli.time.sleep")
     @patch("rcli.cursedcli.uploadscene")
-    @patch("rcli.cursedcli.downloadscene")
     @patch("rcli.cursedcli.fuzzyscene")
     @patch("rcli.cursedcli.choosefilescene")
     @patch("rcli.cursedcli.rclonecache")
     @patch("rcli.cursedcli.rclone")
     @patch("rcli.cursedcli.curses")
-    def test_download_directory_uses_folder_path(
+    def test_refresh_root_passes_empty_path(
         self, mock_curses, mock_rclone_cls, mock_cache_cls,
-        mock_choosefile_cls, mock_fuzzy_cls, mock_download_cls,
+        mock_choosefile_cls, mock_fuzzy_cls,
         mock_upload_cls, mock_sleep,
     ):
-        """Downloading a directory passes the folder path as destination."""
+        """Refreshing at root passes empty string to cache.invalidate."""
         mock_cache, _ = self._setup_connection(
             mock_curses, mock_rclone_cls, mock_cache_cls
         )
 
-        # Browse root, download a directory
         scene1 = MagicMock()
-        scene1.getNextScene.return_value = SCENES.DOWNLOAD
-        scene1.getdata.return_value = ("photos/", True)  # IsDir=True
+        scene1.getNextScene.return_value = SCENES.REFRESH_DATABASE
         scene1.folderDir = []
 
-        # Download scene → EXIT
         scene2 = MagicMock()
         scene2.getNextScene.return_value = SCENES.EXIT
-        mock_download_cls.return_value = scene2
 
-        mock_choosefile_cls.side_effect = [scene1]
+        mock_choosefile_cls.side_effect = [scene1, scene2]
 
         from rcli.cursedcli import cursedcli
 
         cli = cursedcli("b2:", no_index=True)
         cli.main()
 
-        # For directory download, destination is the folder path, not "."
-        mock_download_cls.assert_called_once_with("b2:photos/", "photos/", [])
+        mock_cache.invalidate.assert_called_once_with("b2:", "")
 
 
 class TestKeyResize:
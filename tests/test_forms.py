@@ -100,3 +100,22 @@ class TestChoiceforumDynamicLayout:
         assert forum.choiceComponent._needs_resize is False
         assert forum.choiceComponent.brect.w == 78
         assert forum.choiceComponent.brect.h == 19
+
+
+class TestChoiceforumHeader:
+    def test_status_and_transfers_shown_together(self):
+        forum = choiceforum(SAMPLE_ENTRIES, back=False, extra="docs/", registerKeyFunc=MagicMock())
+        forum.setstatus("cached, refreshing")
+        forum.settransfers("1 running")
+        assert forum.header.text == "docs/  [cached, refreshing]  [1 running]"
+        forum.setstatus(None)
+        assert forum.header.text == "docs/  [1 running]"
+        forum.settransfers(None)
+        assert forum.header.text == "docs/"
+
+    def test_clearchoice(self):
+        forum = choiceforum(SAMPLE_ENTRIES, back=False, extra="", registerKeyFunc=MagicMock())
+        forum.choiceComponent.handleinput(ord("t"))
+        assert forum.getdata().choice == CHOICE.TRANSFERS
+        forum.clearchoice()
+        assert forum.getdata() is None
@@ -0,0 +1,373 @@
+import random
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from rcli.fuzzy import (
+    trigramindex, fuzzymatcher, score_path, score_bounds, searchworker, searchcancelled, trigrams, containing, _escape,
+)
+from rcli.pathstore import pathstore
+
+
+PATHS = [
+    "docs/",
+    "docs/Readme.md",
+    "photos/2024/beach.jpg",
+    "photos/2024/",
+    "music/readme.txt",
+    "src/main.py",
+]
+
+
+def brute_force(keyword, paths):
+    return [i for i, p in enumerate(paths) if keyword in p.lower()]
+
+
+class TestTrigramIndex:
+    def test_search_matches_substring_scan(self):
+        index = trigramindex(PATHS)
+        index.update()
+        for kw in ["readme", "photos/2024", "jpg", "zzz", "s/m"]:
+            assert index.search(kw, PATHS) == brute_force(kw, PATHS)
+
+    def test_short_keyword_falls_back_to_scan(self):
+        index = trigramindex(PATHS)
+        index.update()
+        assert index.search("m", PATHS) == brute_force("m", PATHS)
+        assert index.search("py", PATHS) == brute_force("py", PATHS)
+
+    def test_unindexed_tail_is_scanned(self):
+        store = pathstore(PATHS)
+        index = trigramindex(store)
+        index.update()
+        store.append("more/readme.rst")
+        view = store.view()
+        assert index.search("readme", view) == [1, 4, 6]
+        assert len(index) == len(PATHS)
+
+    def test_view_shorter_than_index(self):
+        store = pathstore(PATHS)
+        view = store.view()
+        store.append("extra/readme")
+        index = trigramindex(store)
+        index.update()
+        assert index.search("readme", view) == [1, 4]
+
+    def test_covers_views_of_same_store(self):
+        store = pathstore(PATHS)
+        index = trigramindex(store)
+        assert index.covers(store.view())
+        assert not index.covers(pathstore(PATHS).view())
+        assert not index.covers(list(PATHS))
+
+    def test_far_apart_ids_match_scan(self):
+        paths = ["x"] * 5001
+        for i in (0, 1, 255, 257, 600, 5000):
+            paths[i] = f"dir/readme{i}"
+        index = trigramindex(paths)
+        index.update()
+        assert index.search("readme", paths) == [0, 1, 255, 257, 600, 5000]
+
+    def test_large_gaps_decode(self):
+        index = trigramindex([])
+        index._postings["abc"] = [bytearray(b"\x01") + _escape(70_000) + bytearray(b"\x05") + _escape(20_000_000), 0]
+        assert list(index._decode("abc")) == [0, 70_000, 70_005, 20_070_005]
+        assert list(index._decode("zzz")) == []
+
+    def test_postings_take_about_a_byte_per_id(self):
+        paths = [f"photos/2024/img_{i}.jpg" for i in range(2000)]
+        index = trigramindex(paths)
+        index.update()
+        postings = sum(len(trigrams(p.lower())) for p in paths)
+        assert index.nbytes() < postings * 1.2
+
+    def test_random_paths_match_scan(self):
+        rng = random.Random(1)
+        alphabet = "abcde/._"
+        paths = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))) for _ in range(500)]
+        index = trigramindex(paths)
+        index.update()
+        for _ in range(50):
+            kw = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5)))
+            assert index.search(kw, paths) == brute_force(kw, paths)
+
+
+class TestContaining:
+    @pytest.fixture(autouse=True)
+    def small_blocks(self, monkeypatch):
+        monkeypatch.setattr("rcli.fuzzy.BLOCK", 16)
+
+    def test_matches_brute_force_at_any_density(self):
+        rng = random.Random(3)
+        paths = [f"{rng.choice(['Docs', 'photos', 'src'])}/{rng.choice(['Readme', 'main'])}_{i}" for i in range(200)]
+        store = pathstore(paths)
+        for density in (0.02, 0.2, 0.5, 1.0):
+            ids = sorted(rng.sample(range(len(paths)), int(len(paths) * density)))
+            for kw in ("readme", "docs/", "s"):
+                expected = [i for i in ids if kw in paths[i].lower()]
+                assert containing(kw, store.view(), ids) == expected
+                assert containing(kw, paths, ids) == expected
+
+    def test_range_scans_everything(self):
+        store = pathstore(PATHS * 10)
+        assert containing("readme", store, range(len(store))) == brute_force("readme", PATHS * 10)
+
+    def test_cancelled(self):
+        with pytest.raises(searchcancelled):
+            containing("a", PATHS, range(len(PATHS)), lambda: True)
+
+
+def keyword_count(path, query):
+    return sum(kw.lower() in path.lower() for kw in query.split(" ") if kw)
+
+
+def assert_ranked(paths, query, ids, limit):
+    """ids hold the best keyword counts first and cover every match that fits."""
+    counts = [keyword_count(paths[i], query) for i in ids]
+    assert counts == sorted(counts, reverse=True)
+    assert len(ids) == len(set(ids)) == min(limit, len(paths))
+    all_counts = sorted((keyword_count(p, query) for p in paths), reverse=True)
+    assert counts == all_counts[:limit]
+
+
+def make_matcher(paths):
+    index = trigramindex(paths)
+    index.update()
+    return fuzzymatcher(index)
+
+
+class TestFuzzyMatcher:
+    def test_typing_matches_reference(self):
+        matcher = make_matcher(PATHS)
+        query = ""
+        for ch in "readme ph":
+            query += ch
+            ids = matcher.search(query, PATHS, 100)
+            assert_ranked(PATHS, query, ids, 100)
+
+    def test_extending_keyword_narrows_previous_ids(self):
+        matcher = make_matcher(PATHS)
+        matcher.search("rea", PATHS, 10)
+        with patch.object(matcher.index, "search", side_effect=AssertionError("full search")):
+            matches = matcher.match("readm", PATHS)
+        assert list(matches["readm"]) == [1, 4]
+
+    def test_backspace_reuses_frame(self):
+        matcher = make_matcher(PATHS)
+        first = matcher.match("phot", PATHS)
+        matcher.match("photo", PATHS)
+        with patch.object(matcher.index, "search", side_effect=AssertionError("full search")):
+            assert matcher.match("phot", PATHS) is first
+
+    def test_new_keyword_after_space(self):
+        matcher = make_matcher(PATHS)
+        matcher.match("docs", PATHS)
+        matches = matcher.match("docs jpg", PATHS)
+        assert list(matches["docs"]) == [0, 1]
+        assert list(matches["jpg"]) == [2]
+
+    def test_edit_in_middle_recomputes(self):
+        matcher = make_matcher(PATHS)
+        matcher.match("readme", PATHS)
+        matches = matcher.match("src", PATHS)
+        assert list(matches["src"]) == [5]
+
+    def test_growing_data_scans_new_tail(self):
+        store = pathstore(PATHS)
+        index = trigramindex(store)
+        index.update()
+        matcher = fuzzymatcher(index)
+        assert list(matcher.match("readme", store.view())["readme"]) == [1, 4]
+        store.append("new/readme")
+        assert list(matcher.match("readme", store.view())["readme"]) == [1, 4, 6]
+
+    def test_random_sessions_match_reference(self):
+        rng = random.Random(7)
+        paths = ["".join(rng.choice("abc/ ") for _ in range(rng.randint(0, 10))) for _ in range(300)]
+        matcher = make_matcher(paths)
+        query = ""
+        for _ in range(200):
+            if query and rng.random() < 0.3:
+                query = query[:-1]
+            else:
+                query += rng.choice("abc ")
+            ids = matcher.search(query, paths, 50)
+            assert_ranked(paths, query, ids, 50)
+
+    @pytest.mark.parametrize("keep", [0, 40, 10_000])
+    def test_matches_with_kept_strings_match_reference(self, keep):
+        rng = random.Random(11)
+        paths = ["".join(rng.choice("abcAB/ ") for _ in range(rng.randint(0, 10))) for _ in range(300)]
+        store = pathstore(paths[:200])
+        index = trigramindex(store)
+        index.update()
+        matcher = fuzzymatcher(index)
+        matcher.KEEP_LOWERED = keep
+        query = ""
+        for step in range(200):
+            if step == 100:
+                store.extend(paths[200:])
+            data = store.view()
+            if query and rng.random() < 0.3:
+                query = query[:-1]
+            else:
+                query += rng.choice("abc ")
+            for kw, ids in matcher.match(query, data).items():
+                assert list(ids) == brute_force(kw, list(data))
+
+    def test_small_candidate_sets_narrow_without_decoding(self):
+        matcher = make_matcher(PATHS)
+        matcher.match("re", PATHS)
+        matcher.match("rea", PATHS)
+        with patch("rcli.fuzzy._decoded", side_effect=AssertionError("decoded paths")):
+            assert list(matcher.match("read", PATHS)["read"]) == [1, 4]
+            assert list(matcher.match("readme", PATHS)["readme"]) == [1, 4]
+
+class TestRanking:
+    def rank(self, paths, query, limit=10):
+        return [paths[i] for i in make_matcher(paths).search(query, paths, limit)]
+
+    def test_basename_beats_directory_match(self):
+        paths = ["report/summary.txt", "archive/report.txt"]
+        assert self.rank(paths, "report")[0] == "archive/report.txt"
+
+    def test_word_boundary_beats_mid_word(self):
+        assert score_path("misc/data.csv", ["data"]) > score_path("misc/metadata.csv", ["data"])
+
+    def test_path_whose_lowercase_is_longer(self):
+        # "İ".lower() is two code points, shifting every later position
+        assert score_path("İİİİİİ/readme", ["readme"]) == score_path("iiiiii/readme", ["readme"])
+        paths = ["İİİİİİ/readme", "docs/readme.md"]
+        assert self.rank(paths, "readme") == paths
+
+    def test_exact_name_beats_longer_name(self):
+        paths = ["src/main_old.py", "src/main.py"]
+        assert self.rank(paths, "main")[0] == "src/main.py"
+
+    def test_adjacent_keywords_rank_higher(self):
+        paths = ["photos/old/2024/a.jpg", "old/photos/2024/a.jpg"]
+        assert self.rank(paths, "photos 2024")[0] == "old/photos/2024/a.jpg"
+
+    def test_more_keywords_beat_better_score(self):
+        paths = ["beach.jpg", "photos/old/beach-trip/notes.md"]
+        assert self.rank(paths, "beach notes")[0] == "photos/old/beach-trip/notes.md"
+
+    def test_shorter_path_breaks_ties(self):
+        paths = ["a/b/c/readme", "a/readme"]
+        assert self.rank(paths, "readme")[0] == "a/readme"
+
+    def test_empty_query_lists_paths_in_order(self):
+        assert self.rank(PATHS, "", 3) == PATHS[:3]
+
+    def test_limit_respected(self):
+        paths = [f"dir/file{i}.txt" for i in range(100)]
+        assert len(self.rank(paths, "file", 7)) == 7
+
+    @pytest.mark.parametrize("query", ["a", "ab", "b/c", "a b", "ca ab bc", "a a"])
+    def test_matches_scoring_every_path(self, query):
+        rng = random.Random(7)
+        paths = [
+            "/".join("".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 4)))
+            for _ in range(2000)
+        ]
+        keywords = fuzzymatcher.keywords(query)
+
+        def rank(i):
+            lower = paths[i].lower()
+            count = sum(kw in lower for kw in keywords)
+            return (count, score_path(paths[i], keywords), -len(paths[i]), -i)
+
+        expected = sorted(range(len(paths)), key=rank, reverse=True)[:50]
+        assert make_matcher(paths).search(query, paths, 50) == expected
+
+    def test_long_path_scoring_best_in_large_group(self):
+        paths = [f"a/report{i}.txt" for i in range(9000)] + ["archive/" + "x" * 60 + "/report"]
+        assert self.rank(paths, "report", 10)[0] == paths[-1]
+
+    def test_bounds_cover_scores(self):
+        rng = random.Random(5)
+        paths = [
+            "/".join("".join(rng.choice("abAB.") for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 3)))
+            + rng.choice(["", "/"])
+            for _ in range(2000)
+        ]
+        for query in ("a", "ab", "a.b", "b a", "ab ab", "a/b", "b/"):
+            keywords = fuzzymatcher.keywords(query)
+            for path, bound in zip(paths, score_bounds(paths, keywords)):
+                assert bound >= score_path(path, keywords), (path, query)
+            everywhere = [p for p in paths if all(kw in p.lower() for kw in keywords)]
+            assert score_bounds(everywhere, keywords, everywhere=True) == score_bounds(everywhere, keywords)
+
+
+class TestCancellation:
+    def test_cancelled_search_raises(self):
+        paths = [f"dir/file{i}.txt" for i in range(10000)]
+        with pytest.raises(searchcancelled):
+            make_matcher(paths).search("file", paths, 10, cancelled=lambda: True)
+
+    def test_cancelled_match_keeps_earlier_frames(self):
+        paths = [f"dir/file{i}.txt" for i in range(10000)]
+        matcher = make_matcher(paths)
+        matcher.search("fi", paths, 10)
+        with pytest.raises(searchcancelled):
+            matcher.search("fil", paths, 10, cancelled=lambda: True)
+        assert [frame[0] for frame in matcher._stack] == ["fi"]
+        assert len(matcher.search("fil", paths, 10)) == 10
+
+
+class TestSearchWorker:
+    def test_runs_job_and_publishes_result(self):
+        worker = searchworker()
+        generation = worker.submit(lambda cancelled: "done")
+        assert worker.wait(timeout=5)
+        assert worker.poll() == (generation, "done")
+        assert worker.poll() is None
+        worker.stop()
+
+    def test_new_submit_cancels_running_job(self):
+        worker = searchworker()
+        started = threading.Event()
+        seen_cancel = threading.Event()
+
+        def slow(cancelled):
+            started.set()
+            while not cancelled():
+                pass
+            seen_cancel.set()
+            raise searchcancelled()
+
+        worker.submit(slow)
+        assert started.wait(timeout=5)
+        generation = worker.submit(lambda cancelled: "latest")
+        assert worker.wait(timeout=5)
+        assert seen_cancel.is_set()
+        assert worker.poll() == (generation, "latest")
+        worker.stop()
+
+    def test_queued_job_is_dropped(self):
+        worker = searchworker()
+        release = threading.Event()
+        ran = []
+        worker.submit(lambda cancelled: release.wait(5))
+        worker.submit(lambda cancelled: ran.append("middle"))
+        generation = worker.submit(lambda cancelled: ran.append("last") or "last")
+        release.set()
+        assert worker.wait(timeout=5)
+        assert ran == ["last"]
+        assert worker.poll() == (generation, "last")
+        worker.stop()
+
+    def test_failed_job_publishes_nothing(self):
+        worker = searchworker()
+        worker.submit(lambda cancelled: 1 / 0)
+        assert worker.wait(timeout=5)
+        assert worker.poll() is None
+        assert not worker.is_busy()
+        worker.stop()
+
+    def test_submit_after_stop_raises(self):
+        worker = searchworker()
+        worker.stop()
+        with pytest.raises(RuntimeError):
+            worker.submit(lambda cancelled: None)
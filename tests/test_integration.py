@@ -4,8 +4,11 @@ Mocks subprocess at the boundary and drives the full UI via a programmed
 getch sequence, letting real scenes/forms/components/cache run.
 """
 
+import io
 import json
 import os
+import sqlite3
+import threading
 import pytest
 from unittest.mock import patch, MagicMock
 from rcli.cursedcli import cursedcli
@@ -49,7 +52,8 @@ def _make_fake_popen(popen_commands):
         popen_commands.append(list(args))
         process = MagicMock()
         process.stdout = MagicMock()
-        process.stdout.read.return_value = ""  # commandcomponent reads this
+        process.stderr = io.BytesIO()  # transfer reads rclone's JSON log from this
+        process.wait.return_value = 0
         process.communicate.return_value = ("", "")  # rclone class reads this
 
         if "lsjson" in args:
@@ -80,17 +84,30 @@ def _make_fake_run(run_commands):
     return fake_run
 
 
-def _make_mock_stdscr(getch_sequence):
-    """Mock stdscr with programmed getch sequence; falls back to 'q'."""
+def _make_mock_stdscr(getch_sequence, busy=lambda: False):
+    """Mock stdscr with programmed getch sequence; falls back to 'q'.
+
+    Before falling back, no key is pressed while busy() is true, as a user
+    waits for background work to finish before quitting.
+    """
     index = [0]
     mock = MagicMock()
     mock.getmaxyx.return_value = (40, 120)
 
     def _getch():
+        # The user waits for the connection test before typing: a pending
+        # connection reads as the getch timeout expiring with no key
+        for thread in threading.enumerate():
+            if type(thread).__name__ == "ConnTestThread" and thread.is_alive():
+                thread.join(0.1)
+                return -1
         if index[0] < len(getch_sequence):
             key = getch_sequence[index[0]]
             index[0] += 1
             return key
+        if busy():
+            threading.Event().wait(0.01)
+            return -1
         return ord("q")
 
     mock.getch.side_effect = _getch
@@ -112,25 +129,32 @@ class TestEndToEndSmoke:
 
         cache_dir = tmp_path / "rcli"
         cache_dir.mkdir()
-        cache_file = str(cache_dir / "cache.json")
+        cache_file = str(cache_dir / "cache.db")
 
         # getch keys consumed by scenes in order:
         #   1. Enter      — select documents/ (enter folder)
         #   2. h          — go back to root
         #   3. /          — open fuzzy search
         #   4. Esc        — exit fuzzy (return to root)
-        #   5. d          — download first entry (documents/ dir)
-        #      (download command phase — no getch consumed)
+        #   5. d          — queue a download of the first entry (documents/ dir)
         #   6. p          — start upload
         #   7. f          — type local path character
-        #   8. Enter      — confirm upload
-        #      (upload command phase — no getch consumed)
-        #   9. q          — quit
+        #   8. Enter      — queue the upload, back to the browser
+        #   then no key until both transfers and the reload of the root
+        #   they cause are done, and q to quit
         getch_keys = [
             10, ord("h"), ord("/"), 27, ord("d"),
-            ord("p"), ord("f"), 10, ord("q"),
+            ord("p"), ord("f"), 10,
         ]
-        mock_stdscr = _make_mock_stdscr(getch_keys)
+        cli = None
+
+        root_listing = ["rclone", "lsjson", "b2:", "--max-depth", "1"]
+
+        def busy():
+            transfers = cli._transfers if cli is not None else None
+            return transfers is None or transfers.active() > 0 or popen_commands.count(root_listing) < 2
+
+        mock_stdscr = _make_mock_stdscr(getch_keys, busy)
 
         _orig_expanduser = os.path.expanduser
 
@@ -164,22 +188,36 @@ class TestEndToEndSmoke:
         assert popen_commands[0] == ["rclone", "lsjson", "b2:", "--max-depth", "1"]
         # 2. enter documents/
         assert popen_commands[1] == ["rclone", "lsjson", "b2:documents/", "--max-depth", "1"]
-        # 3. download documents/ directory
-        assert popen_commands[2] == ["rclone", "copy", "-P", "b2:documents", "documents"]
-        # 4. upload local file "f" to root
-        assert popen_commands[3] == ["rclone", "copy", "-P", "f", "b2:"]
-        # 5. root re-fetched after upload cache invalidation
-        assert popen_commands[4] == ["rclone", "lsjson", "b2:", "--max-depth", "1"]
-        assert len(popen_commands) == 5
+        # 3, 4. download documents/ directory and upload local file "f" to
+        #    root, run side by side in the background
+        assert sorted(command[:4] for command in popen_commands[2:4]) == [
+            ["rclone", "copy", "b2:documents", "documents"],
+            ["rclone", "copy", "f", "b2:"],
+        ]
+        # 5. root re-fetched by the browser once the upload ended: "f"
+        #    cannot be read back to write the upload through, so
+        #    everything under the destination was invalidated
+        # 6. and, depending on timing, documents/ prefetched again, having
+        #    been invalidated with the root
+        later = popen_commands[4:]
+        assert root_listing in later
+        later.remove(root_listing)
+        assert later in ([], [["rclone", "lsjson", "b2:documents/", "--max-depth", "1"]])
 
         # --- No unhandled exceptions (reaching this point is the proof) ---
 
         # --- Verify cache populated correctly ---
         assert os.path.exists(cache_file)
-        with open(cache_file) as f:
-            cache_data = json.load(f)
-
-        assert "b2:" in cache_data
-        assert "b2:documents/" in cache_data
-        assert cache_data["b2:"]["entries"] == ROOT_ENTRIES
-        assert cache_data["b2:documents/"]["entries"] == SUB_ENTRIES
+        db = sqlite3.connect(cache_file)
+        keys = {key for (key,) in db.execute("SELECT key FROM dirs")}
+        # documents/ only if it was prefetched again (see 6. above)
+        assert keys in ({"b2:"}, {"b2:", "b2:documents/"})
+
+        def cached_entries(key):
+            rows = db.execute(
+                "SELECT data FROM entries WHERE parent = ? ORDER BY rowid", (key,)
+            )
+            return [json.loads(data) for (data,) in rows]
+
+        assert cached_entries("b2:") == ROOT_ENTRIES
+        db.close()
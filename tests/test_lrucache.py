@@ -0,0 +1,69 @@
+import time
+
+from rcli.lrucache import lrucache, estimate_size
+
+
+LISTING = [{"Name": "a.txt", "Size": 10, "IsDir": False}]
+
+
+class TestLruCache:
+    def test_put_then_get(self):
+        cache = lrucache(1024 * 1024)
+        cache.put("b2:", LISTING)
+        assert cache.get("b2:") is LISTING
+
+    def test_missing_key_returns_none(self):
+        cache = lrucache(1024 * 1024)
+        assert cache.get("b2:") is None
+        assert cache.stats()["misses"] == 1
+
+    def test_evicts_least_recently_used_over_budget(self):
+        size = estimate_size(list(LISTING))
+        cache = lrucache(size * 2)
+        cache.put("a", list(LISTING))
+        cache.put("b", list(LISTING))
+        cache.get("a")  # a is now most recently used
+        cache.put("c", list(LISTING))
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] <= size * 2
+
+    def test_value_larger_than_budget_not_stored(self):
+        cache = lrucache(10)
+        cache.put("a", LISTING)
+        assert len(cache) == 0
+
+    def test_lookup_returns_timestamp(self):
+        cache = lrucache(1024 * 1024)
+        cache.put("a", LISTING, timestamp=123.0)
+        assert cache.lookup("a") == (LISTING, 123.0)
+        assert cache.lookup("b") is None
+
+    def test_expired_value_is_miss(self):
+        cache = lrucache(1024 * 1024, ttl=60)
+        cache.put("a", LISTING, timestamp=time.time() - 120)
+        assert cache.get("a") is None
+        assert "a" not in cache
+
+    def test_expired_values_evicted_before_lru(self):
+        size = estimate_size(list(LISTING))
+        cache = lrucache(size * 2, ttl=60)
+        cache.put("fresh", list(LISTING))
+        cache.put("old", list(LISTING), timestamp=time.time() - 120)
+        cache.put("new", list(LISTING))
+
+        assert "fresh" in cache
+        assert "old" not in cache
+
+    def test_pop_and_stats(self):
+        cache = lrucache(1024 * 1024)
+        cache.put("a", LISTING)
+        cache.get("a")
+        cache.pop("a")
+        stats = cache.stats()
+        assert stats["entries"] == 0
+        assert stats["bytes"] == 0
+        assert stats["hits"] == 1
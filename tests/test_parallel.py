@@ -0,0 +1,107 @@
+import os
+import random
+
+import pytest
+
+from rcli.fuzzy import trigramindex, fuzzymatcher, searchcancelled
+from rcli.parallel import parallelmatcher
+from rcli.pathstore import pathstore
+
+WORDS = ["photos", "docs", "2024", "backup", "readme", "src", "beach", "notes"]
+
+
+def make_paths(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        "/".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))) + f"_{i}.txt"
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def small_shards(monkeypatch):
+    monkeypatch.setattr(parallelmatcher, "MIN_SHARD", 100)
+
+
+@pytest.fixture
+def store():
+    return pathstore(make_paths(1000))
+
+
+def test_matches_single_process_ranking(small_shards, store):
+    data = store.view()
+    single = fuzzymatcher(trigramindex(store))
+    matcher = parallelmatcher(data, 3)
+    try:
+        assert len(matcher) == 3
+        for query in ["", "p", "ph", "photos", "photos 2024", "beach notes", "zzz"]:
+            assert matcher.search(query, data, 50) == single.search(query, data, 50)
+    finally:
+        matcher.stop()
+
+
+def test_shard_count_limited_by_size(small_shards, store):
+    matcher = parallelmatcher(store.view(), 64)
+    try:
+        assert len(matcher) == 10
+    finally:
+        matcher.stop()
+
+
+def test_list_input(small_shards):
+    paths = make_paths(300)
+    matcher = parallelmatcher(paths, 2)
+    try:
+        assert matcher.covers(paths)
+        expected = fuzzymatcher(trigramindex(paths)).search("docs", paths, 20)
+        assert matcher.search("docs", paths, 20) == expected
+    finally:
+        matcher.stop()
+
+
+def test_covers_snapshot_only(small_shards, store):
+    data = store.view()
+    matcher = parallelmatcher(data, 2)
+    try:
+        assert matcher.covers(data)
+        assert matcher.covers(store)
+        store.append("new.txt")
+        assert not matcher.covers(store.view())
+        assert not matcher.covers(pathstore(make_paths(1000)))
+    finally:
+        matcher.stop()
+
+
+def test_cancelled_search_raises(small_shards, store):
+    data = store.view()
+    matcher = parallelmatcher(data, 2)
+    try:
+        with pytest.raises(searchcancelled):
+            matcher.search("photos", data, 10, cancelled=lambda: True)
+        # Stale replies from the cancelled query are skipped
+        expected = fuzzymatcher(trigramindex(store)).search("readme", data, 10)
+        assert matcher.search("readme", data, 10) == expected
+    finally:
+        matcher.stop()
+
+
+def test_stop_releases_workers_and_memory(small_shards, store):
+    matcher = parallelmatcher(store.view(), 2)
+    processes = [process for process, _ in matcher._workers]
+    name = matcher._shm.name
+    matcher.stop()
+    assert not any(process.is_alive() for process in processes)
+    assert not os.path.exists(os.path.join("/dev/shm", name.lstrip("/")))
+
+
+def test_dead_worker_raises_oserror(small_shards, store):
+    data = store.view()
+    matcher = parallelmatcher(data, 2)
+    try:
+        process, _ = matcher._workers[0]
+        process.kill()
+        process.join()
+        with pytest.raises(OSError):
+            matcher.search("photos", data, 10)
+    finally:
+        matcher.stop()
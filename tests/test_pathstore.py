@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+from rcli.pathstore import pathstore
+
+
+PATHS = ["docs/", "docs/readme.md", "photos/été.jpg", "", "a/b/c.txt"]
+
+
+class TestPathstore:
+    def test_roundtrip(self):
+        store = pathstore(PATHS)
+        assert len(store) == len(PATHS)
+        assert list(store) == PATHS
+        assert [store[i] for i in range(len(PATHS))] == PATHS
+
+    def test_negative_index_and_slice(self):
+        store = pathstore(PATHS)
+        assert store[-1] == "a/b/c.txt"
+        assert store[1:3] == PATHS[1:3]
+
+    def test_index_out_of_range(self):
+        with pytest.raises(IndexError):
+            pathstore(PATHS)[len(PATHS)]
+
+    def test_path_containing_newline(self):
+        paths = ["one", "two\nlines", "three"]
+        assert list(pathstore(paths)) == paths
+
+    def test_iteration_across_chunks(self):
+        paths = [f"dir/{i}.txt" for i in range(10_000)]
+        store = pathstore(paths)
+        assert list(store) == paths
+        assert list(store.iterrange(4000, 4100)) == paths[4000:4100]
+
+    def test_smaller_than_list_of_str(self):
+        import sys
+        paths = [f"photos/2024/IMG_{i:05d}.jpg" for i in range(10_000)]
+        as_list = sys.getsizeof(paths) + sum(sys.getsizeof(p) for p in paths)
+        assert pathstore(paths).nbytes() * 2 < as_list
+
+
+class TestPathview:
+    def test_view_is_fixed_length(self):
+        store = pathstore(PATHS)
+        view = store.view()
+        store.append("later.txt")
+        assert len(view) == len(PATHS)
+        assert list(view) == PATHS
+        assert len(store.view()) == len(PATHS) + 1
+
+    def test_view_equals_list(self):
+        assert pathstore(PATHS).view() == PATHS
+        assert pathstore(PATHS).view() != PATHS[:-1]
+
+    def test_view_index_bounds(self):
+        store = pathstore(PATHS)
+        view = store.view()
+        store.append("later.txt")
+        with pytest.raises(IndexError):
+            view[len(PATHS)]
+
+
+class TestPathstoreFile:
+    def test_save_and_load(self, tmp_path):
+        path = str(tmp_path / "paths.idx")
+        pathstore(PATHS + ["two\nlines"]).save(path, (1234.5, 1000.0))
+        store, stamps = pathstore.load(path)
+        assert stamps == (1234.5, 1000.0)
+        assert list(store) == PATHS + ["two\nlines"]
+        assert store[2] == "photos/été.jpg"
+
+    def test_loaded_store_can_be_saved_again(self, tmp_path):
+        first = str(tmp_path / "first.idx")
+        second = str(tmp_path / "second.idx")
+        pathstore(PATHS).save(first, (1.0, 1.0))
+        store, _ = pathstore.load(first)
+        store.save(second, (2.0, 2.0))
+        assert list(pathstore.load(second)[0]) == PATHS
+
+    def test_save_replaces_existing_file(self, tmp_path):
+        path = str(tmp_path / "paths.idx")
+        pathstore(["old"]).save(path, (1.0, 1.0))
+        pathstore(["new"]).save(path, (2.0, 2.0))
+        assert list(pathstore.load(path)[0]) == ["new"]
+        assert os.listdir(tmp_path) == ["paths.idx"]
+
+    def test_bad_magic_rejected(self, tmp_path):
+        path = tmp_path / "paths.idx"
+        path.write_bytes(b"x" * 100)
+        with pytest.raises(ValueError):
+            pathstore.load(str(path))
+
+    def test_truncated_file_rejected(self, tmp_path):
+        path = tmp_path / "paths.idx"
+        pathstore(PATHS).save(str(path), (1.0, 1.0))
+        path.write_bytes(path.read_bytes()[:-3])
+        with pytest.raises(ValueError):
+            pathstore.load(str(path))
+
+
+class TestPathstoreCopy:
+    def test_copy_is_independent(self):
+        store = pathstore(PATHS)
+        copy = store.copy()
+        copy.append("extra")
+        assert list(store) == PATHS
+        assert list(copy) == PATHS + ["extra"]
+
+    def test_copy_of_loaded_store_appends(self, tmp_path):
+        path = str(tmp_path / "paths.idx")
+        pathstore(PATHS).save(path, (1.0, 1.0))
+        copy = pathstore.load(path)[0].copy()
+        copy.append("extra")
+        assert list(copy) == PATHS + ["extra"]
+
+    def test_copy_of_offset_slice(self):
+        buf, ends = pathstore(PATHS).buffers()
+        shard = pathstore.frombuffers(buf, ends[2:5])
+        copy = shard.copy()
+        copy.append("extra")
+        assert list(copy) == PATHS[2:4] + ["extra"]
@@ -1,4 +1,5 @@
-from unittest.mock import patch, MagicMock
+from unittest.mock import ANY, patch, MagicMock
+import pytest
 
 from rcli.rcli import main
 
@@ -46,4 +47,99 @@ def test_no_remote_passes_none_to_cursedcli():
         with patch("rcli.rcli.cursedcli", return_value=mock_cli) as mock_cls:
             main()
 
-    mock_cls.assert_called_once_with(None, no_index=False)
+    mock_cls.assert_called_once_with(None, no_index=False, rcd=False, search_processes=0, ttl_policy=ANY, jobs=2, profiles=ANY)
+
+
+def test_rcd_flag_passed_to_cursedcli():
+    """--rcd selects the persistent rclone rcd backend."""
+    mock_cli = MagicMock()
+
+    with patch("rcli.rcli.docopt", return_value={"-v": False, "--clear-cache": False, "--no-index": False, "--rcd": True, "<remote>": "b2:"}):
+        with patch("rcli.rcli.cursedcli", return_value=mock_cli) as mock_cls:
+            main()
+
+    mock_cls.assert_called_once_with("b2:", no_index=False, rcd=True, search_processes=0, ttl_policy=ANY, jobs=2, profiles=ANY)
+
+
+def test_search_processes_passed_to_cursedcli():
+    """--search-processes=<n> is passed on as an int."""
+    mock_cli = MagicMock()
+
+    with patch("rcli.rcli.docopt", return_value={"-v": False, "--clear-cache": False, "--no-index": False, "--search-processes": "8", "<remote>": "b2:"}):
+        with patch("rcli.rcli.cursedcli", return_value=mock_cli) as mock_cls:
+            main()
+
+    mock_cls.assert_called_once_with("b2:", no_index=False, rcd=False, search_processes=8, ttl_policy=ANY, jobs=2, profiles=ANY)
+
+
+def test_jobs_passed_to_cursedcli():
+    """--jobs=<n> sets how many transfers run at once."""
+    mock_cli = MagicMock()
+
+    with patch("rcli.rcli.docopt", return_value={"-v": False, "--clear-cache": False, "--no-index": False, "--jobs": "4", "<remote>": "b2:"}):
+        with patch("rcli.rcli.cursedcli", return_value=mock_cli) as mock_cls:
+            main()
+
+    assert mock_cls.call_args.kwargs["jobs"] == 4
+
+
+def test_config_ttl_policy_passed_to_cursedcli(tmp_path):
+    """--config=<file> is read into the cache TTL policy."""
+    config = tmp_path / "config.ini"
+    config.write_text("[remote b2:]\nttl = 30d\n")
+    mock_cli = MagicMock()
+
+    with patch("rcli.rcli.docopt", return_value={"-v": False, "--clear-cache": False, "--no-index": False, "--config": str(config), "<remote>": "b2:"}):
+        with patch("rcli.rcli.cursedcli", return_value=mock_cli) as mock_cls:
+            main()
+
+    policy = mock_cls.call_args.kwargs["ttl_policy"]
+    assert policy.ttl("b2:", "docs/") == 30 * 24 * 60 * 60
+
+
+def test_config_profiles_passed_to_cursedcli(tmp_path):
+    """--config=<file> is also read into the transfer profiles."""
+    config = tmp_path / "config.ini"
+    config.write_text("[remote b2:]\nttl = 30d\nprofile = few-huge-files\n")
+    mock_cli = MagicMock()
+
+    with patch("rcli.rcli.docopt", return_value={"-v": False, "--clear-cache": False, "--no-index": False, "--config": str(config), "<remote>": "b2:"}):
+        with patch("rcli.rcli.cursedcli", return_value=mock_cli) as mock_cls:
+            main()
+
+    profiles = mock_cls.call_args.kwargs["profiles"]
+    assert profiles.forremote("b2:").name == "few-huge-files"
+
+
+def test_invalid_config_exits_before_starting(tmp_path, capsys):
+    config = tmp_path / "config.ini"
+    config.write_text("[cache]\nttl = soon\n")
+
+    with patch("rcli.rcli.docopt", return_value={"-v": False, "--clear-cache": False, "--no-index": False, "--config": str(config), "<remote>": "b2:"}):
+        with patch("rcli.rcli.cursedcli") as mock_cls:
+            with pytest.raises(SystemExit) as exc:
+                main()
+
+    assert exc.value.code == 1
+    assert "Invalid config" in capsys.readouterr().err
+    mock_cls.assert_not_called()
+
+
+@pytest.mark.parametrize("option, value", [
+    ("--jobs", "two"),
+    ("--jobs", "0"),
+    ("--jobs", "-1"),
+    ("--search-processes", "1.5"),
+    ("--search-processes", "-2"),
+])
+def test_invalid_count_exits_before_starting(capsys, option, value):
+    with patch("rcli.rcli.docopt", return_value={"-v": False, "--clear-cache": False, "--no-index": False, option: value, "<remote>": "b2:"}):
+        with patch("rcli.rcli.cursedcli") as mock_cls:
+            with pytest.raises(SystemExit) as exc:
+                main()
+
+    assert exc.value.code == 1
+    err = capsys.readouterr().err
+    assert f"Invalid option: {option}" in err
+    assert "Traceback" not in err
+    mock_cls.assert_not_called()
@@ -1,11 +1,20 @@
 import json
+import sqlite3
 import os
+import threading
 import time
 from unittest.mock import patch, MagicMock
 
 import pytest
 
-from rcli.rclone import check_rclone_available, rclone, rclonecache
+import io
+import shutil
+from rcli.rclone import (
+    check_rclone_available, rclone, rclonecache, rclonercd, searchindex, iter_lsjson,
+    local_listing,
+)
+from rcli.fuzzy import fuzzymatcher
+from rcli.config import ttlpolicy
 
 
 class TestCheckRcloneAvailable:
@@ -51,6 +60,16 @@ class TestRcloneSubprocessRun:
             assert result == "output"
             mock_popen.assert_called_once()
 
+    def test_cancel_kills_captured_command(self):
+        import subprocess as sp
+        cancel = threading.Event()
+        cancel.set()
+        with patch("subprocess.Popen") as mock_popen:
+            process = mock_popen.return_value
+            process.communicate.side_effect = [sp.TimeoutExpired("rclone", 0.05), ("", "")]
+            assert rclone().listdir("b2:", cancel=cancel) is None
+        process.kill.assert_called_once()
+
 
 class TestListdir:
     """Verify listdir parses rclone lsjson output correctly."""
@@ -80,20 +99,20 @@ class TestListdir:
         assert {f["Name"] for f in files} == {"photo.jpg", "notes.txt"}
 
     def test_listdir_malformed_output(self):
-        """Malformed JSON output returns empty list."""
+        """Malformed JSON output is a failed listing."""
         with patch("subprocess.Popen") as mock_popen:
             mock_popen.return_value.communicate.return_value = ("not json", "")
             r = rclone()
             result = r.listdir("b2:", "somepath")
-            assert result == []
+            assert result is None
 
     def test_listdir_empty_output(self):
-        """Empty string output returns empty list."""
+        """No output at all, as from a failed rclone, is not an empty directory."""
         with patch("subprocess.Popen") as mock_popen:
             mock_popen.return_value.communicate.return_value = ("", "")
             r = rclone()
             result = r.listdir("b2:", "")
-            assert result == []
+            assert result is None
 
     def test_listdir_passes_correct_args(self):
         """Verify the correct rclone command is constructed."""
@@ -105,12 +124,12 @@ class TestListdir:
             assert call_args == ["rclone", "lsjson", "b2:docs/", "--max-depth", "1"]
 
     def test_listdir_non_list_json(self):
-        """If rclone returns a JSON object instead of array, return empty."""
+        """If rclone returns a JSON object instead of array, the listing failed."""
         with patch("subprocess.Popen") as mock_popen:
             mock_popen.return_value.communicate.return_value = ('{"error": "bad"}', "")
             r = rclone()
             result = r.listdir("b2:", "")
-            assert result == []
+            assert result is None
 
 
 class TestListremotes:
@@ -167,107 +186,233 @@ class TestTestConnection:
             assert r.test_connection("b2:") is False
 
 
+class TestRcloneRcd:
+    """Verify the rclone rcd backend maps rc responses to the subprocess shapes."""
+
+    def _make_rcd(self, response):
+        rc = rclonercd()
+        rc._url = "http://127.0.0.1:5572/"
+        rc._auth = "Basic x"
+        rc.call = MagicMock(return_value=response)
+        return rc
+
+    def test_listdir_uses_operations_list(self, fake_lsjson_output):
+        rc = self._make_rcd({"list": fake_lsjson_output})
+        result = rc.listdir("b2:", "docs/")
+        assert result == fake_lsjson_output
+        rc.call.assert_called_once_with(
+            "operations/list", {"fs": "b2:docs/", "remote": ""}
+        )
+
+    def test_listdir_error_returns_none(self):
+        rc = self._make_rcd(None)
+        assert rc.listdir("b2:") is None
+
+    def test_listremotes_appends_colon(self):
+        rc = self._make_rcd({"remotes": ["b2", "gdrive"]})
+        assert rc.listremotes() == ["b2:", "gdrive:"]
+
+    def test_about_returns_dict(self):
+        rc = self._make_rcd({"total": 100, "used": 40, "free": 60})
+        assert rc.about("b2:") == {"total": 100, "used": 40, "free": 60}
+
+    def test_listdir_with_cancel_runs_as_job(self, fake_lsjson_output):
+        rc = self._make_rcd(None)
+        rc.call.side_effect = [
+            {"jobid": 7},
+            {"finished": True, "success": True, "output": {"list": fake_lsjson_output}},
+        ]
+        assert rc.listdir("b2:", "docs/", cancel=threading.Event()) == fake_lsjson_output
+        assert rc.call.call_args_list[0][0] == (
+            "operations/list", {"fs": "b2:docs/", "remote": "", "_async": True}
+        )
+        assert rc.call.call_args_list[1][0] == ("job/status", {"jobid": 7})
+
+    def test_cancelled_job_is_stopped(self):
+        rc = self._make_rcd({"jobid": 7})
+        cancel = threading.Event()
+        cancel.set()
+        assert rc.listdir("b2:", cancel=cancel) is None
+        rc.call.assert_called_with("job/stop", {"jobid": 7}, quiet=True)
+
+    def test_call_without_daemon_returns_none(self):
+        assert rclonercd().call("rc/noop") is None
+
+    def test_call_posts_json_with_auth(self):
+        rc = rclonercd()
+        rc._url = "http://127.0.0.1:5572/"
+        rc._auth = "Basic abc"
+        response = MagicMock()
+        response.read.return_value = b'{"list": []}'
+        response.__enter__.return_value = response
+        with patch.object(rc._opener, "open", return_value=response) as mock_open:
+            result = rc.call("operations/list", {"fs": "b2:"})
+        assert result == {"list": []}
+        request = mock_open.call_args[0][0]
+        assert request.full_url == "http://127.0.0.1:5572/operations/list"
+        assert json.loads(request.data) == {"fs": "b2:"}
+        assert request.get_header("Authorization") == "Basic abc"
+
+    def test_start_fails_when_daemon_exits(self):
+        with patch("subprocess.Popen") as mock_popen:
+            mock_popen.return_value.poll.return_value = 1
+            rc = rclonercd()
+            assert rc.start() is False
+
+    def test_start_passes_credentials_in_env(self):
+        with patch("subprocess.Popen") as mock_popen:
+            mock_popen.return_value.poll.return_value = 1
+            rclonercd().start()
+        args, kwargs = mock_popen.call_args
+        env = kwargs["env"]
+        user, password = env["RCLONE_RC_USER"], env["RCLONE_RC_PASS"]
+        assert user and password
+        assert not any(flag in args[0] for flag in ("--rc-user", "--rc-pass", user, password))
+
+    @pytest.mark.skipif(shutil.which("rclone") is None, reason="rclone not installed")
+    def test_live_daemon_memory_remote(self):
+        rc = rclonercd()
+        assert rc.start()
+        try:
+            assert rc.listdir(":memory:") == []
+            assert rc.test_connection(":memory:") is True
+        finally:
+            rc.stop()
+
+
+def make_cache(cache_dir):
+    """Create an rclonecache backed by a database in cache_dir."""
+    with patch("rcli.rclone.shutil.which", return_value="/usr/bin/rclone"):
+        return rclonecache(cacheDir=str(cache_dir))
+
+
 class TestCacheCorruptionRecovery:
     """Verify rclonecache recovers from corrupt cache files."""
 
-    def _make_cache(self, tmp_cache_file):
-        """Create an rclonecache pointing at the tmp cache file."""
-        with patch.object(rclonecache, "__init__", lambda self: None):
-            cache = rclonecache()
-        cache.cachePath = tmp_cache_file
-        cache.rclone = rclone()
-        return cache
-
-    def test_listdir_recovers_from_corrupt_cache(self, tmp_cache_file):
-        """Write corrupt JSON, call listdir(), verify recovery."""
-        with open(tmp_cache_file, "w") as f:
-            f.write("{invalid json!!! [[")
+    def test_listdir_recovers_from_corrupt_database(self, tmp_cache_dir):
+        """Write garbage to cache.db, call listdir(), verify recovery."""
+        (tmp_cache_dir / "cache.db").write_bytes(b"{invalid sqlite!!! [[" * 100)
 
-        rc = self._make_cache(tmp_cache_file)
+        rc = make_cache(tmp_cache_dir)
         fake_entries = [{"Name": "file1.txt", "IsDir": False}]
 
         with patch.object(rc.rclone, "listdir", return_value=fake_entries):
             result = rc.listdir("b2:")
 
         assert result == fake_entries
-        with open(tmp_cache_file, "r") as f:
-            data = json.load(f)
-        assert "b2:" in data
+        rc.close()
+        assert make_cache(tmp_cache_dir).get_all_cached_paths("b2:") == ["file1.txt"]
 
-    def test_listdir_corrupt_cache_does_not_crash(self, tmp_cache_file):
+    def test_listdir_corrupt_cache_does_not_crash(self, tmp_cache_dir):
         """Ensure no unhandled exception on completely garbled cache."""
-        with open(tmp_cache_file, "w") as f:
-            f.write("\x00\x01\x02\x03")
+        (tmp_cache_dir / "cache.db").write_bytes(b"\x00\x01\x02\x03")
 
-        rc = self._make_cache(tmp_cache_file)
+        rc = make_cache(tmp_cache_dir)
 
         with patch.object(rc.rclone, "listdir", return_value=[]):
             result = rc.listdir("remote:")
 
         assert result == []
 
+    def test_corrupt_legacy_json_is_removed(self, tmp_cache_dir, tmp_cache_file):
+        with open(tmp_cache_file, "w") as f:
+            f.write("{invalid json!!! [[")
 
-class TestAtomicCacheWrites:
-    """Verify cache uses atomic write (tmp + os.replace)."""
+        rc = make_cache(tmp_cache_dir)
+        with patch.object(rc.rclone, "listdir", return_value=[]):
+            rc.listdir("b2:")
 
-    def _make_cache(self, tmp_cache_file):
-        with patch.object(rclonecache, "__init__", lambda self: None):
-            cache = rclonecache()
-        cache.cachePath = tmp_cache_file
-        cache.rclone = rclone()
-        return cache
+        assert not os.path.exists(tmp_cache_file)
 
-    def test_original_cache_unchanged_on_write_failure(self, tmp_cache_file):
-        """If json.dump raises mid-write, the original cache file is unchanged."""
-        original_data = {"b2:": {"timestamp": time.time(), "entries": [{"Name": "old.txt"}]}}
-        with open(tmp_cache_file, "w") as f:
-            json.dump(original_data, f)
 
-        rc = self._make_cache(tmp_cache_file)
+class TestTransactionalCacheWrites:
+    """Verify a failed write leaves the previous listing intact."""
+
+    def test_original_listing_unchanged_on_write_failure(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        rc._store("b2:", [{"Name": "old.txt"}], timestamp=time.time() - 7200)
 
         with patch.object(rc.rclone, "listdir", return_value=[{"Name": "new.txt"}]):
-            with patch("json.dump", side_effect=IOError("disk full")):
-                try:
+            with patch("rcli.rclone.json.dumps", side_effect=IOError("disk full")):
+                with pytest.raises(IOError):
                     rc.listdir("b2:")
-                except IOError:
-                    pass
 
-        # Original cache must be intact
-        with open(tmp_cache_file, "r") as f:
-            data = json.load(f)
-        assert data["b2:"]["entries"] == [{"Name": "old.txt"}]
+        assert rc.get_all_cached_paths("b2:") == ["old.txt"]
+
+    def test_failed_insert_rolls_back(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        rc._store("b2:", [{"Name": "old.txt"}])
+
+        class Unserializable:
+            pass
 
-        # Temp file should not linger
-        assert not os.path.exists(tmp_cache_file + ".tmp")
+        with pytest.raises(TypeError):
+            rc._store("b2:", [{"Name": "new.txt", "bad": Unserializable()}])
 
-    def test_successful_write_replaces_cache(self, tmp_cache_file):
-        """Normal listdir writes atomically and produces valid cache."""
-        rc = self._make_cache(tmp_cache_file)
+        assert rc.listdir("b2:") == [{"Name": "old.txt"}]
+
+    def test_successful_write_persists(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
         fake_entries = [{"Name": "file.txt", "IsDir": False}]
 
         with patch.object(rc.rclone, "listdir", return_value=fake_entries):
             rc.listdir("b2:")
+        rc.close()
+
+        rc2 = make_cache(tmp_cache_dir)
+        with patch.object(rc2.rclone, "listdir") as mock_ld:
+            assert rc2.listdir("b2:") == fake_entries
+        mock_ld.assert_not_called()
+
+
+class TestLegacyJsonMigration:
+    """Verify an existing cache.json is imported into the database."""
+
+    def test_imports_and_removes_json(self, tmp_cache_dir, tmp_cache_file):
+        entries = [{"Name": "a.txt", "IsDir": False}, {"Name": "sub", "IsDir": True}]
+        with open(tmp_cache_file, "w") as f:
+            json.dump({
+                "b2:": {"timestamp": time.time(), "entries": entries},
+                "b2:sub/": {"timestamp": time.time(), "entries": [{"Name": "b.txt"}]},
+            }, f)
+
+        rc = make_cache(tmp_cache_dir)
+        with patch.object(rc.rclone, "listdir") as mock_ld:
+            assert rc.listdir("b2:") == entries
+        mock_ld.assert_not_called()
+        assert sorted(rc.get_all_cached_paths("b2:")) == ["a.txt", "sub", "sub/b.txt"]
+        assert not os.path.exists(tmp_cache_file)
+
+    def test_keeps_original_timestamps(self, tmp_cache_dir, tmp_cache_file):
+        with open(tmp_cache_file, "w") as f:
+            json.dump({"b2:": {"timestamp": time.time() - 7200, "entries": [{"Name": "x"}]}}, f)
+
+        rc = make_cache(tmp_cache_dir)
+        fresh = [{"Name": "fresh.txt", "IsDir": False}]
+        with patch.object(rc.rclone, "listdir", return_value=fresh) as mock_ld:
+            assert rc.listdir("b2:") == fresh
+        assert mock_ld.call_count == 1
+
+    def test_old_format_entries_discarded(self, tmp_cache_dir, tmp_cache_file):
+        """Old-format cache entries (with 'data' instead of 'entries') are discarded."""
+        with open(tmp_cache_file, "w") as f:
+            json.dump({"b2:": {"timestamp": time.time(), "data": ["old.txt"]}}, f)
 
-        with open(tmp_cache_file, "r") as f:
-            data = json.load(f)
-        assert data["b2:"]["entries"] == fake_entries
-        # No leftover tmp file
-        assert not os.path.exists(tmp_cache_file + ".tmp")
+        rc = make_cache(tmp_cache_dir)
+        fresh = [{"Name": "new.txt", "IsDir": False}]
+        with patch.object(rc.rclone, "listdir", return_value=fresh) as mock_ld:
+            result = rc.listdir("b2:")
+
+        assert result == fresh
+        assert mock_ld.call_count == 1
 
 
 class TestPerDirectoryCaching:
     """Verify rclonecache per-directory caching behavior."""
 
-    def _make_cache(self, tmp_cache_file):
-        with patch.object(rclonecache, "__init__", lambda self: None):
-            cache = rclonecache()
-        cache.cachePath = tmp_cache_file
-        cache.rclone = rclone()
-        return cache
-
-    def test_listdir_twice_fetches_once(self, tmp_cache_file):
+    def test_listdir_twice_fetches_once(self, tmp_cache_dir):
         """Second listdir call uses cache, subprocess called only once."""
-        rc = self._make_cache(tmp_cache_file)
+        rc = make_cache(tmp_cache_dir)
         fake_entries = [{"Name": "a.txt", "IsDir": False}]
 
         with patch.object(rc.rclone, "listdir", return_value=fake_entries) as mock_ld:
@@ -278,9 +423,17 @@ class TestPerDirectoryCaching:
         assert result2 == fake_entries
         assert mock_ld.call_count == 1
 
-    def test_invalidate_then_listdir_fetches_again(self, tmp_cache_file):
+    def test_listdir_preserves_entry_order(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        entries = [{"Name": n, "IsDir": False} for n in ["z", "a", "m"]]
+        with patch.object(rc.rclone, "listdir", return_value=entries):
+            rc.listdir("b2:")
+        rc.close()
+        assert make_cache(tmp_cache_dir).listdir("b2:") == entries
+
+    def test_invalidate_then_listdir_fetches_again(self, tmp_cache_dir):
         """After invalidate, listdir fetches fresh data."""
-        rc = self._make_cache(tmp_cache_file)
+        rc = make_cache(tmp_cache_dir)
         entries_v1 = [{"Name": "old.txt", "IsDir": False}]
         entries_v2 = [{"Name": "new.txt", "IsDir": False}]
 
@@ -295,9 +448,9 @@ class TestPerDirectoryCaching:
         assert result == entries_v2
         assert mock_ld.call_count == 1
 
-    def test_different_paths_cached_independently(self, tmp_cache_file):
+    def test_different_paths_cached_independently(self, tmp_cache_dir):
         """Each directory path gets its own cache entry."""
-        rc = self._make_cache(tmp_cache_file)
+        rc = make_cache(tmp_cache_dir)
         entries_a = [{"Name": "a.txt", "IsDir": False}]
         entries_b = [{"Name": "b.txt", "IsDir": False}]
 
@@ -306,21 +459,16 @@ class TestPerDirectoryCaching:
         with patch.object(rc.rclone, "listdir", return_value=entries_b):
             rc.listdir("b2:", "dir_b/")
 
-        with open(tmp_cache_file, "r") as f:
-            data = json.load(f)
-        assert "b2:dir_a/" in data
-        assert "b2:dir_b/" in data
-        assert data["b2:dir_a/"]["entries"] == entries_a
-        assert data["b2:dir_b/"]["entries"] == entries_b
+        rc.invalidate("b2:", "dir_a/")
+        assert rc.get_all_cached_paths("b2:") == ["dir_b/b.txt"]
+        with patch.object(rc.rclone, "listdir") as mock_ld:
+            assert rc.listdir("b2:", "dir_b/") == entries_b
+        mock_ld.assert_not_called()
 
-    def test_stale_cache_refetches(self, tmp_cache_file):
+    def test_stale_cache_refetches(self, tmp_cache_dir):
         """Entries older than CACHE_TTL are refetched."""
-        rc = self._make_cache(tmp_cache_file)
-        old_data = {
-            "b2:": {"timestamp": time.time() - 7200, "entries": [{"Name": "stale.txt"}]}
-        }
-        with open(tmp_cache_file, "w") as f:
-            json.dump(old_data, f)
+        rc = make_cache(tmp_cache_dir)
+        rc._store("b2:", [{"Name": "stale.txt"}], timestamp=time.time() - 7200)
 
         fresh = [{"Name": "fresh.txt", "IsDir": False}]
         with patch.object(rc.rclone, "listdir", return_value=fresh) as mock_ld:
@@ -329,66 +477,1044 @@ class TestPerDirectoryCaching:
         assert result == fresh
         assert mock_ld.call_count == 1
 
-    def test_get_all_cached_paths(self, tmp_cache_file):
+    def test_stale_listing_served_when_allowed(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        rc._store("b2:", [{"Name": "stale.txt"}], timestamp=time.time() - 7200)
+        rc.memory.clear()
+
+        with patch.object(rc.rclone, "listdir") as mock_ld:
+            assert rc.listdir("b2:", stale=True) == [{"Name": "stale.txt"}]
+            # Served from memory the second time
+            assert rc.listdir("b2:", stale=True) == [{"Name": "stale.txt"}]
+        mock_ld.assert_not_called()
+
+    def test_listing_past_stale_max_age_refetches(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        rc._store("b2:", [{"Name": "old.txt"}], timestamp=time.time() - rc.STALE_MAX_AGE - 60)
+
+        fresh = [{"Name": "fresh.txt"}]
+        with patch.object(rc.rclone, "listdir", return_value=fresh) as mock_ld:
+            assert rc.listdir("b2:", stale=True) == fresh
+        assert mock_ld.call_count == 1
+
+    def test_revalidate_refreshes_stale_listing(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        rc._store("b2:", [{"Name": "stale.txt"}], timestamp=time.time() - 7200)
+
+        fresh = [{"Name": "fresh.txt"}]
+        with patch.object(rc.rclone, "listdir", return_value=fresh):
+            done = rc.revalidate("b2:")
+            assert done is not None and done.wait(2)
+        with patch.object(rc.rclone, "listdir") as mock_ld:
+            assert rc.listdir("b2:") == fresh
+        mock_ld.assert_not_called()
+
+    def test_failed_revalidate_keeps_stale_listing(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        rc._store("b2:", [{"Name": "stale.txt"}], timestamp=time.time() - 7200)
+
+        with patch.object(rc.rclone, "listdir", return_value=None):
+            done = rc.revalidate("b2:")
+            assert done is not None and done.wait(2)
+        rc.memory.clear()
+        with patch.object(rc.rclone, "listdir") as mock_ld:
+            assert rc.listdir("b2:", stale=True) == [{"Name": "stale.txt"}]
+        mock_ld.assert_not_called()
+
+    def test_failed_listing_is_not_cached(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        with patch.object(rc.rclone, "listdir", return_value=None):
+            assert rc.listdir("b2:", "docs/") == []
+        assert "b2:docs/" not in rc.memory
+
+        with patch.object(rc.rclone, "listdir", return_value=[{"Name": "a.txt"}]) as mock_ld:
+            assert rc.listdir("b2:", "docs/") == [{"Name": "a.txt"}]
+        assert mock_ld.call_count == 1
+
+    def test_revalidate_skips_fresh_or_missing_listing(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        rc._store("b2:", [{"Name": "a.txt"}])
+        assert rc.revalidate("b2:") is None
+        assert rc.revalidate("b2:", "missing/") is None
+
+    def test_get_all_cached_paths(self, tmp_cache_dir):
         """Aggregates file paths from multiple cached directories."""
-        rc = self._make_cache(tmp_cache_file)
-        cache_data = {
-            "b2:": {
-                "timestamp": time.time(),
-                "entries": [
-                    {"Name": "root.txt", "IsDir": False},
-                    {"Name": "docs", "IsDir": True},
-                ],
-            },
-            "b2:docs/": {
-                "timestamp": time.time(),
-                "entries": [
-                    {"Name": "readme.md", "IsDir": False},
-                ],
-            },
-        }
-        with open(tmp_cache_file, "w") as f:
-            json.dump(cache_data, f)
+        rc = make_cache(tmp_cache_dir)
+        rc._store("b2:", [
+            {"Name": "root.txt", "IsDir": False},
+            {"Name": "docs", "IsDir": True},
+        ])
+        rc._store("b2:docs/", [{"Name": "readme.md", "IsDir": False}])
 
         paths = rc.get_all_cached_paths("b2:")
         assert sorted(paths) == ["docs", "docs/readme.md", "root.txt"]
 
-    def test_get_all_cached_paths_ignores_other_remotes(self, tmp_cache_file):
+    def test_get_all_cached_paths_ignores_other_remotes(self, tmp_cache_dir):
         """Only returns paths for the specified remote."""
-        rc = self._make_cache(tmp_cache_file)
-        cache_data = {
-            "b2:": {
-                "timestamp": time.time(),
-                "entries": [{"Name": "b2file.txt", "IsDir": False}],
-            },
-            "gdrive:": {
-                "timestamp": time.time(),
-                "entries": [{"Name": "gfile.txt", "IsDir": False}],
-            },
-        }
-        with open(tmp_cache_file, "w") as f:
-            json.dump(cache_data, f)
+        rc = make_cache(tmp_cache_dir)
+        rc._store("b2:", [{"Name": "b2file.txt", "IsDir": False}])
+        rc._store("gdrive:", [{"Name": "gfile.txt", "IsDir": False}])
 
         paths = rc.get_all_cached_paths("b2:")
         assert paths == ["b2file.txt"]
 
-    def test_old_format_cache_discarded(self, tmp_cache_file):
-        """Old-format cache entries (with 'data' instead of 'entries') are discarded."""
-        rc = self._make_cache(tmp_cache_file)
-        old_format = {
-            "b2:": {"timestamp": time.time(), "data": ["old.txt"]},
-        }
-        with open(tmp_cache_file, "w") as f:
-            json.dump(old_format, f)
+    def test_invalidate_nonexistent_key_no_error(self, tmp_cache_dir):
+        """Invalidating a key that doesn't exist should not raise."""
+        rc = make_cache(tmp_cache_dir)
+        rc.invalidate("b2:", "nonexistent/")  # should not raise
 
-        fresh = [{"Name": "new.txt", "IsDir": False}]
-        with patch.object(rc.rclone, "listdir", return_value=fresh) as mock_ld:
-            result = rc.listdir("b2:")
 
-        assert result == fresh
+class TestCachePolicy:
+    """Verify rclonecache applies its ttlpolicy."""
+
+    def _cache(self, tmp_cache_dir, policy):
+        with patch("rcli.rclone.shutil.which", return_value="/usr/bin/rclone"):
+            return rclonecache(cacheDir=str(tmp_cache_dir), policy=policy)
+
+    def test_path_rule_shortens_ttl(self, tmp_cache_dir):
+        policy = ttlpolicy(paths=[("b2:scratch/*", {"ttl": 60})])
+        rc = self._cache(tmp_cache_dir, policy)
+        rc._store("b2:scratch/", [{"Name": "a"}], timestamp=time.time() - 120)
+        rc._store("b2:docs/", [{"Name": "b"}], timestamp=time.time() - 120)
+
+        assert rc._lookup("b2:", "scratch/") is None
+        assert rc._lookup("b2:", "docs/") == [{"Name": "b"}]
+
+    def test_unchanged_listing_stays_fresh_longer(self, tmp_cache_dir):
+        rc = self._cache(tmp_cache_dir, ttlpolicy(ttl=60, adaptive=True))
+        rc._store("b2:", [{"Name": "a"}], timestamp=time.time() - 600)
+        rc._store("b2:", [{"Name": "a"}], timestamp=time.time() - 90)
+        # ttl doubled to 120s after one unchanged refresh
+        assert rc._lookup("b2:", "") == [{"Name": "a"}]
+
+        rc._store("b2:", [{"Name": "changed"}], timestamp=time.time() - 90)
+        assert rc._lookup("b2:", "") is None
+
+    def test_unchanged_count_survives_reopen(self, tmp_cache_dir):
+        policy = ttlpolicy(ttl=60, adaptive=True)
+        rc = self._cache(tmp_cache_dir, policy)
+        for _ in range(4):
+            rc._store("b2:", [{"Name": "a"}], timestamp=time.time() - 400)
+        rc.close()
+
+        # Listed, then three unchanged refreshes: 60s * 2**3 = 480s
+        assert self._cache(tmp_cache_dir, policy)._lookup("b2:", "") == [{"Name": "a"}]
+
+    def test_upgrades_version_one_database(self, tmp_cache_dir):
+        conn = sqlite3.connect(str(tmp_cache_dir / "cache.db"))
+        conn.executescript(rclonecache.MIGRATIONS[0])
+        conn.execute("PRAGMA user_version = 1")
+        conn.execute("INSERT INTO dirs (key, timestamp) VALUES ('b2:', ?)", (time.time(),))
+        conn.commit()
+        conn.close()
+
+        rc = make_cache(tmp_cache_dir)
+        assert rc._lookup("b2:", "") == []
+        rc._store("b2:", [{"Name": "a"}])
+        assert rc._unchanged["b2:"] == 0
+
+
+class TestCancelledListing:
+    def test_cancelled_listing_is_not_cached(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        cancel = threading.Event()
+
+        def listdir(remote, path, cancel=None):
+            cancel.set()
+            return []
+
+        with patch.object(rc.rclone, "listdir", side_effect=listdir):
+            assert rc.listdir("b2:", "docs/", cancel=cancel) is None
+        assert "b2:docs/" not in rc.memory
+        assert rc._lookup("b2:", "docs/") is None
+
+    def test_cancel_stops_waiting_for_listing_in_flight(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        rc._inflight["b2:docs/"] = threading.Event()
+        cancel = threading.Event()
+        threading.Timer(0.05, cancel.set).start()
+        with patch.object(rc.rclone, "listdir") as mock_ld:
+            assert rc.listdir("b2:", "docs/", cancel=cancel) is None
+        mock_ld.assert_not_called()
+
+
+class TestMemoryLayer:
+    """Verify parsed listings are served from the in-memory LRU."""
+
+    def test_repeat_listdir_skips_database(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        entries = [{"Name": "a.txt", "IsDir": False}]
+        with patch.object(rc.rclone, "listdir", return_value=entries):
+            rc.listdir("b2:")
+
+        with patch.object(rc, "_db", side_effect=AssertionError("hit disk")):
+            assert rc.listdir("b2:") == entries
+        assert rc.memory.stats()["hits"] == 1
+
+    def test_disk_hit_populates_memory(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        rc._store("b2:docs/", [{"Name": "x"}])
+        rc.memory.clear()
+
+        assert rc.listdir("b2:", "docs/") == [{"Name": "x"}]
+        assert "b2:docs/" in rc.memory
+
+    def test_invalidate_drops_memory_copy(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        rc._store("b2:", [{"Name": "x"}])
+        rc.invalidate("b2:")
+        assert "b2:" not in rc.memory
+
+    def test_long_ttl_listing_stays_in_memory(self, tmp_cache_dir):
+        policy = ttlpolicy(ttl=30 * 24 * 60 * 60)
+        with patch("rcli.rclone.shutil.which", return_value="/usr/bin/rclone"):
+            rc = rclonecache(cacheDir=str(tmp_cache_dir), policy=policy)
+        rc._store("b2:", [{"Name": "a"}], timestamp=time.time() - 2 * rc.STALE_MAX_AGE)
+
+        with patch.object(rc, "_db", side_effect=AssertionError("hit disk")):
+            for _ in range(3):
+                assert rc.listdir("b2:") == [{"Name": "a"}]
+        stats = rc.memory.stats()
+        assert (stats["hits"], stats["misses"], stats["evictions"]) == (3, 0, 0)
+
+    def test_memory_budget_configurable(self, tmp_cache_dir):
+        with patch("rcli.rclone.shutil.which", return_value="/usr/bin/rclone"):
+            rc = rclonecache(cacheDir=str(tmp_cache_dir), memory_budget=1234)
+        assert rc.memory.max_bytes == 1234
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestPrefetch:
+    """Verify background prefetching into rclonecache."""
+
+    def test_prefetch_fills_cache(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        with patch.object(rc.rclone, "listdir", side_effect=lambda remote, path, cancel=None: [{"Name": path}]):
+            rc.prefetch("b2:", ["a/", "b/"])
+            assert wait_until(lambda: "b2:a/" in rc.memory and "b2:b/" in rc.memory)
+
+        with patch.object(rc.rclone, "listdir") as mock_ld:
+            assert rc.listdir("b2:", "b/") == [{"Name": "b/"}]
+        mock_ld.assert_not_called()
+
+    def test_prefetch_skips_cached_directories(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        rc._store("b2:a/", [{"Name": "x"}])
+        with patch.object(rc.rclone, "listdir", return_value=[]) as mock_ld:
+            rc.prefetch("b2:", ["a/", "b/"])
+            assert wait_until(lambda: "b2:b/" in rc.memory)
+        mock_ld.assert_called_once_with("b2:", "b/", cancel=None)
+
+    def test_failed_prefetch_caches_nothing(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        # rclone prints nothing when lsjson fails
+        with patch.object(rc.rclone, "rclone", return_value="") as mock_run:
+            rc.prefetch("b2:", ["x/"])
+            assert wait_until(lambda: mock_run.called and not rc._inflight)
+        assert "b2:x/" not in rc.memory
+
+        with patch.object(rc.rclone, "listdir", return_value=[{"Name": "a.txt"}]) as mock_ld:
+            assert rc.listdir("b2:", "x/") == [{"Name": "a.txt"}]
+        mock_ld.assert_called_once()
+
+    def test_listdir_waits_for_prefetch_in_flight(self, tmp_cache_dir):
+        rc = make_cache(tmp_cache_dir)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_listdir(remote, path, cancel=None):
+            started.set()
+            release.wait(2)
+            return [{"Name": "x"}]
+
+        with patch.object(rc.rclone, "listdir", side_effect=slow_listdir) as mock_ld:
+            rc.prefetch("b2:", ["a/"])
+            assert started.wait(2)
+            threading.Timer(0.05, release.set).start()
+            assert rc.listdir("b2:", "a/") == [{"Name": "x"}]
         assert mock_ld.call_count == 1
 
-    def test_invalidate_nonexistent_key_no_error(self, tmp_cache_file):
-        """Invalidating a key that doesn't exist should not raise."""
-        rc = self._make_cache(tmp_cache_file)
-        rc.invalidate("b2:", "nonexistent/")  # should not raise
+    def test_new_prefetch_replaces_queued_work(self, tmp_cache_dir, monkeypatch):
+        monkeypatch.setattr(rclonecache, "PREFETCH_WORKERS", 1)
+        rc = make_cache(tmp_cache_dir)
+        started, release = threading.Event(), threading.Event()
+        listed = []
+
+        def listdir(remote, path, cancel=None):
+            listed.append(path)
+            if path == "a/":
+                started.set()
+                release.wait(2)
+            return []
+
+        with patch.object(rc.rclone, "listdir", side_effect=listdir):
+            rc.prefetch("b2:", ["a/", "b/"])
+            assert started.wait(2)
+            rc.prefetch("b2:", ["c/"])
+            release.set()
+            assert wait_until(lambda: "b2:c/" in rc.memory)
+        assert listed == ["a/", "c/"]
+
+    def test_cancel_prefetch_drops_queued_work(self, tmp_cache_dir, monkeypatch):
+        monkeypatch.setattr(rclonecache, "PREFETCH_WORKERS", 1)
+        rc = make_cache(tmp_cache_dir)
+        started, release = threading.Event(), threading.Event()
+        listed = []
+
+        def listdir(remote, path, cancel=None):
+            listed.append(path)
+            started.set()
+            release.wait(2)
+            return []
+
+        with patch.object(rc.rclone, "listdir", side_effect=listdir):
+            rc.prefetch("b2:", ["a/", "b/"])
+            assert started.wait(2)
+            rc.cancel_prefetch()
+            release.set()
+            assert wait_until(lambda: "b2:a/" in rc.memory)
+            time.sleep(0.05)
+        assert listed == ["a/"]
+
+
+def fake_lsjson_process(stdout_text, returncode=0):
+    """A Popen stand-in whose stdout streams stdout_text line by line."""
+    process = MagicMock()
+    process.stdout = io.StringIO(stdout_text)
+    process.stderr = io.StringIO("")
+    process.returncode = returncode
+    process.poll.return_value = returncode
+    return process
+
+
+@pytest.fixture
+def serial_index(monkeypatch):
+    """List the whole remote with one `lsjson -R`, as a single fake process answers every call."""
+    monkeypatch.setattr(searchindex, "CONCURRENCY", 1)
+
+
+class TestIterLsjson:
+    def test_one_object_per_line(self, fake_lsjson_output):
+        text = "[\n" + ",\n".join(json.dumps(e) for e in fake_lsjson_output) + "\n]\n"
+        assert list(iter_lsjson(io.StringIO(text))) == fake_lsjson_output
+
+    def test_single_line_array(self, fake_lsjson_output):
+        text = json.dumps(fake_lsjson_output)
+        assert list(iter_lsjson(io.StringIO(text))) == fake_lsjson_output
+
+    def test_empty_listing(self):
+        assert list(iter_lsjson(io.StringIO("[\n]\n"))) == []
+
+    def test_malformed_line_raises(self):
+        with pytest.raises(ValueError):
+            list(iter_lsjson(io.StringIO("[\n{not json},\n]\n")))
+
+
+@pytest.mark.usefixtures("serial_index")
+class TestSearchIndexStreaming:
+    def _lsjson(self, entries):
+        return "[\n" + ",\n".join(json.dumps(e) for e in entries) + "\n]\n"
+
+    def test_builds_paths_from_stream(self):
+        entries = [
+            {"Path": "docs", "Name": "docs", "IsDir": True},
+            {"Path": "docs/a.txt", "Name": "a.txt", "IsDir": False},
+        ]
+        with patch("subprocess.Popen", return_value=fake_lsjson_process(self._lsjson(entries))):
+            index = searchindex("b2:")
+            index._build()
+
+        assert index.is_ready()
+        assert index.get_paths() == ["docs/", "docs/a.txt"]
+
+    def test_paths_visible_before_build_finishes(self):
+        index = searchindex("b2:")
+        seen = []
+
+        def lines():
+            yield "[\n"
+            yield json.dumps({"Path": "first.txt", "IsDir": False}) + ",\n"
+            seen.append((index.is_ready(), index.get_paths()))
+            yield json.dumps({"Path": "second.txt", "IsDir": False}) + "\n"
+            yield "]\n"
+
+        process = fake_lsjson_process("")
+        process.stdout = lines()
+        with patch("subprocess.Popen", return_value=process):
+            index._build()
+
+        assert seen == [(False, ["first.txt"])]
+        assert index.get_paths() == ["first.txt", "second.txt"]
+
+    def test_malformed_output_fails(self):
+        with patch("subprocess.Popen", return_value=fake_lsjson_process("[\n{oops\n")):
+            index = searchindex("b2:")
+            index._build()
+        assert index.has_failed()
+        assert not index.is_ready()
+
+    def test_no_output_fails(self):
+        with patch("subprocess.Popen", return_value=fake_lsjson_process("", returncode=1)):
+            index = searchindex("b2:")
+            index._build()
+        assert index.has_failed()
+
+    def test_listing_cut_short_fails(self):
+        # Entries arrive, then the connection drops before the closing "]"
+        text = "[\n" + json.dumps({"Path": "a.txt", "IsDir": False}) + ",\n"
+        with patch("subprocess.Popen", return_value=fake_lsjson_process(text, returncode=3)):
+            index = searchindex("b2:")
+            index._build()
+        assert index.has_failed()
+        assert not index.is_ready()
+        assert index._full_at is None
+
+    def test_empty_remote_is_ready(self):
+        with patch("subprocess.Popen", return_value=fake_lsjson_process("[\n]\n")):
+            index = searchindex("b2:")
+            index._build()
+        assert index.is_ready()
+        assert index.get_paths() == []
+
+    def test_cap_stops_listing(self):
+        entries = [{"Path": f"f{i}", "IsDir": False} for i in range(10)]
+        process = fake_lsjson_process(self._lsjson(entries))
+        with patch("subprocess.Popen", return_value=process):
+            index = searchindex("b2:")
+            index.MAX_PATHS = 3
+            index._build()
+        assert index.is_ready()
+        assert index.count() == 3
+        process.kill.assert_called()
+
+
+@pytest.mark.usefixtures("serial_index")
+class TestSearchIndexStats:
+    def _lsjson(self, entries):
+        return "[\n" + ",\n".join(json.dumps(e) for e in entries) + "\n]\n"
+
+    ENTRIES = [
+        {"Path": "docs", "Name": "docs", "IsDir": True},
+        {"Path": "docs/a.txt", "Name": "a.txt", "IsDir": False},
+        {"Path": "docs/b.txt", "Name": "b.txt", "IsDir": False},
+    ]
+
+    def test_counts_listed_paths_and_bytes(self):
+        output = self._lsjson(self.ENTRIES)
+        with patch("subprocess.Popen", return_value=fake_lsjson_process(output)):
+            index = searchindex("b2:")
+            index._build()
+
+        stats = index.stats()
+        assert stats["paths"] == 3
+        assert stats["files"] == 2
+        assert stats["bytes"] == len(output.encode())
+        assert stats["elapsed"] >= 0
+        assert stats["objects"] is None
+        assert stats["eta"] is None
+
+    def test_counts_bytes_not_characters(self):
+        entries = [{"Path": "fotos/año.jpg", "Name": "año.jpg", "IsDir": False}]
+        output = "[\n" + ",\n".join(json.dumps(e, ensure_ascii=False) for e in entries) + "\n]\n"
+        with patch("subprocess.Popen", return_value=fake_lsjson_process(output)):
+            index = searchindex("b2:")
+            index._build()
+
+        assert index.stats()["bytes"] == len(output.encode()) > len(output)
+
+    def test_estimates_from_backend_object_count(self):
+        backend = MagicMock()
+        backend.about.return_value = {"total": 100, "objects": 10}
+        with patch("subprocess.Popen", return_value=fake_lsjson_process(self._lsjson(self.ENTRIES))):
+            index = searchindex("b2:", backend=backend)
+            index._build()
+
+        deadline = time.time() + 2
+        while index.stats()["objects"] is None and time.time() < deadline:
+            time.sleep(0.01)
+        stats = index.stats()
+        backend.about.assert_called_once_with("b2:")
+        assert stats["objects"] == 10
+        assert stats["eta"] is not None and stats["eta"] >= 0
+
+    def test_no_estimate_when_backend_has_no_count(self):
+        backend = MagicMock()
+        backend.about.return_value = None
+        with patch("subprocess.Popen", return_value=fake_lsjson_process(self._lsjson(self.ENTRIES))):
+            index = searchindex("b2:", backend=backend)
+            index._build()
+
+        assert index.stats()["objects"] is None
+        assert index.stats()["eta"] is None
+
+
+@pytest.mark.usefixtures("serial_index")
+class TestSearchIndexPersistence:
+    def _lsjson(self, paths):
+        return "[\n" + ",\n".join(json.dumps({"Path": p, "IsDir": False}) for p in paths) + "\n]\n"
+
+    def _build(self, cache_dir, paths):
+        with patch("subprocess.Popen", return_value=fake_lsjson_process(self._lsjson(paths))):
+            index = searchindex("b2:", cacheDir=str(cache_dir))
+            index._run()
+        return index
+
+    def test_no_cache_dir_saves_nothing(self, tmp_path):
+        with patch("subprocess.Popen", return_value=fake_lsjson_process(self._lsjson(["a.txt"]))):
+            index = searchindex("b2:")
+            index._run()
+        assert index.indexPath is None
+        assert index.is_ready()
+
+    def test_finished_index_saved_and_loaded(self, tmp_path):
+        before = time.time()
+        self._build(tmp_path, ["a.txt", "b/c.txt"])
+        assert os.listdir(tmp_path / "index") == ["b2%3A.idx"]
+
+        index = searchindex("b2:", cacheDir=str(tmp_path))
+        index._load()
+        assert index.is_ready()
+        assert index.get_paths() == ["a.txt", "b/c.txt"]
+        assert index.built_at() >= before
+
+    def test_refresh_swaps_in_new_paths(self, tmp_path):
+        self._build(tmp_path, ["old.txt"])
+        index = searchindex("b2:", cacheDir=str(tmp_path))
+        index.FULL_REFRESH_INTERVAL = 0
+        index._load()
+        loaded_version = index.version()
+
+        seen = []
+
+        def lines():
+            yield "[\n"
+            yield json.dumps({"Path": "new.txt", "IsDir": False}) + "\n"
+            seen.append((index.is_refreshing(), index.get_paths()))
+            yield "]\n"
+
+        process = fake_lsjson_process("")
+        process.stdout = lines()
+        with patch("subprocess.Popen", return_value=process):
+            index._run()
+
+        # The saved paths stay searchable until the new listing completes
+        assert seen == [(True, ["old.txt"])]
+        assert index.get_paths() == ["new.txt"]
+        assert index.get_index().covers(index.get_paths())
+        assert index.version() == loaded_version + 1
+        assert not index.is_refreshing()
+
+        reloaded = searchindex("b2:", cacheDir=str(tmp_path))
+        reloaded._load()
+        assert reloaded.get_paths() == ["new.txt"]
+
+    def test_failed_refresh_keeps_saved_index(self, tmp_path):
+        self._build(tmp_path, ["old.txt"])
+        index = searchindex("b2:", cacheDir=str(tmp_path))
+        index._load()
+        with patch("subprocess.Popen", return_value=fake_lsjson_process("[\n{oops\n")):
+            index._run()
+        assert index.is_ready()
+        assert not index.has_failed()
+        assert not index.is_refreshing()
+        assert index.get_paths() == ["old.txt"]
+
+    def test_loaded_paths_get_trigram_index(self, tmp_path):
+        self._build(tmp_path, [f"file{i}.txt" for i in range(10)])
+        index = searchindex("b2:", cacheDir=str(tmp_path))
+        index._load()
+        assert len(index.get_index()) == 0
+        index.LOAD_BATCH = 3
+        with patch("subprocess.Popen", return_value=fake_lsjson_process("", returncode=1)):
+            index._run()
+        assert len(index.get_index()) == 10
+
+    def test_corrupt_file_ignored(self, tmp_path):
+        (tmp_path / "index").mkdir()
+        (tmp_path / "index" / "b2%3A.idx").write_bytes(b"garbage")
+        index = searchindex("b2:", cacheDir=str(tmp_path))
+        index._load()
+        assert not index.is_ready()
+
+    def test_remotes_kept_apart(self, tmp_path):
+        self._build(tmp_path, ["a.txt"])
+        other = searchindex("gdrive:", cacheDir=str(tmp_path))
+        other._load()
+        assert not other.is_ready()
+
+
+@pytest.mark.usefixtures("serial_index")
+class TestSearchIndexDelta:
+    def _lsjson(self, paths):
+        return "[\n" + ",\n".join(json.dumps({"Path": p, "IsDir": False}) for p in paths) + "\n]\n"
+
+    def _run(self, index, paths):
+        with patch("subprocess.Popen", return_value=fake_lsjson_process(self._lsjson(paths))) as popen:
+            index._run()
+        return popen.call_args[0][0]
+
+    def _saved(self, tmp_path, paths):
+        first = searchindex("b2:", cacheDir=str(tmp_path))
+        self._run(first, paths)
+        index = searchindex("b2:", cacheDir=str(tmp_path))
+        index._load()
+        return index
+
+    def test_first_build_lists_everything(self, tmp_path):
+        index = searchindex("b2:", cacheDir=str(tmp_path))
+        args = self._run(index, ["a.txt"])
+        assert "--max-age" not in args
+
+    def test_recent_index_lists_only_changes(self, tmp_path):
+        index = self._saved(tmp_path, ["a.txt", "b.txt"])
+        built_at = index.built_at()
+        with patch("rcli.rclone.time.time", return_value=built_at + 3600):
+            args = self._run(index, ["b.txt", "c.txt"])
+        age = args[args.index("--max-age") + 1]
+        assert age == f"{3600 + index.DELTA_SLACK}s"
+        assert index.get_paths() == ["a.txt", "b.txt", "c.txt"]
+        assert index.get_index().covers(index.get_paths())
+
+    def test_delta_indexes_new_paths(self, tmp_path):
+        index = self._saved(tmp_path, [f"old{i}.txt" for i in range(20)])
+        self._run(index, ["fresh/report.pdf"])
+        matcher = fuzzymatcher(index.get_index())
+        paths = index.get_paths()
+        assert [paths[i] for i in matcher.search("report", paths, 1)] == ["fresh/report.pdf"]
+
+    def test_delta_without_changes_keeps_paths(self, tmp_path):
+        index = self._saved(tmp_path, ["a.txt"])
+        loaded = index.get_paths()
+        self._run(index, ["a.txt"])
+        assert index.get_paths() == loaded
+        assert not index.is_refreshing()
+
+    def test_delta_is_saved(self, tmp_path):
+        index = self._saved(tmp_path, ["a.txt"])
+        full_at = index._full_at
+        self._run(index, ["b.txt"])
+        reloaded = searchindex("b2:", cacheDir=str(tmp_path))
+        reloaded._load()
+        assert reloaded.get_paths() == ["a.txt", "b.txt"]
+        assert reloaded._full_at == full_at
+        assert reloaded.built_at() > full_at
+
+    def test_old_index_gets_full_listing(self, tmp_path):
+        index = self._saved(tmp_path, ["a.txt", "deleted.txt"])
+        with patch("rcli.rclone.time.time", return_value=index._full_at + index.FULL_REFRESH_INTERVAL + 1):
+            args = self._run(index, ["a.txt"])
+        assert "--max-age" not in args
+        # The full pass drops paths that no longer exist
+        assert index.get_paths() == ["a.txt"]
+        assert index._full_at == index.built_at()
+
+
+def fake_rclone_tree(paths, failures=None):
+    """Popen stand-in answering `rclone lsjson [-R] <target>` from a flat list of paths.
+
+    Directories end with "/". failures maps a target to how many times its
+    listing should break off with malformed output before succeeding.
+    """
+    failures = dict(failures or {})
+    calls = []
+
+    def popen(args, **kwargs):
+        calls.append(list(args))
+        recursive = "-R" in args
+        target = [a for a in args[2:] if a != "-R"][0]
+        prefix = target.split(":", 1)[1]
+        if prefix and not prefix.endswith("/"):
+            prefix += "/"
+        entries = []
+        for path in paths:
+            if not path.startswith(prefix) or path == prefix:
+                continue
+            rel = path[len(prefix):]
+            if not recursive and "/" in rel.rstrip("/"):
+                continue
+            entries.append({"Path": rel.rstrip("/"), "IsDir": rel.endswith("/")})
+        if failures.get(target, 0) > 0:
+            # Part of the listing, then garbage
+            failures[target] -= 1
+            return fake_lsjson_process("[\n" + json.dumps(entries[0]) + ",\n{oops\n")
+        return fake_lsjson_process("[\n" + ",\n".join(json.dumps(e) for e in entries) + "\n]\n")
+
+    popen.calls = calls
+    return popen
+
+
+class TestSearchIndexSharded:
+    TREE = [
+        "top.txt",
+        "docs/", "docs/a.txt", "docs/sub/", "docs/sub/b.txt",
+        "photos/", "photos/2024/", "photos/2024/beach.jpg",
+        "music/", "music/song.mp3",
+    ]
+
+    def _build(self, popen, **kwargs):
+        index = searchindex("b2:", concurrency=3, **kwargs)
+        index.SHARD_RETRIES = 1
+        with patch("subprocess.Popen", side_effect=popen):
+            index._run()
+        return index
+
+    def test_lists_each_top_level_directory(self):
+        popen = fake_rclone_tree(self.TREE)
+        index = self._build(popen)
+        assert index.is_ready()
+        assert sorted(index.get_paths()) == sorted(self.TREE)
+        assert popen.calls[0] == ["rclone", "lsjson", "b2:"]
+        assert sorted(popen.calls[1:]) == [
+            ["rclone", "lsjson", "-R", "b2:docs/"],
+            ["rclone", "lsjson", "-R", "b2:music/"],
+            ["rclone", "lsjson", "-R", "b2:photos/"],
+        ]
+        assert sorted(index.shards()) == [
+            ("docs/", "done", 3), ("music/", "done", 1), ("photos/", "done", 2),
+        ]
+
+    def test_subpath_remote_joined_with_slash(self):
+        popen = fake_rclone_tree(["bucket/" + p for p in self.TREE])
+        index = searchindex("b2:bucket", concurrency=2)
+        with patch("subprocess.Popen", side_effect=popen):
+            index._run()
+        assert ["rclone", "lsjson", "-R", "b2:bucket/docs/"] in popen.calls
+
+    def test_concurrency_is_bounded(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+        tree = [f"d{i}/" for i in range(8)] + [f"d{i}/f.txt" for i in range(8)]
+        inner = fake_rclone_tree(tree)
+
+        def popen(args, **kwargs):
+            process = inner(args, **kwargs)
+            text = process.stdout.read()
+
+            def lines():
+                with lock:
+                    active.append(1)
+                    peak.append(len(active))
+                time.sleep(0.02)
+                yield from io.StringIO(text)
+                with lock:
+                    active.pop()
+
+            process.stdout = lines()
+            return process
+
+        index = self._build(popen)
+        assert index.count() == 16
+        assert max(peak) <= 3
+
+    def test_failed_shard_retried_without_duplicates(self):
+        popen = fake_rclone_tree(self.TREE, failures={"b2:photos/": 1})
+        index = self._build(popen)
+        assert sorted(index.get_paths()) == sorted(self.TREE)
+        assert popen.calls.count(["rclone", "lsjson", "-R", "b2:photos/"]) == 2
+        assert ("photos/", "done", 2) in index.shards()
+
+    def test_shard_that_keeps_failing_keeps_the_rest(self, tmp_path):
+        popen = fake_rclone_tree(self.TREE, failures={"b2:photos/": 5})
+        index = self._build(popen, cacheDir=str(tmp_path))
+        assert index.is_ready()
+        assert not index.has_failed()
+        paths = set(index.get_paths())
+        assert "docs/sub/b.txt" in paths and "music/song.mp3" in paths
+        assert "photos/2024/beach.jpg" not in paths
+        assert ("photos/", "failed", 1) in index.shards()
+        # Not a complete listing, so the next session lists everything again
+        assert index._full_at is None
+
+    def test_top_level_failure_fails_build(self):
+        popen = fake_rclone_tree(self.TREE, failures={"b2:": 1})
+        index = self._build(popen)
+        assert index.has_failed()
+
+    def test_cap_applies_across_shards(self):
+        popen = fake_rclone_tree(self.TREE)
+        index = searchindex("b2:", concurrency=3)
+        index.MAX_PATHS = 5
+        with patch("subprocess.Popen", side_effect=popen):
+            index._run()
+        assert index.is_ready()
+        assert index.count() == 5
+
+    def test_stop_cancels_pending_shards(self):
+        popen = fake_rclone_tree(self.TREE)
+        index = searchindex("b2:", concurrency=3)
+        index.stop()
+        with patch("subprocess.Popen", side_effect=popen):
+            index._run()
+        assert not index.is_ready()
+
+
+class TestSearchIndexSeedsCache:
+    TREE = TestSearchIndexSharded.TREE
+
+    def _build(self, cache, popen, concurrency=3, since=None):
+        index = searchindex("b2:", concurrency=concurrency, cache=cache)
+        with patch("subprocess.Popen", side_effect=popen):
+            index._build(since)
+        return index
+
+    def _names(self, cache, path):
+        return [e["Name"] for e in cache.listdir("b2:", path)]
+
+    @pytest.mark.parametrize("concurrency", [1, 3])
+    def test_every_directory_cached_after_full_build(self, tmp_cache_dir, concurrency):
+        cache = make_cache(tmp_cache_dir)
+        cache.rclone = MagicMock()
+        self._build(cache, fake_rclone_tree(self.TREE), concurrency)
+
+        assert sorted(self._names(cache, "")) == ["docs", "music", "photos", "top.txt"]
+        assert sorted(self._names(cache, "docs/")) == ["a.txt", "sub"]
+        assert self._names(cache, "docs/sub/") == ["b.txt"]
+        assert self._names(cache, "photos/2024/") == ["beach.jpg"]
+        cache.rclone.listdir.assert_not_called()
+
+    def test_seeded_entries_look_like_a_directory_listing(self, tmp_cache_dir):
+        cache = make_cache(tmp_cache_dir)
+        cache.rclone = MagicMock()
+        self._build(cache, fake_rclone_tree(self.TREE))
+        [sub] = [e for e in cache.listdir("b2:", "docs/") if e["Name"] == "sub"]
+        assert sub == {"Path": "sub", "Name": "sub", "IsDir": True}
+
+    def test_empty_directory_cached_as_empty(self, tmp_cache_dir):
+        cache = make_cache(tmp_cache_dir)
+        cache.rclone = MagicMock()
+        self._build(cache, fake_rclone_tree(self.TREE + ["empty/"]))
+        assert cache.listdir("b2:", "empty/") == []
+        cache.rclone.listdir.assert_not_called()
+
+    def test_replaces_stale_cached_listing(self, tmp_cache_dir):
+        cache = make_cache(tmp_cache_dir)
+        cache._store("b2:docs/", [{"Path": "gone.txt", "Name": "gone.txt"}])
+        cache.rclone = MagicMock()
+        self._build(cache, fake_rclone_tree(self.TREE))
+        assert sorted(self._names(cache, "docs/")) == ["a.txt", "sub"]
+
+    def test_upload_during_build_survives_commit(self, tmp_cache_dir):
+        cache = make_cache(tmp_cache_dir)
+        cache._store("b2:docs/", [{"Path": "a.txt", "Name": "a.txt"}])
+        seeder = cache.seeder("b2:")
+        seeder.add("docs/", {"Path": "docs", "Name": "docs", "IsDir": True})
+        seeder.add("docs/a.txt", {"Path": "docs/a.txt", "Name": "a.txt"})
+        seeder.add("music/x.mp3", {"Path": "music/x.mp3", "Name": "x.mp3"})
+        # Lands after the listing passed docs/, before it is committed
+        cache.update("b2:", "docs/", [{"Path": "new.txt", "Name": "new.txt"}])
+
+        assert seeder.commit() == 2
+        assert self._names(cache, "docs/") == ["a.txt", "new.txt"]
+        assert self._names(cache, "music/") == ["x.mp3"]
+        assert not cache._seeders
+
+    def test_directory_invalidated_during_build_not_seeded(self, tmp_cache_dir):
+        cache = make_cache(tmp_cache_dir)
+        seeder = cache.seeder("b2:")
+        seeder.add("docs/sub/b.txt", {"Path": "docs/sub/b.txt", "Name": "b.txt"})
+        seeder.add("music/x.mp3", {"Path": "music/x.mp3", "Name": "x.mp3"})
+        cache.invalidate("b2:", "docs/", recursive=True)
+        seeder.commit()
+
+        cache.rclone = MagicMock()
+        cache.rclone.listdir.return_value = [{"Name": "c.txt"}]
+        assert self._names(cache, "docs/sub/") == ["c.txt"]
+        assert self._names(cache, "music/") == ["x.mp3"]
+        cache.rclone.listdir.assert_called_once_with("b2:", "docs/sub/", cancel=None)
+
+    def test_unchanged_listing_counted_for_adaptive_ttl(self, tmp_cache_dir):
+        cache = make_cache(tmp_cache_dir)
+        self._build(cache, fake_rclone_tree(self.TREE))
+        self._build(cache, fake_rclone_tree(self.TREE))
+        assert cache._unchanged["b2:docs/"] == 1
+
+    def test_not_seeded_when_a_shard_fails(self, tmp_cache_dir):
+        cache = make_cache(tmp_cache_dir)
+        self._build(cache, fake_rclone_tree(self.TREE, failures={"b2:photos/": 5}))
+        assert cache._lookup("b2:", "docs/") is None
+        assert cache._lookup("b2:", "") is None
+
+    def test_not_seeded_when_listing_cut_short(self, tmp_cache_dir):
+        cache = make_cache(tmp_cache_dir)
+        cache._store("b2:d/", [{"Name": "keep"}])
+        text = "[\n" + json.dumps({"Path": "top.txt", "IsDir": False}) + ",\n"
+        index = self._build(cache, lambda args, **kwargs: fake_lsjson_process(text, returncode=3), concurrency=1)
+        assert index.has_failed()
+        assert cache._lookup("b2:", "d/") == [{"Name": "keep"}]
+
+    def test_not_seeded_when_capped(self, tmp_cache_dir):
+        cache = make_cache(tmp_cache_dir)
+        index = searchindex("b2:", concurrency=3, cache=cache)
+        index.MAX_PATHS = 5
+        with patch("subprocess.Popen", side_effect=fake_rclone_tree(self.TREE)):
+            index._build()
+        assert cache._lookup("b2:", "") is None
+
+    def test_not_seeded_by_delta_listing(self, tmp_cache_dir):
+        cache = make_cache(tmp_cache_dir)
+        self._build(cache, fake_rclone_tree(self.TREE), since=time.time() - 60)
+        assert cache._lookup("b2:", "docs/") is None
+
+    def test_staging_table_dropped(self, tmp_cache_dir):
+        cache = make_cache(tmp_cache_dir)
+        self._build(cache, fake_rclone_tree(self.TREE))
+        tables = cache._db().execute("SELECT name FROM sqlite_temp_master WHERE type = 'table'").fetchall()
+        assert tables == []
+
+
+def entry(name, is_dir=False):
+    return {"Path": name, "Name": name, "IsDir": is_dir}
+
+
+class TestSubtreeUpdates:
+    def _cache(self, tmp_cache_dir, listings):
+        cache = make_cache(tmp_cache_dir)
+        for path, entries in listings.items():
+            cache._store("b2:" + path, entries)
+        cache.rclone = MagicMock()
+        return cache
+
+    def test_recursive_invalidate_drops_subtree_only(self, tmp_cache_dir):
+        cache = self._cache(tmp_cache_dir, {
+            "": [entry("docs", True)], "docs/": [entry("sub", True)], "docs/sub/": [],
+            "docsextra/": [], "other/": [],
+        })
+        cache.invalidate("b2:", "docs/", recursive=True)
+        assert cache._lookup("b2:", "docs/") is None
+        assert cache._lookup("b2:", "docs/sub/") is None
+        assert cache._lookup("b2:", "docsextra/") == []
+        assert cache._lookup("b2:", "") is not None
+
+    def test_expire_keeps_listing_for_stale_reads(self, tmp_cache_dir):
+        cache = self._cache(tmp_cache_dir, {"docs/": [entry("a.txt")]})
+        cache.expire("b2:", "docs/")
+        assert cache._lookup("b2:", "docs/") is None
+        assert cache._lookup("b2:", "docs/", stale=True) == [entry("a.txt")]
+        assert cache.revalidate("b2:", "docs/") is not None
+
+    def test_update_merges_by_name(self, tmp_cache_dir):
+        cache = self._cache(tmp_cache_dir, {"docs/": [entry("a.txt"), entry("b.txt")]})
+        changed = dict(entry("a.txt"), Size=10)
+        cache.update("b2:", "docs/", [changed, entry("c.txt")])
+        assert cache.listdir("b2:", "docs/") == [changed, entry("b.txt"), entry("c.txt")]
+        cache.rclone.listdir.assert_not_called()
+
+    def test_update_skips_uncached_directory(self, tmp_cache_dir):
+        cache = self._cache(tmp_cache_dir, {})
+        cache.update("b2:", "docs/", [entry("a.txt")])
+        assert cache._lookup("b2:", "docs/") is None
+        cache.update("b2:", "docs/", [entry("a.txt")], new=True)
+        assert cache._lookup("b2:", "docs/") == [entry("a.txt")]
+
+    def test_uploaded_writes_through_subtree(self, tmp_cache_dir, tmp_path):
+        tmp_path = tmp_path / "upload"
+        (tmp_path / "new" / "deep").mkdir(parents=True)
+        (tmp_path / "new" / "deep" / "x.bin").write_bytes(b"12345")
+        (tmp_path / "top.txt").write_text("hi")
+        cache = self._cache(tmp_cache_dir, {
+            "": [entry("docs", True)], "docs/": [entry("old.txt")],
+        })
+        paths = cache.uploaded("b2:", "docs/", local_listing(str(tmp_path)))
+
+        assert sorted(paths) == ["docs/new/", "docs/new/deep/", "docs/new/deep/x.bin", "docs/top.txt"]
+        assert [e["Name"] for e in cache.listdir("b2:", "docs/")] == ["old.txt", "new", "top.txt"]
+        # new/ was not on the remote before, so its listings are known in full
+        assert [e["Name"] for e in cache.listdir("b2:", "docs/new/")] == ["deep"]
+        assert [(e["Name"], e["Size"]) for e in cache.listdir("b2:", "docs/new/deep/")] == [("x.bin", 5)]
+        cache.rclone.listdir.assert_not_called()
+        # The root's entry for docs/ may be out of date
+        assert cache._lookup("b2:", "") is None
+        assert cache._lookup("b2:", "", stale=True) == [entry("docs", True)]
+
+    def test_uploaded_into_uncached_directory_stays_uncached(self, tmp_cache_dir, tmp_path):
+        tmp_path = tmp_path / "upload"
+        (tmp_path / "sub").mkdir(parents=True)
+        (tmp_path / "sub" / "f.txt").write_text("x")
+        cache = self._cache(tmp_cache_dir, {})
+        cache.uploaded("b2:", "docs/", local_listing(str(tmp_path)))
+        assert cache._lookup("b2:", "docs/") is None
+        # Whether sub/ existed before is unknown, so its listing is not trusted
+        assert cache._lookup("b2:", "docs/sub/") is None
+
+    def test_failed_upload_invalidates_subtree(self, tmp_cache_dir):
+        cache = self._cache(tmp_cache_dir, {
+            "": [entry("docs", True)], "docs/": [entry("sub", True)], "docs/sub/": [],
+        })
+        assert cache.uploaded("b2:", "docs/", None) == []
+        assert cache._lookup("b2:", "docs/", stale=True) is None
+        assert cache._lookup("b2:", "docs/sub/", stale=True) is None
+        assert cache._lookup("b2:", "", stale=True) is not None
+
+
+class TestLocalListing:
+    def test_single_file(self, tmp_path):
+        f = tmp_path / "a.txt"
+        f.write_text("abc")
+        listing = local_listing(str(f))
+        assert list(listing) == [""]
+        [e] = listing[""]
+        assert (e["Name"], e["Path"], e["Size"], e["IsDir"]) == ("a.txt", "a.txt", 3, False)
+        assert e["ModTime"].endswith("Z")
+
+    def test_directory_contents_copied(self, tmp_path):
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "b.txt").write_text("b")
+        (tmp_path / "a.txt").write_text("a")
+        listing = local_listing(str(tmp_path))
+        assert [(e["Name"], e["IsDir"]) for e in listing[""]] == [("sub", True), ("a.txt", False)]
+        assert [e["Name"] for e in listing["sub/"]] == ["b.txt"]
+
+    def test_empty_directories_and_symlinks_left_out(self, tmp_path):
+        (tmp_path / "empty" / "inner").mkdir(parents=True)
+        (tmp_path / "a.txt").write_text("a")
+        os.symlink(tmp_path / "a.txt", tmp_path / "link.txt")
+        listing = local_listing(str(tmp_path))
+        assert list(listing) == [""]
+        assert [e["Name"] for e in listing[""]] == ["a.txt"]
+
+    def test_missing_path_raises(self, tmp_path):
+        with pytest.raises(OSError):
+            local_listing(str(tmp_path / "missing"))
+
+
+class TestSearchIndexAddPaths:
+    def test_adds_new_paths_to_ready_index(self, serial_index, tmp_path):
+        index = searchindex("b2:", cacheDir=str(tmp_path))
+        with patch("subprocess.Popen", return_value=fake_lsjson_process('[{"Path": "a.txt"}]')):
+            index._run()
+        version = index.version()
+        index.add_paths(["a.txt", "up/", "up/b.txt"])
+        assert list(index.get_paths()) == ["a.txt", "up/", "up/b.txt"]
+        assert index.version() != version
+        paths = index.get_paths()
+        assert index.get_index().search("b.txt", paths) == [2]
+        # Saved for the next session too
+        reloaded = searchindex("b2:", cacheDir=str(tmp_path))
+        reloaded._load()
+        assert list(reloaded.get_paths()) == ["a.txt", "up/", "up/b.txt"]
+
+    def test_paths_added_during_listing_merged_after(self, serial_index):
+        index = searchindex("b2:")
+
+        def popen(args, **kwargs):
+            index.add_paths(["up.txt"])
+            return fake_lsjson_process('[{"Path": "a.txt"}]')
+
+        with patch("subprocess.Popen", side_effect=popen):
+            index._run()
+        assert list(index.get_paths()) == ["a.txt", "up.txt"]
+
+    def test_already_indexed_paths_ignored(self, serial_index):
+        index = searchindex("b2:")
+        with patch("subprocess.Popen", return_value=fake_lsjson_process('[{"Path": "a.txt"}]')):
+            index._run()
+        version = index.version()
+        index.add_paths(["a.txt"])
+        assert list(index.get_paths()) == ["a.txt"]
+        assert index.version() == version
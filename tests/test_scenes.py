@@ -1,6 +1,10 @@
+import io
+import threading
 import pytest
-from unittest.mock import MagicMock, patch
-from rcli.scenes import choosefilescene, fuzzyscene, uploadscene, remotepickerscene
+from unittest.mock import ANY, MagicMock, call, patch
+from rcli.scenes import choosefilescene, fuzzyscene, uploadscene, remotepickerscene, transferscene
+from rcli.transfer import transfermanager, transferstats
+from rcli.config import transferprofiles
 from rcli.enums import CHOICE, SCENES
 
 
@@ -25,10 +29,11 @@ def make_cache(entries_by_path=None):
     cache = MagicMock()
     entries_by_path = entries_by_path or {}
 
-    def listdir_side_effect(remote, path=""):
+    def listdir_side_effect(remote, path="", cancel=None, stale=False):
         return entries_by_path.get(path, [])
 
     cache.listdir.side_effect = listdir_side_effect
+    cache.revalidate.return_value = None
     return cache
 
 
@@ -47,7 +52,7 @@ class TestChooseFileSceneLazyLoading:
         scene = choosefilescene("b2:", cache)
         scene.show(stdscr)
 
-        cache.listdir.assert_called_once_with("b2:", "")
+        cache.listdir.assert_called_once_with("b2:", "", cancel=ANY, stale=True)
 
     def test_enter_folder_calls_listdir_with_correct_path(self):
         cache = make_cache({
@@ -70,7 +75,7 @@ class TestChooseFileSceneLazyLoading:
         stdscr.getch.return_value = ord("q")
         scene.show(stdscr)
 
-        cache.listdir.assert_any_call("b2:", "documents/")
+        cache.listdir.assert_any_call("b2:", "documents/", cancel=ANY, stale=True)
 
     def test_go_back_shows_parent(self):
         cache = make_cache({
@@ -93,35 +98,74 @@ class TestChooseFileSceneLazyLoading:
         stdscr.getch.return_value = ord("q")
         scene.show(stdscr)
 
-        cache.listdir.assert_any_call("b2:", "")
+        cache.listdir.assert_any_call("b2:", "", cancel=ANY, stale=True)
+
+    def test_prefetches_subdirectories_nearest_cursor_first(self):
+        entries = [
+            {"Name": "a", "IsDir": True},
+            {"Name": "b.txt", "IsDir": False},
+            {"Name": "c", "IsDir": True},
+            {"Name": "d", "IsDir": True},
+        ]
+        cache = make_cache({"docs/": entries})
+        stdscr = make_stdscr()
+
+        scene = choosefilescene("b2:", cache, folderDir=["docs"])
+        stdscr.getch.return_value = ord("j")
+        scene.show(stdscr)
+        cache.prefetch.assert_called_once_with("b2:", ["docs/a/", "docs/c/", "docs/d/"])
+
+        scene.show(stdscr)
+        scene.show(stdscr)
+        cache.prefetch.assert_called_with("b2:", ["docs/c/", "docs/d/", "docs/a/"])
+
+    def test_unchanged_cursor_does_not_prefetch_again(self):
+        cache = make_cache({"": SAMPLE_ENTRIES})
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+
+        scene = choosefilescene("b2:", cache)
+        scene.show(stdscr)
+        scene.show(stdscr)
+
+        assert cache.prefetch.call_count == 1
+
+    def test_entering_folder_cancels_prefetch(self):
+        cache = make_cache({"": SAMPLE_ENTRIES})
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = 10
+
+        scene = choosefilescene("b2:", cache)
+        scene.show(stdscr)
+
+        cache.cancel_prefetch.assert_called_once()
 
     def test_download_assembles_correct_path_for_file(self):
         cache = make_cache({"documents/": SUB_ENTRIES})
+        transfers = make_transfers()
         stdscr = make_stdscr()
 
-        scene = choosefilescene("b2:", cache, folderDir=["documents"])
+        scene = choosefilescene("b2:", cache, folderDir=["documents"], transfers=transfers)
 
         # Press 'd' to download first entry (readme.md)
         stdscr.getch.return_value = ord("d")
         scene.show(stdscr)
 
-        assert scene.getNextScene() == SCENES.DOWNLOAD
-        data = scene.getdata()
-        assert data == ("documents/readme.md", False)
+        transfers.add.assert_called_once_with(
+            "b2:documents/readme.md", ".", title="Download b2:documents/readme.md", src_is_file=True
+        )
 
-    def test_download_assembles_correct_path_for_dir(self):
+    def test_download_without_transfers_does_nothing(self):
         cache = make_cache({"": SAMPLE_ENTRIES})
         stdscr = make_stdscr()
 
         scene = choosefilescene("b2:", cache)
 
-        # Press 'd' to download first entry (documents, a dir)
         stdscr.getch.return_value = ord("d")
         scene.show(stdscr)
 
-        assert scene.getNextScene() == SCENES.DOWNLOAD
-        data = scene.getdata()
-        assert data == ("documents", True)
+        assert scene.getNextScene() is None
+        assert scene.choiceForum.getdata() is None
 
     def test_upload_sets_next_scene(self):
         cache = make_cache({"": SAMPLE_ENTRIES})
@@ -155,7 +199,7 @@ class TestChooseFileSceneLazyLoading:
         scene = choosefilescene("b2:", cache, folderDir=["documents"])
         scene.show(stdscr)
 
-        cache.listdir.assert_called_once_with("b2:", "documents/")
+        cache.listdir.assert_called_once_with("b2:", "documents/", cancel=ANY, stale=True)
 
     def test_refresh_sets_next_scene(self):
         cache = make_cache({"": SAMPLE_ENTRIES})
@@ -208,6 +252,269 @@ class TestChooseFileSceneLazyLoading:
         assert scene._current_path() == "documents/sub/"
 
 
+class TestChooseFileSceneLoading:
+    def _slow_cache(self):
+        """A cache whose listing blocks until released or cancelled."""
+        cache = MagicMock()
+        release = threading.Event()
+        cancels = []
+
+        def listdir(remote, path="", cancel=None, stale=False):
+            cancels.append(cancel)
+            while not release.wait(0.01):
+                if cancel.is_set():
+                    return None
+            return SAMPLE_ENTRIES
+
+        cache.listdir.side_effect = listdir
+        cache.revalidate.return_value = None
+        return cache, release, cancels
+
+    def test_shows_loading_row_until_entries_arrive(self):
+        cache, release, _ = self._slow_cache()
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+
+        scene = choosefilescene("b2:", cache, folderDir=["docs"])
+        scene.show(stdscr)
+
+        assert scene.choiceForum is None
+        drawn = [str(c.args[2]) for c in stdscr.addstr.call_args_list]
+        assert any("Loading b2:docs/..." in text for text in drawn)
+
+        release.set()
+        scene._loading[0].join(2)
+        scene.show(stdscr)
+        assert scene.choiceForum is not None
+        assert scene.choiceForum.options == SAMPLE_ENTRIES
+
+    def test_escape_cancels_listing_and_goes_back(self):
+        cache, _, cancels = self._slow_cache()
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = 27
+
+        scene = choosefilescene("b2:", cache, folderDir=["docs", "sub"])
+        scene.show(stdscr)
+
+        assert cancels[0].is_set()
+        assert scene.folderDir == ["docs"]
+        assert scene._loading is None
+
+    def test_back_key_ignored_at_root(self):
+        cache, release, cancels = self._slow_cache()
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = ord("h")
+
+        scene = choosefilescene("b2:", cache)
+        scene.show(stdscr)
+
+        assert not cancels[0].is_set()
+        assert scene.getNextScene() is None
+        release.set()
+
+    def test_quit_while_loading_cancels(self):
+        cache, _, cancels = self._slow_cache()
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = ord("q")
+
+        scene = choosefilescene("b2:", cache)
+        scene.show(stdscr)
+
+        assert cancels[0].is_set()
+        assert scene.getNextScene() == SCENES.EXIT
+
+
+class TestChooseFileSceneRevalidation:
+    def test_stale_listing_marked_then_patched_in_place(self):
+        fresh = [SAMPLE_ENTRIES[1], {"Name": "new.txt", "IsDir": False}]
+        listings = [SAMPLE_ENTRIES, fresh]
+        cache = MagicMock()
+        cache.listdir.side_effect = lambda remote, path="", cancel=None, stale=False: listings.pop(0)
+        done = threading.Event()
+        cache.revalidate.return_value = done
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = ord("j")  # cursor onto photo.jpg
+
+        scene = choosefilescene("b2:", cache)
+        scene.show(stdscr)
+        forum = scene.choiceForum
+        assert forum.header.text == "  [cached, refreshing]"
+        stdscr.timeout.assert_any_call(200)
+
+        done.set()
+        stdscr.getch.return_value = -1
+        scene.show(stdscr)
+
+        assert scene.choiceForum is forum
+        assert forum.options == fresh
+        assert forum.header.text == ""
+        assert forum.choiceComponent.elements[forum.choiceComponent.elementIndex]["Name"] == "photo.jpg"
+
+    def test_fresh_listing_not_revalidated(self):
+        cache = make_cache({"": SAMPLE_ENTRIES})
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+
+        scene = choosefilescene("b2:", cache)
+        scene.show(stdscr)
+
+        assert scene.choiceForum.header.text == ""
+        assert cache.listdir.call_count == 1
+
+
+def make_transfers(active=0, counts=None, version=0):
+    """A mock transfermanager with active jobs unfinished."""
+    transfers = MagicMock()
+    transfers.version.return_value = version
+    transfers.active.return_value = active
+    transfers.counts.return_value = counts or {}
+    transfers.stats.return_value = transferstats(speed=1024)
+    transfers.jobs.return_value = []
+    return transfers
+
+
+class TestChooseFileSceneTransfers:
+    def test_download_dir_queued_and_browsing_continues(self):
+        cache = make_cache({"": SAMPLE_ENTRIES})
+        transfers = make_transfers()
+        stdscr = make_stdscr()
+        scene = choosefilescene("b2:", cache, transfers=transfers)
+
+        stdscr.getch.return_value = ord("d")
+        scene.show(stdscr)
+
+        transfers.add.assert_called_once_with(
+            "b2:documents", "documents", title="Download b2:documents", src_is_file=False
+        )
+        assert scene.getNextScene() is None
+        assert scene.choiceForum.getdata() is None
+
+        # Still browsing: the next pick is taken
+        stdscr.getch.return_value = ord("j")
+        scene.show(stdscr)
+        stdscr.getch.return_value = ord("d")
+        scene.show(stdscr)
+        transfers.add.assert_called_with(
+            "b2:photo.jpg", ".", title="Download b2:photo.jpg", src_is_file=True
+        )
+
+    def test_marked_files_downloaded_in_one_batch(self):
+        entries = [
+            {"Name": "sub", "Size": -1, "IsDir": True},
+            {"Name": "a.txt", "Size": 1, "IsDir": False},
+            {"Name": "b.txt", "Size": 2, "IsDir": False},
+            {"Name": "odd\nname", "Size": 3, "IsDir": False},
+            {"Name": "skipped.txt", "Size": 4, "IsDir": False},
+        ]
+        cache = make_cache({"docs/": entries})
+        transfers = make_transfers()
+        stdscr = make_stdscr()
+        scene = choosefilescene("b2:", cache, folderDir=["docs"], transfers=transfers)
+        for key in (" ", " ", " ", " ", "d"):
+            stdscr.getch.return_value = ord(key)
+            scene.show(stdscr)
+
+        assert transfers.add.call_args_list == [
+            call("b2:docs/sub", "docs/sub", title="Download b2:docs/sub", src_is_file=False),
+            call("b2:docs/odd\nname", ".", title="Download b2:docs/odd\nname", src_is_file=True),
+            call("b2:docs", ".", title="Download 2 files from b2:docs/", src_is_file=False,
+                 files=["a.txt", "b.txt"]),
+        ]
+        assert scene.choiceForum.choiceComponent.marked == set()
+        assert scene.getNextScene() is None
+
+    def test_single_marked_file_is_a_plain_download(self):
+        cache = make_cache({"": SAMPLE_ENTRIES})
+        transfers = make_transfers()
+        stdscr = make_stdscr()
+        scene = choosefilescene("b2:", cache, transfers=transfers)
+        for key in ("j", " ", "k", "d"):
+            stdscr.getch.return_value = ord(key)
+            scene.show(stdscr)
+        # The mark wins over the folder under the cursor
+        transfers.add.assert_called_once_with(
+            "b2:photo.jpg", ".", title="Download b2:photo.jpg", src_is_file=True
+        )
+
+    def test_summary_shown_while_transfers_run(self):
+        cache = make_cache({"": SAMPLE_ENTRIES})
+        transfers = make_transfers(active=3, counts={"running": 1, "queued": 2})
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+        scene = choosefilescene("b2:", cache, transfers=transfers)
+        scene.show(stdscr)
+
+        assert scene.choiceForum.header.text == "  [1 running, 2 queued · 1.0 KB/s]"
+        stdscr.timeout.assert_any_call(choosefilescene.TRANSFERS_POLL_MS)
+
+    def test_listing_reloaded_when_a_transfer_ends(self):
+        updated = SAMPLE_ENTRIES + [{"Name": "new.txt", "Size": 1, "IsDir": False}]
+        listings = {"": SAMPLE_ENTRIES}
+        cache = make_cache(listings)
+        transfers = make_transfers(active=1)
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+        scene = choosefilescene("b2:", cache, transfers=transfers)
+        scene.show(stdscr)
+        assert scene._revalidating is None
+
+        # The upload wrote itself through to the cache and the job ended
+        listings[""] = updated
+        transfers.version.return_value = 1
+        scene.show(stdscr)
+        assert scene._revalidating.wait(2)
+        cache.listdir.assert_any_call("b2:", "")
+        scene.show(stdscr)
+
+        assert scene.choiceForum.options == updated
+        assert scene._revalidating is None
+
+    def test_quit_asks_again_while_transfers_unfinished(self):
+        cache = make_cache({"": SAMPLE_ENTRIES})
+        transfers = make_transfers(active=2)
+        stdscr = make_stdscr()
+        scene = choosefilescene("b2:", cache, transfers=transfers)
+
+        stdscr.getch.return_value = ord("q")
+        scene.show(stdscr)
+        assert scene.getNextScene() is None
+        assert "2 transfers unfinished" in scene.choiceForum.header.text
+
+        # Any other key takes it back
+        stdscr.getch.return_value = ord("j")
+        scene.show(stdscr)
+        assert "unfinished" not in scene.choiceForum.header.text
+
+        stdscr.getch.return_value = ord("q")
+        scene.show(stdscr)
+        scene.show(stdscr)
+        assert scene.getNextScene() == SCENES.EXIT
+
+    def test_quit_at_once_when_transfers_done(self):
+        cache = make_cache({"": SAMPLE_ENTRIES})
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = ord("q")
+        scene = choosefilescene("b2:", cache, transfers=make_transfers())
+        scene.show(stdscr)
+        assert scene.getNextScene() == SCENES.EXIT
+
+    def test_t_opens_transfers(self):
+        cache = make_cache({"": SAMPLE_ENTRIES})
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = ord("t")
+        scene = choosefilescene("b2:", cache, transfers=make_transfers())
+        scene.show(stdscr)
+        assert scene.getNextScene() == SCENES.TRANSFERS
+
+    def test_t_ignored_without_transfers(self):
+        cache = make_cache({"": SAMPLE_ENTRIES})
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = ord("t")
+        scene = choosefilescene("b2:", cache)
+        scene.show(stdscr)
+        assert scene.getNextScene() is None
+
+
 class TestFuzzySceneLazyLoaded:
     def test_pulls_paths_from_cache(self):
         """fuzzyscene pulls paths from cache.get_all_cached_paths on first show."""
@@ -271,149 +578,223 @@ class TestFuzzySceneLazyLoaded:
 
 
 class TestUploadScene:
-    @patch("rcli.components.subprocess.Popen")
-    def test_upload_runs_correct_command(self, mock_popen):
-        """Upload scene constructs correct rclone copy command."""
+    def _upload(self, mock_popen, local_path, returncode=0, search_index=None, folderDir=("path",), remote="remote:"):
+        """Queue an upload of local_path into remote:path/ whose rclone exits with returncode."""
         mock_process = MagicMock()
-        mock_process.stdout.read.return_value = ""
+        mock_process.stderr = io.BytesIO()
+        mock_process.wait.return_value = returncode
         mock_popen.return_value = mock_process
 
         cache = MagicMock()
+        # As the real cache: nothing is written through without a listing
+        cache.uploaded.side_effect = lambda remote, path, listing: ["path/new.txt"] if listing is not None else []
         stdscr = make_stdscr()
-
-        scene = uploadscene("remote:", cache, folderDir=["path"])
-
-        # Input phase: type local path char by char
-        for char in "/local/file":
+        scene = uploadscene(remote, cache, transfermanager(), folderDir=list(folderDir), search_index=search_index)
+        for char in local_path:
             stdscr.getch.return_value = ord(char)
             scene.show(stdscr)
-
-        # Press Enter to start upload
         stdscr.getch.return_value = 10
         scene.show(stdscr)
+        return scene, cache
 
-        # Verify Popen was called with correct command
+    @patch("rcli.transfer.subprocess.Popen")
+    def test_upload_runs_correct_command(self, mock_popen):
+        """Upload scene constructs correct rclone copy command."""
+        scene, _ = self._upload(mock_popen, "/local/file")
+
+        assert scene.transfer.wait(2)
         mock_popen.assert_called_once()
         cmd = mock_popen.call_args[0][0]
-        assert cmd == ["rclone", "copy", "-P", "/local/file", "remote:path/"]
+        assert cmd[:4] == ["rclone", "copy", "/local/file", "remote:path/"]
+        assert "--use-json-log" in cmd
 
-    @patch("rcli.scenes.time.sleep")
-    @patch("rcli.components.subprocess.Popen")
-    def test_cache_invalidation_on_completion(self, mock_popen, mock_sleep):
-        """Cache is invalidated when upload completes."""
-        mock_process = MagicMock()
-        mock_process.stdout.read.return_value = ""
-        mock_popen.return_value = mock_process
+    @patch("rcli.transfer.subprocess.Popen")
+    def test_upload_queued_in_background(self, mock_popen, tmp_path):
+        """The upload is queued and the browser comes straight back."""
+        (tmp_path / "new.txt").write_text("hello")
+        index = MagicMock()
+        scene, cache = self._upload(mock_popen, str(tmp_path / "new.txt"), search_index=index)
 
-        cache = MagicMock()
-        stdscr = make_stdscr()
-
-        scene = uploadscene("remote:", cache, folderDir=["path"])
-
-        # Input phase: type path and press Enter
-        for char in "/local/file":
-            stdscr.getch.return_value = ord(char)
-            scene.show(stdscr)
-        stdscr.getch.return_value = 10
-        scene.show(stdscr)
-
-        # Simulate command completion
-        scene.commandforum.commandcomponent.isDone = True
-        scene.show(stdscr)
-
-        cache.invalidate.assert_called_once_with("remote:", "path/")
         assert scene.getNextScene() == SCENES.CHOOSE_FILE
+        assert scene.getdata() == "path/_"
+        assert scene.transfer.title == f"Upload {tmp_path / 'new.txt'} to remote:path/"
+
+        # Written through from the job's thread once it ends
+        assert scene.transfer.wait(2)
+        remote, path, listing = cache.uploaded.call_args[0]
+        assert (remote, path) == ("remote:", "path/")
+        assert [(e["Name"], e["Size"]) for e in listing[""]] == [("new.txt", 5)]
+        index.add_paths.assert_called_once_with(["path/new.txt"])
+        cache.invalidate.assert_not_called()
+
+    @patch("rcli.transfer.subprocess.Popen")
+    def test_failed_upload_invalidates(self, mock_popen, tmp_path):
+        """A failed upload leaves the cache to invalidate the destination."""
+        (tmp_path / "new.txt").write_text("hello")
+        index = MagicMock()
+        scene, cache = self._upload(mock_popen, str(tmp_path / "new.txt"), 1, index)
+        assert scene.transfer.wait(2)
+
+        cache.uploaded.assert_called_once_with("remote:", "path/", None)
+        index.add_paths.assert_not_called()
+
+    @patch("rcli.transfer.subprocess.Popen")
+    def test_unreadable_upload_invalidates(self, mock_popen, tmp_path):
+        """If the uploaded files cannot be read back, the destination is invalidated."""
+        scene, cache = self._upload(mock_popen, str(tmp_path / "missing"))
+        assert scene.transfer.wait(2)
+        cache.uploaded.assert_called_once_with("remote:", "path/", None)
 
     def test_escape_cancels_upload(self):
         """Pressing Escape during input cancels and returns to file chooser."""
-        cache = MagicMock()
+        transfers = MagicMock()
         stdscr = make_stdscr()
 
-        scene = uploadscene("remote:", cache)
+        scene = uploadscene("remote:", MagicMock(), transfers)
 
         stdscr.getch.return_value = 27  # Escape
         scene.show(stdscr)
 
         assert scene.getNextScene() == SCENES.CHOOSE_FILE
-        assert scene.commandforum is None
+        transfers.add.assert_not_called()
 
     def test_empty_path_does_not_start_upload(self):
         """Pressing Enter with empty path does not start upload."""
-        cache = MagicMock()
+        transfers = MagicMock()
         stdscr = make_stdscr()
 
-        scene = uploadscene("remote:", cache)
+        scene = uploadscene("remote:", MagicMock(), transfers)
 
         stdscr.getch.return_value = 10  # Enter with empty path
         scene.show(stdscr)
 
-        assert scene.commandforum is None
+        transfers.add.assert_not_called()
         assert scene.getNextScene() is None
 
-    @patch("rcli.scenes.time.sleep")
-    @patch("rcli.components.subprocess.Popen")
-    def test_getdata_returns_folderdir_path(self, mock_popen, mock_sleep):
+    @patch("rcli.transfer.subprocess.Popen")
+    def test_getdata_returns_folderdir_path(self, mock_popen):
         """getdata() returns folder path for navigation restoration."""
-        mock_process = MagicMock()
-        mock_process.stdout.read.return_value = ""
-        mock_popen.return_value = mock_process
+        scene, _ = self._upload(mock_popen, "/tmp/f", folderDir=("docs", "sub"))
+        assert scene.getdata() == "docs/sub/_"
 
-        cache = MagicMock()
+    @patch("rcli.transfer.subprocess.Popen")
+    def test_upload_at_root(self, mock_popen):
+        """Upload at root uses remote with no path suffix."""
+        scene, _ = self._upload(mock_popen, "/tmp/f", folderDir=(), remote="b2:")
+
+        assert scene.transfer.wait(2)
+        cmd = mock_popen.call_args[0][0]
+        assert cmd[:4] == ["rclone", "copy", "/tmp/f", "b2:"]
+
+    def test_backspace_removes_character(self):
+        """Backspace removes last character from local path."""
         stdscr = make_stdscr()
 
-        scene = uploadscene("remote:", cache, folderDir=["docs", "sub"])
+        scene = uploadscene("remote:", MagicMock(), MagicMock())
 
-        # Type path and start upload
-        for char in "/tmp/f":
+        # Type "abc"
+        for char in "abc":
             stdscr.getch.return_value = ord(char)
             scene.show(stdscr)
-        stdscr.getch.return_value = 10
-        scene.show(stdscr)
+        assert scene.local_path == "abc"
 
-        # Simulate completion
-        scene.commandforum.commandcomponent.isDone = True
+        # Backspace
+        stdscr.getch.return_value = 127
         scene.show(stdscr)
+        assert scene.local_path == "ab"
 
-        assert scene.getdata() == "docs/sub/_"
-
-    @patch("rcli.components.subprocess.Popen")
-    def test_upload_at_root(self, mock_popen):
-        """Upload at root uses remote with no path suffix."""
-        mock_process = MagicMock()
-        mock_process.stdout.read.return_value = ""
-        mock_popen.return_value = mock_process
 
-        cache = MagicMock()
+class TestTransferScene:
+    def _job(self, title, state):
+        job = MagicMock()
+        job.title = title
+        job.state.return_value = state
+        job.stats.return_value = transferstats()
+        job.errors.return_value = []
+        job.is_done.return_value = state not in ("running", "queued")
+        job.succeeded.return_value = state == "done"
+        return job
+
+    def _scene(self, jobs):
+        manager = make_transfers(active=len(jobs), counts={"running": 1})
+        manager.jobs.side_effect = lambda: list(jobs)
+        return transferscene(manager, ["docs"]), manager
+
+    def test_lists_jobs_under_summary(self):
+        jobs = [self._job("Download b2:a", "running"), self._job("Upload b", "queued")]
+        scene, _ = self._scene(jobs)
         stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+        scene.show(stdscr)
 
-        scene = uploadscene("b2:", cache)
+        drawn = [c.args[2] for c in stdscr.addstr.call_args_list if len(c.args) > 2]
+        assert "Transfers: 1 running · 1.0 KB/s" in drawn
+        assert any(text.endswith("Download b2:a") for text in drawn)
+        assert any(text.endswith("Upload b") for text in drawn)
+        stdscr.timeout.assert_any_call(transferscene.POLL_MS)
 
-        for char in "/tmp/f":
-            stdscr.getch.return_value = ord(char)
+    def test_cancel_move_and_clear(self):
+        jobs = [self._job("a", "running"), self._job("b", "queued")]
+        scene, manager = self._scene(jobs)
+        stdscr = make_stdscr()
+        for key in (ord("j"), ord("K"), ord("x"), ord("c")):
+            stdscr.getch.return_value = key
             scene.show(stdscr)
+        manager.move.assert_called_once_with(jobs[1], -1)
+        manager.cancel.assert_called_once_with(jobs[1])
+        manager.clear_finished.assert_called_once_with()
+        assert scene.getNextScene() is None
+
+    def test_details_of_a_job(self):
+        jobs = [self._job("Download b2:a", "running")]
+        scene, manager = self._scene(jobs)
+        stdscr = make_stdscr()
         stdscr.getch.return_value = 10
         scene.show(stdscr)
+        assert scene.detail.transfer is jobs[0]
 
-        cmd = mock_popen.call_args[0][0]
-        assert cmd == ["rclone", "copy", "-P", "/tmp/f", "b2:"]
+        stdscr.getch.return_value = ord("x")
+        scene.show(stdscr)
+        manager.cancel.assert_called_once_with(jobs[0])
+        assert scene.detail.bar.text == "[x] cancel   [esc] back"
 
-    def test_backspace_removes_character(self):
-        """Backspace removes last character from local path."""
-        cache = MagicMock()
+        stdscr.getch.return_value = 27
+        scene.show(stdscr)
+        assert scene.detail is None
+        assert scene.getNextScene() is None
+
+    def test_f_cycles_profile_for_new_transfers(self):
+        scene, manager = self._scene([])
+        profiles = transferprofiles()
+        manager.profile = profiles.get("default")
+        scene = transferscene(manager, profiles=profiles)
         stdscr = make_stdscr()
+        stdscr.getch.return_value = ord("f")
+        scene.show(stdscr)
+        assert manager.profile.name == "many-small-files"
 
-        scene = uploadscene("remote:", cache)
+        stdscr.getch.return_value = -1
+        scene.show(stdscr)
+        drawn = [c.args[2] for c in stdscr.addstr.call_args_list if len(c.args) > 2]
+        assert "New transfers: many-small-files (--transfers 16 --checkers 16 --fast-list)" in drawn
+        assert any("[f] profile" in text for text in drawn)
 
-        # Type "abc"
-        for char in "abc":
-            stdscr.getch.return_value = ord(char)
-            scene.show(stdscr)
-        assert scene.local_path == "abc"
+    def test_f_ignored_without_profiles(self):
+        scene, manager = self._scene([])
+        manager.profile = None
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = ord("f")
+        scene.show(stdscr)
+        assert manager.profile is None
 
-        # Backspace
-        stdscr.getch.return_value = 127
+    def test_back_restores_folder(self):
+        scene, _ = self._scene([])
+        stdscr = make_stdscr()
+        assert scene.getdata() is None
+        stdscr.getch.return_value = 27
         scene.show(stdscr)
-        assert scene.local_path == "ab"
+        assert scene.getNextScene() == SCENES.CHOOSE_FILE
+        assert scene.getdata() == "docs/_"
 
 
 class TestRemotePickerScene:
@@ -492,3 +873,148 @@ class TestRemotePickerScene:
 
         assert scene.getdata() == "gdrive:"
         assert scene.getNextScene() == SCENES.CHOOSE_FILE
+
+
+class TestFuzzySceneBuildingIndex:
+    def _make_index(self, paths, ready=False):
+        index = MagicMock()
+        index.is_ready.return_value = ready
+        index.has_failed.return_value = False
+        index.get_paths.return_value = paths
+        index.count.return_value = len(paths)
+        index.get_index.return_value = None
+        index.is_refreshing.return_value = False
+        index.version.return_value = 1 if ready else 0
+        index.shards.return_value = []
+        index.stats.return_value = {
+            "paths": len(paths), "files": len(paths), "bytes": 0, "objects": None,
+            "elapsed": 0.0, "rate": 0.0, "eta": None,
+        }
+        return index
+
+    def test_waits_until_first_paths(self):
+        index = self._make_index([])
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+
+        scene = fuzzyscene("b2:", MagicMock(), search_index=index)
+        scene.show(stdscr)
+
+        assert scene.fuzzyForum is None
+
+    def test_searches_partial_index(self):
+        index = self._make_index(["a.txt"])
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+
+        scene = fuzzyscene("b2:", MagicMock(), search_index=index)
+        scene.show(stdscr)
+
+        assert scene.fuzzyForum.fuzzycomponent.data == ["a.txt"]
+        assert "indexing" in scene.fuzzyForum.bar.text
+
+    def test_pulls_new_paths_while_building(self):
+        index = self._make_index(["a.txt"])
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+
+        scene = fuzzyscene("b2:", MagicMock(), search_index=index)
+        scene.show(stdscr)
+
+        index.get_paths.return_value = ["a.txt", "b.txt"]
+        index.is_ready.return_value = True
+        scene.show(stdscr)
+
+        assert scene.fuzzyForum.fuzzycomponent.data == ["a.txt", "b.txt"]
+        assert scene.fuzzyForum.bar.text == "[esc] back"
+
+    def test_shows_folder_progress(self):
+        index = self._make_index(["a/", "a/x.txt"])
+        index.shards.return_value = [("a/", "done", 1), ("b/", "listing", 0), ("c/", "pending", 0)]
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+
+        scene = fuzzyscene("b2:", MagicMock(), search_index=index)
+        scene.show(stdscr)
+
+        assert "1/3 folders" in scene.fuzzyForum.bar.text
+
+    def test_shows_build_stats_while_waiting(self):
+        index = self._make_index([])
+        index.stats.return_value = {
+            "paths": 12345, "files": 12000, "bytes": 3 * 1024 * 1024, "objects": 40000,
+            "elapsed": 10.0, "rate": 1234.5, "eta": 25.0,
+        }
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+
+        scene = fuzzyscene("b2:", MagicMock(), search_index=index)
+        scene.show(stdscr)
+
+        drawn = " ".join(str(c.args[2]) for c in stdscr.addstr.call_args_list)
+        assert "12,345 paths · 3.0 MB parsed · 1,234 paths/s · 0:10 elapsed" in drawn
+        assert "about 40,000 objects, ~0:25 left" in drawn
+
+    def test_shows_rate_and_eta_while_searching(self):
+        index = self._make_index(["a.txt"])
+        index.stats.return_value = {
+            "paths": 1, "files": 1, "bytes": 10, "objects": 100,
+            "elapsed": 1.0, "rate": 1.0, "eta": 99.0,
+        }
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+
+        scene = fuzzyscene("b2:", MagicMock(), search_index=index)
+        scene.show(stdscr)
+
+        assert scene.fuzzyForum.bar.text.endswith("1/s, ~1:39 left")
+
+    def test_processes_only_once_index_ready(self):
+        index = self._make_index(["a.txt"])
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+
+        scene = fuzzyscene("b2:", MagicMock(), search_index=index, processes=4)
+        scene.show(stdscr)
+        assert scene.fuzzyForum.fuzzycomponent.processes == 0
+
+        index.is_ready.return_value = True
+        scene._lastRefresh = 0
+        scene.show(stdscr)
+        assert scene.fuzzyForum.fuzzycomponent.processes == 4
+
+
+class TestFuzzySceneSavedIndex:
+    _make_index = TestFuzzySceneBuildingIndex._make_index
+
+    def test_saved_index_searched_while_refreshing(self):
+        index = self._make_index(["old.txt"], ready=True)
+        index.is_refreshing.return_value = True
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+
+        scene = fuzzyscene("b2:", MagicMock(), search_index=index)
+        scene.show(stdscr)
+
+        assert scene.fuzzyForum.fuzzycomponent.data == ["old.txt"]
+        assert "refreshing" in scene.fuzzyForum.bar.text
+
+    def test_refreshed_index_swapped_in(self):
+        index = self._make_index(["old.txt"], ready=True)
+        index.is_refreshing.return_value = True
+        stdscr = make_stdscr()
+        stdscr.getch.return_value = -1
+
+        scene = fuzzyscene("b2:", MagicMock(), search_index=index)
+        scene.show(stdscr)
+
+        new_index = MagicMock()
+        index.get_paths.return_value = ["new.txt"]
+        index.get_index.return_value = new_index
+        index.version.return_value = 2
+        index.is_refreshing.return_value = False
+        scene.show(stdscr)
+
+        assert scene.fuzzyForum.fuzzycomponent.data == ["new.txt"]
+        assert scene.fuzzyForum.fuzzycomponent.index is new_index
+        assert scene.fuzzyForum.bar.text == "[esc] back"
@@ -0,0 +1,444 @@
+import io
+import json
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from rcli.config import transferprofile
+from rcli.rclone import rclonercd
+from rcli.transfer import transfer, transfermanager, transferstats
+
+
+STATS = {
+    "bytes": 5242880,
+    "totalBytes": 10485760,
+    "speed": 1048576.5,
+    "eta": 5,
+    "transfers": 1,
+    "totalTransfers": 3,
+    "checks": 0,
+    "totalChecks": 0,
+    "errors": 1,
+    "lastError": "boom",
+    "elapsedTime": 5.0,
+    "transferring": [
+        {"name": "big.bin", "bytes": 1024, "size": 4096, "percentage": 25, "speed": 10.0,
+         "speedAvg": 12.0, "eta": 3, "group": "global_stats"},
+    ],
+}
+
+
+def log_line(**record):
+    return json.dumps(dict({"time": "2024-01-01T00:00:00Z", "source": "x.go:1"}, **record)) + "\n"
+
+
+def fake_process(lines, returncode=0):
+    process = MagicMock()
+    process.stderr = io.BytesIO("".join(lines).encode())
+    process.wait.return_value = returncode
+    process.poll.return_value = None
+    return process
+
+
+def run(process, **kwargs):
+    job = transfer("src:dir", "/tmp/dst", **kwargs)
+    with patch("rcli.transfer.subprocess.Popen", return_value=process) as popen:
+        job.start()
+        assert job.wait(2)
+    return job, popen
+
+
+class TestTransferStats:
+    def test_from_rclone(self):
+        stats = transferstats.fromrclone(STATS)
+        assert (stats.bytes, stats.total_bytes, stats.eta) == (5242880, 10485760, 5)
+        assert (stats.transfers, stats.total_transfers, stats.errors) == (1, 3, 1)
+        assert stats.last_error == "boom"
+        assert stats.fraction() == 0.5
+        assert stats.transferring == [
+            {"name": "big.bin", "bytes": 1024, "size": 4096, "percentage": 25, "speed": 12.0, "eta": 3}
+        ]
+
+    def test_missing_and_odd_fields(self):
+        stats = transferstats.fromrclone({"bytes": "lots", "eta": None, "transferring": [None, {}]})
+        assert stats.bytes == 0
+        assert stats.eta is None
+        assert stats.fraction() is None
+        assert stats.transferring[0]["name"] == ""
+
+
+class TestTransferProcess:
+    def test_command_logs_json_stats(self):
+        job, popen = run(fake_process([]))
+        args = popen.call_args[0][0]
+        assert args[:4] == ["rclone", "copy", "src:dir", "/tmp/dst"]
+        assert "--use-json-log" in args
+        assert args[args.index("--stats") + 1] == transfer.STATS_INTERVAL
+
+    def test_stats_and_errors_parsed(self):
+        lines = [
+            log_line(level="notice", msg="stats", stats=dict(STATS, bytes=1)),
+            log_line(level="error", msg="Failed to copy: denied", object="a.txt"),
+            log_line(level="notice", msg="stats", stats=STATS),
+            log_line(level="info", msg="a.txt: Copied (new)"),
+        ]
+        job, _ = run(fake_process(lines, returncode=1))
+        assert job.stats().bytes == 5242880
+        assert job.errors() == ["a.txt: Failed to copy: denied"]
+        assert job.is_done()
+        assert job.succeeded() is False
+
+    def test_success(self):
+        job, _ = run(fake_process([log_line(level="notice", msg="stats", stats=STATS)]))
+        assert job.succeeded() is True
+        assert job.returncode == 0
+
+    def test_plain_text_kept_as_error(self):
+        job, _ = run(fake_process(["panic: something\n", "\n"], returncode=2))
+        assert job.errors() == ["panic: something"]
+
+    def test_superseded_stats_not_parsed(self):
+        lines = [log_line(level="notice", msg="stats", stats=dict(STATS, bytes=i)) for i in range(3)]
+        lines.insert(1, log_line(level="error", msg="denied"))
+        job = transfer("a", "b")
+        with patch.object(transferstats, "fromrclone", wraps=transferstats.fromrclone) as parse:
+            job._read_log(io.BytesIO("".join(lines).encode()))
+        parse.assert_called_once()
+        assert job.stats().bytes == 2
+        assert job.errors() == ["denied"]
+
+    def test_lines_split_across_reads(self, monkeypatch):
+        monkeypatch.setattr(transfer, "READ_SIZE", 7)
+        text = log_line(level="error", msg="d\u00e9nied") + "panic: crash\r\n" + log_line(level="notice", stats=STATS)
+        job = transfer("a", "b")
+        job._read_log(io.BytesIO(text.encode().rstrip(b"\n")))
+        assert job.errors() == ["d\u00e9nied", "panic: crash"]
+        assert job.stats().bytes == STATS["bytes"]
+
+    def test_errors_capped(self, monkeypatch):
+        monkeypatch.setattr(transfer, "MAX_ERRORS", 2)
+        lines = [log_line(level="error", msg=f"e{i}") for i in range(5)]
+        job, _ = run(fake_process(lines, returncode=1))
+        assert job.errors() == ["e0", "e1"]
+
+    def test_missing_rclone(self):
+        job = transfer("a", "b")
+        with patch("rcli.transfer.subprocess.Popen", side_effect=FileNotFoundError("rclone")):
+            job.start()
+            assert job.wait(2)
+        assert job.succeeded() is False
+        assert job.errors()[0].startswith("Could not run rclone")
+
+    def test_cancel_terminates(self):
+        process = fake_process([])
+        job, _ = run(process)
+        job.cancel()
+        process.terminate.assert_called_once_with()
+        assert job.succeeded() is False
+
+    def test_running_has_no_result(self):
+        assert transfer("a", "b").succeeded() is None
+
+    def test_files_copied_from_raw_list(self):
+        listed = []
+
+        def popen(args, **kwargs):
+            path = args[args.index("--files-from-raw") + 1]
+            with open(path) as f:
+                listed.append((path, f.read()))
+            return fake_process([])
+
+        job = transfer("b2:docs", "/tmp/dst", files=["a.txt", "b c.txt"])
+        with patch("rcli.transfer.subprocess.Popen", side_effect=popen):
+            job.start()
+            assert job.wait(2)
+        [(path, text)] = listed
+        assert text == "a.txt\nb c.txt\n"
+        assert not os.path.exists(path)
+        assert job.succeeded() is True
+
+    def test_unwritable_files_list(self):
+        job = transfer("b2:docs", "/tmp/dst", files=["a.txt"])
+        with patch("rcli.transfer.tempfile.mkstemp", side_effect=OSError("read-only")), \
+             patch("rcli.transfer.subprocess.Popen") as popen:
+            job.start()
+            assert job.wait(2)
+        popen.assert_not_called()
+        assert job.succeeded() is False
+        assert job.errors() == ["Could not write the list of files: read-only"]
+
+    def test_profile_flags_passed(self):
+        profile = transferprofile("huge", transfers=2, buffer_size="64M")
+        job, popen = run(fake_process([]), profile=profile)
+        assert popen.call_args[0][0][-4:] == ["--transfers", "2", "--buffer-size", "64M"]
+
+    def test_states(self):
+        job = transfer("a", "b")
+        assert job.state() == "queued"
+        job, _ = run(fake_process([]))
+        assert job.state() == "done"
+        job, _ = run(fake_process([], returncode=1))
+        assert job.state() == "failed"
+
+    def test_cancelled_before_start_never_runs(self):
+        job = transfer("a", "b")
+        job.cancel()
+        with patch("rcli.transfer.subprocess.Popen") as popen:
+            job.start()
+        popen.assert_not_called()
+        assert job.is_done()
+        assert job.state() == "cancelled"
+        assert job.succeeded() is False
+
+    def test_on_done_runs_before_wait_returns(self):
+        seen = []
+        job, _ = run(fake_process([]), on_done=lambda job, ok: seen.append((job.is_done(), ok)))
+        assert seen == [(False, True)]
+
+    def test_failing_on_done_still_finishes(self):
+        def on_done(job, succeeded):
+            raise RuntimeError("boom")
+
+        job, _ = run(fake_process([]), on_done=on_done)
+        assert job.succeeded() is True
+
+
+class TestTransferJob:
+    def _backend(self, statuses, stats=STATS):
+        backend = MagicMock(spec=rclonercd)
+        calls = []
+        statuses = iter(statuses)
+
+        def call(method, params=None, **kwargs):
+            calls.append((method, params))
+            if method in ("sync/copy", "operations/copyfile"):
+                return {"jobid": 7}
+            if method == "job/status":
+                return next(statuses)
+            if method == "core/stats":
+                return stats
+            return {}
+
+        backend.call.side_effect = call
+        backend.calls = calls
+        return backend
+
+    def _run(self, backend, src="b2:docs", dst="/tmp/out", **kwargs):
+        job = transfer(src, dst, backend, **kwargs)
+        job.POLL_INTERVAL = 0.01
+        job.start()
+        assert job.wait(2)
+        return job
+
+    def test_directory_copied_as_job(self):
+        backend = self._backend([{"finished": False}, {"finished": True, "success": True}])
+        job = self._run(backend, src_is_file=False)
+        assert backend.calls[0] == ("sync/copy", {"srcFs": "b2:docs", "dstFs": "/tmp/out", "_async": True})
+        assert ("core/stats", {"group": "job/7"}) in backend.calls
+        assert job.stats().total_bytes == STATS["totalBytes"]
+        assert job.succeeded() is True
+
+    @pytest.mark.parametrize("src, fs, name", [
+        ("b2:docs/a.txt", "b2:docs", "a.txt"),
+        ("b2:a.txt", "b2:", "a.txt"),
+        ("a.txt", ".", "a.txt"),
+    ])
+    def test_file_copied_with_copyfile(self, src, fs, name):
+        backend = self._backend([{"finished": True, "success": True}])
+        self._run(backend, src=src, dst="b2:up/", src_is_file=True)
+        method, params = backend.calls[0]
+        assert method == "operations/copyfile"
+        assert params == {"srcFs": fs, "srcRemote": name, "dstFs": "b2:up/", "dstRemote": name, "_async": True}
+
+    def test_files_copied_with_filter(self):
+        backend = self._backend([{"finished": True, "success": True}])
+        listed = []
+        call = backend.call.side_effect
+
+        def record(method, params=None, **kwargs):
+            if method == "sync/copy":
+                with open(params["_filter"]["FilesFromRaw"][0]) as f:
+                    listed.append(f.read())
+            return call(method, params, **kwargs)
+
+        backend.call.side_effect = record
+        self._run(backend, files=["a.txt", "b.txt"])
+        method, params = backend.calls[0]
+        assert method == "sync/copy"
+        assert (params["srcFs"], params["dstFs"]) == ("b2:docs", "/tmp/out")
+        assert listed == ["a.txt\nb.txt\n"]
+
+    def test_profile_sent_as_config(self):
+        backend = self._backend([{"finished": True, "success": True}])
+        self._run(backend, src_is_file=False, profile=transferprofile("small", transfers=16, fast_list=True))
+        method, params = backend.calls[0]
+        assert params["_config"] == {"Transfers": 16, "UseListR": True}
+
+    def test_failed_job(self):
+        backend = self._backend([{"finished": True, "success": False, "error": "no space"}])
+        job = self._run(backend, src_is_file=False)
+        assert job.succeeded() is False
+        assert job.errors() == ["no space"]
+
+    def test_cancel_stops_job(self):
+        backend = self._backend(iter(lambda: {"finished": False}, None))
+        job = transfer("b2:docs", "/tmp/out", backend, src_is_file=False)
+        job.POLL_INTERVAL = 0.01
+        job.start()
+        job.cancel()
+        assert job.wait(2)
+        assert ("job/stop", {"jobid": 7}) in backend.calls
+        assert job.succeeded() is False
+
+
+class TestTransferManager:
+    @pytest.fixture
+    def started(self):
+        """Patch Popen with rclone copies that run until released; yield the srcs started, in order."""
+        releases = {}
+
+        managers = []
+
+        class startedlist(list):
+            def release(self, src):
+                releases.setdefault(src, threading.Event()).set()
+
+            def manager(self, **kwargs):
+                managers.append(transfermanager(**kwargs))
+                return managers[-1]
+
+        started = startedlist()
+
+        def popen(args, **kwargs):
+            src = args[2]
+            release = releases.setdefault(src, threading.Event())
+            started.append(src)
+
+            def read1(size):
+                release.wait(5)
+                return b""
+
+            process = fake_process([])
+            process.stderr.read1 = read1
+            process.terminate.side_effect = release.set
+            return process
+
+        with patch("rcli.transfer.subprocess.Popen", side_effect=popen):
+            yield started
+            # Don't let queued jobs start under another test's patch
+            for manager in managers:
+                manager.cancel_all()
+            for release in releases.values():
+                release.set()
+            for manager in managers:
+                for job in manager.jobs():
+                    job.wait(2)
+
+    def _wait_started(self, started, count):
+        for _ in range(500):
+            if len(started) >= count:
+                return
+            threading.Event().wait(0.01)
+        raise AssertionError(f"{len(started)} of {count} started")
+
+    def test_runs_up_to_concurrency(self, started):
+        manager = started.manager(concurrency=2)
+        jobs = [manager.add(f"src{i}", "/tmp") for i in range(4)]
+        self._wait_started(started, 2)
+        assert [job.state() for job in jobs] == ["running", "running", "queued", "queued"]
+        assert manager.active() == 4
+        assert manager.counts() == {"running": 2, "queued": 2}
+
+        started.release("src0")
+        assert jobs[0].wait(2)
+        self._wait_started(started, 3)
+        assert started == ["src0", "src1", "src2"]
+        assert manager.counts() == {"done": 1, "running": 2, "queued": 1}
+
+    def test_jobs_listed_running_queued_then_ended(self, started):
+        manager = started.manager(concurrency=1)
+        first, second, third = (manager.add(f"src{i}", "/tmp") for i in range(3))
+        self._wait_started(started, 1)
+        started.release("src0")
+        assert first.wait(2)
+        self._wait_started(started, 2)
+        assert manager.jobs() == [second, third, first]
+
+    def test_move_reorders_queue(self, started):
+        manager = started.manager(concurrency=1)
+        jobs = [manager.add(f"src{i}", "/tmp") for i in range(4)]
+        self._wait_started(started, 1)
+        version = manager.version()
+
+        assert manager.move(jobs[3], -2)
+        assert manager.version() != version
+        assert manager.jobs() == [jobs[0], jobs[3], jobs[1], jobs[2]]
+        assert manager.move(jobs[3], 5)
+        assert manager.jobs() == [jobs[0], jobs[1], jobs[2], jobs[3]]
+        # Already last, and a running job cannot be moved
+        assert not manager.move(jobs[3], 1)
+        assert not manager.move(jobs[0], 1)
+
+        assert manager.move(jobs[2], -1)
+        started.release("src0")
+        self._wait_started(started, 2)
+        assert started == ["src0", "src2"]
+
+    def test_cancel_queued_and_running(self, started):
+        manager = started.manager(concurrency=1)
+        running = manager.add("src0", "/tmp")
+        queued = manager.add("src1", "/tmp")
+        last = manager.add("src2", "/tmp")
+        self._wait_started(started, 1)
+
+        manager.cancel(queued)
+        assert queued.state() == "cancelled"
+        manager.cancel(running)
+        assert running.wait(2)
+        assert running.state() == "cancelled"
+        # The slot goes to the next job still queued
+        self._wait_started(started, 2)
+        assert started == ["src0", "src2"]
+        assert last.state() == "running"
+
+    def test_jobs_get_the_profile_current_when_added(self, started):
+        manager = started.manager()
+        first = manager.add("src0", "/tmp")
+        manager.profile = transferprofile("huge", transfers=2)
+        second = manager.add("src1", "/tmp")
+        assert first.profile is None
+        assert second.profile is manager.profile
+
+    def test_on_done_and_clear_finished(self, started):
+        manager = started.manager()
+        seen = []
+        job = manager.add("src0", "/tmp", title="Upload src0", on_done=lambda job, ok: seen.append((job.title, ok)))
+        other = manager.add("src1", "/tmp")
+        started.release("src0")
+        assert job.wait(2)
+        assert seen == [("Upload src0", True)]
+
+        manager.clear_finished()
+        assert manager.jobs() == [other]
+
+    def test_stats_add_up_running_jobs(self):
+        manager = transfermanager()
+        jobs = [MagicMock(), MagicMock()]
+        jobs[0].stats.return_value = transferstats(bytes=10, total_bytes=100, speed=5.0, transfers=1, total_transfers=2)
+        jobs[1].stats.return_value = transferstats(bytes=30, total_bytes=60, speed=15.0, errors=1)
+        manager._running.update(jobs)
+        stats = manager.stats()
+        assert (stats.bytes, stats.total_bytes, stats.speed) == (40, 160, 20.0)
+        assert (stats.transfers, stats.total_transfers, stats.errors) == (1, 2, 1)
+        assert stats.eta == 6.0
+
+    def test_cancel_all(self, started):
+        manager = started.manager(concurrency=1)
+        jobs = [manager.add(f"src{i}", "/tmp") for i in range(2)]
+        self._wait_started(started, 1)
+        manager.cancel_all()
+        assert all(job.wait(2) for job in jobs)
+        assert manager.active() == 0
+        assert started == ["src0"]
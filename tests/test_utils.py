@@ -1,5 +1,5 @@
 import pytest
-from rcli.utils import format_size, format_date
+from rcli.utils import format_size, format_date, format_duration, parse_duration, parse_size
 
 
 @pytest.mark.parametrize(
@@ -32,3 +32,61 @@ def test_format_size(size_bytes, expected):
 )
 def test_format_date(iso_str, expected):
     assert format_date(iso_str) == expected
+
+
+@pytest.mark.parametrize(
+    "seconds, expected",
+    [
+        (0, "0:00"),
+        (9.7, "0:09"),
+        (75, "1:15"),
+        (3600, "1:00:00"),
+        (3725, "1:02:05"),
+        (None, "unknown"),
+        (-1, "unknown"),
+    ],
+)
+def test_format_duration(seconds, expected):
+    assert format_duration(seconds) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("90", 90),
+        ("30s", 30),
+        ("5m", 300),
+        ("2h", 7200),
+        (" 1.5D ", 129600),
+    ],
+)
+def test_parse_duration(text, expected):
+    assert parse_duration(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "soon", "5w", "-1h"])
+def test_parse_duration_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_duration(text)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("512", 512 * 1024),
+        ("16M", 16 * 1024 ** 2),
+        ("64Mi", 64 * 1024 ** 2),
+        ("1.5GiB", int(1.5 * 1024 ** 3)),
+        ("2k", 2048),
+        ("10b", 10),
+        (" 1T ", 1024 ** 4),
+    ],
+)
+def test_parse_size(text, expected):
+    assert parse_size(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "big", "-1M", "MiB", "1ib", "5X"])
+def test_parse_size_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_size(text)